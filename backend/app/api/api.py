@@ -1,6 +1,6 @@
 from fastapi import APIRouter
 
-from app.api.endpoints import auth, users, projects, tasks, task_dependencies, risk_prediction
+from app.api.endpoints import auth, users, projects, tasks, task_dependencies, risk_prediction, escalations, realtime, notifications, budgets, admin, search, jobs
 
 api_router = APIRouter()
 
@@ -8,6 +8,13 @@ api_router = APIRouter()
 api_router.include_router(auth.router, prefix="/auth", tags=["authentication"])
 api_router.include_router(users.router, prefix="/users", tags=["users"])
 api_router.include_router(projects.router, prefix="/projects", tags=["projects"])
+api_router.include_router(budgets.router, prefix="/projects", tags=["budgets"])
 api_router.include_router(tasks.router, prefix="/tasks", tags=["tasks"])
 api_router.include_router(task_dependencies.router, prefix="/task-dependencies", tags=["task_dependencies"])
 api_router.include_router(risk_prediction.router, prefix="/risk-prediction", tags=["risk_prediction"])
+api_router.include_router(escalations.router, prefix="/escalations", tags=["escalations"])
+api_router.include_router(notifications.router, prefix="/notifications", tags=["notifications"])
+api_router.include_router(search.router, prefix="/search", tags=["search"])
+api_router.include_router(jobs.router, prefix="/jobs", tags=["jobs"])
+api_router.include_router(realtime.router, tags=["realtime"])
+api_router.include_router(admin.router, prefix="/admin", tags=["admin"])
@@ -0,0 +1,100 @@
+"""
+Conditional GET support for read endpoints.
+
+Validators come from per-project change counters (``app.services.versions``),
+which can be read with one small query, so a request whose client copy is
+still current is answered with 304 before the full objects are loaded or
+serialized.
+"""
+import hashlib
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from fastapi import Request, Response, status
+
+from app.services.versions import response_cache
+
+CACHE_CONTROL = "private, no-cache"
+
+
+def make_etag(*parts: Any) -> str:
+    """Weak ETag over the versions and parameters a response depends on."""
+    digest = hashlib.sha1(repr(parts).encode()).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+
+def _utc(value: Optional[datetime]) -> Optional[datetime]:
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def validator_headers(etag: str, changed_at: Optional[datetime]) -> Dict[str, str]:
+    """
+    ETag, Last-Modified and Cache-Control headers of a response.
+
+    Last-Modified has one-second resolution, so it is only sent once the
+    last change is more than a second old; otherwise a second change within
+    the same second could not be told apart from the first.
+    """
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    changed_at = _utc(changed_at)
+    if changed_at is not None and changed_at < datetime.now(timezone.utc) - timedelta(seconds=1):
+        headers["Last-Modified"] = format_datetime(changed_at.replace(microsecond=0), usegmt=True)
+    return headers
+
+
+def _opaque(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def is_not_modified(request: Request, etag: str, changed_at: Optional[datetime]) -> bool:
+    """
+    Whether the client's copy is current.
+
+    If-None-Match takes precedence over If-Modified-Since and is compared
+    weakly, as required for GET.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        return _opaque(etag) in {_opaque(tag) for tag in if_none_match.split(",")}
+
+    if_modified_since = request.headers.get("if-modified-since")
+    changed_at = _utc(changed_at)
+    if if_modified_since is None or changed_at is None:
+        return False
+    try:
+        since = _utc(parsedate_to_datetime(if_modified_since))
+    except (TypeError, ValueError):
+        return False
+    return changed_at.replace(microsecond=0) <= since
+
+
+def not_modified(headers: Dict[str, str]) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+
+def cached_response(
+    project_id: int,
+    key: Hashable,
+    version: Any,
+    build: Callable[[], bytes],
+    headers: Dict[str, str],
+) -> Response:
+    """
+    JSON response served from the response cache while ``version`` is current.
+
+    ``build`` loads and serializes the body on a miss.
+    """
+    entry = response_cache.get(project_id, key)
+    if entry is not None and entry[0] == version:
+        body = entry[1]
+    else:
+        generation = response_cache.generation(project_id)
+        body = build()
+        response_cache.set(project_id, key, (version, body), generation)
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,77 @@
+import asyncio
+from typing import Any
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+
+from app.api.serialization import dumps
+from app.core.auth import get_current_active_superuser
+from app.core.config import settings
+from app.core.profiler import FORMATS, Profile, SamplingProfiler, load_profile
+from app.db.models import User
+
+router = APIRouter()
+
+
+def _profile_response(profile: Profile, output: str, name: str) -> Response:
+    if output not in FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid format: {output}",
+        )
+    headers = {"X-Profile-Samples": str(sum(profile.samples.values()))}
+    if output == "speedscope":
+        return Response(content=dumps(profile.speedscope(name)), media_type="application/json", headers=headers)
+    return Response(content=profile.collapsed(), media_type="text/plain", headers=headers)
+
+
+@router.get("/profile")
+async def profile_worker(
+    seconds: float = Query(10, gt=0, le=60),
+    interval_ms: float = Query(5, ge=1, le=100),
+    output: str = Query("collapsed", alias="format"),
+    include_idle: bool = False,
+    current_user: User = Depends(get_current_active_superuser),
+) -> Any:
+    """
+    Sample the stacks of this worker for some seconds and return the profile.
+    
+    ``format`` is ``collapsed`` (flame graph input) or ``speedscope``. Threads
+    blocked in select/poll/wait are left out unless ``include_idle`` is set.
+    Only for admins.
+    """
+    if output not in FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid format: {output}",
+        )
+    profiler = SamplingProfiler(interval_ms / 1000, include_idle=include_idle)
+    if not profiler.start():
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A profile is already running",
+        )
+    try:
+        # The event loop keeps serving other requests meanwhile
+        await asyncio.sleep(seconds)
+    finally:
+        profile = profiler.stop()
+    return _profile_response(profile, output, f"worker, {seconds:g} s")
+
+
+@router.get("/profiles/{profile_id}")
+def read_request_profile(
+    profile_id: str,
+    output: str = Query("collapsed", alias="format"),
+    current_user: User = Depends(get_current_active_superuser),
+) -> Any:
+    """
+    Get the profile of a request sent with ``X-Profile: 1``, by the id
+    returned in its ``X-Profile-Id`` header, from any worker. Only for admins.
+    """
+    profile = load_profile(settings.PROFILE_DIR, profile_id)
+    if profile is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Profile not found",
+        )
+    return _profile_response(profile, output, f"request {profile_id}")
@@ -0,0 +1,232 @@
+from datetime import datetime
+from typing import Any, List
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+
+from app.api.schemas import (
+    BudgetEntryCreate,
+    BudgetEntryResponse,
+    BudgetEntryUpdate,
+    BudgetForecastRequest,
+    BudgetForecastResponse,
+    BudgetSummaryResponse,
+    TimeSeriesResponse,
+)
+from app.api.serialization import json_response
+from app.core.auth import get_current_active_user
+from app.db.database import get_db
+from app.db.models import BudgetEntry, Project, User
+from app.ml.budget_forecast import forecast_budget_impact
+from app.ml.downsampling import METHODS
+from app.services.budget import BUCKETS, ENTRY_TYPES, budget_summary
+from app.services.timeseries import budget_series, downsampled
+
+router = APIRouter()
+
+def _get_project(db: Session, project_id: int, current_user: User) -> Project:
+    project = db.query(Project).filter(Project.id == project_id).first()
+    if not project:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Project not found",
+        )
+    
+    if current_user.role != "admin" and current_user not in project.members:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions",
+        )
+    return project
+
+def _check_entry_type(entry_type: str) -> None:
+    if entry_type not in ENTRY_TYPES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"entry_type must be one of: {', '.join(ENTRY_TYPES)}",
+        )
+
+def _get_entry(db: Session, project_id: int, entry_id: int) -> BudgetEntry:
+    entry = db.query(BudgetEntry).filter(
+        BudgetEntry.id == entry_id,
+        BudgetEntry.project_id == project_id,
+    ).first()
+    if not entry:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Budget entry not found",
+        )
+    return entry
+
+@router.get("/{project_id}/budget/summary", response_model=BudgetSummaryResponse)
+async def read_budget_summary(
+    project_id: int,
+    bucket: str = "month",
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db),
+) -> Any:
+    """
+    Get planned vs actual vs forecast spend by category and time bucket
+    (day, week or month), with variance and burn rate.
+    """
+    project = _get_project(db, project_id, current_user)
+    
+    if bucket not in BUCKETS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"bucket must be one of: {', '.join(BUCKETS)}",
+        )
+    
+    return budget_summary(db, project_id, project.budget, bucket)
+
+@router.get("/{project_id}/budget/timeseries", response_model=TimeSeriesResponse)
+def read_budget_timeseries(
+    project_id: int,
+    entry_type: str = "actual",
+    cumulative: bool = True,
+    points: int = Query(500, ge=2, le=10000),
+    method: str = "lttb",
+    from_date: datetime = Query(None, alias="from"),
+    to_date: datetime = Query(None, alias="to"),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db),
+) -> Any:
+    """
+    Get spend over time for a chart, downsampled server-side to at most
+    ``points`` points with LTTB or min/max bucketing.
+    """
+    _get_project(db, project_id, current_user)
+    _check_entry_type(entry_type)
+    
+    if method not in METHODS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"method must be one of: {', '.join(METHODS)}",
+        )
+    
+    x, y = budget_series(db, project_id, entry_type, cumulative, from_date, to_date)
+    return {
+        "project_id": project_id,
+        "series": f"{entry_type}_cumulative" if cumulative else entry_type,
+        **downsampled(x, y, points, method),
+    }
+
+@router.post("/{project_id}/budget/forecast", response_model=BudgetForecastResponse)
+def forecast_budget(
+    project_id: int,
+    forecast_in: BudgetForecastRequest,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db),
+) -> Any:
+    """
+    Forecast the cost overrun of schedule slips.
+    
+    Evaluates the given what-if scenarios (slip in days per task), the
+    currently delayed and blocked tasks, and risk-driven random scenarios
+    against the project's critical path, using an hourly cost derived from
+    actual spend. The simulation is CPU-bound, so it runs in the threadpool.
+    """
+    _get_project(db, project_id, current_user)
+    
+    return forecast_budget_impact(
+        db,
+        project_id,
+        scenarios=[scenario.model_dump() for scenario in forecast_in.scenarios],
+        simulations=forecast_in.simulations,
+        slip_fraction=forecast_in.slip_fraction,
+        hourly_cost=forecast_in.hourly_cost,
+        daily_overhead=forecast_in.daily_overhead,
+        seed=forecast_in.seed,
+    )
+
+@router.get("/{project_id}/budget/entries", response_model=List[BudgetEntryResponse])
+async def read_budget_entries(
+    project_id: int,
+    skip: int = 0,
+    limit: int = 100,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db),
+) -> Any:
+    """
+    Retrieve a project's budget entries.
+    """
+    _get_project(db, project_id, current_user)
+    
+    entries = db.query(BudgetEntry).filter(
+        BudgetEntry.project_id == project_id
+    ).order_by(BudgetEntry.date, BudgetEntry.id).offset(skip).limit(limit).all()
+    return json_response(List[BudgetEntryResponse], entries)
+
+@router.post("/{project_id}/budget/entries", response_model=BudgetEntryResponse)
+async def create_budget_entry(
+    project_id: int,
+    entry_in: BudgetEntryCreate,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db),
+) -> Any:
+    """
+    Create a budget entry.
+    """
+    _get_project(db, project_id, current_user)
+    
+    if entry_in.project_id != project_id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="project_id does not match the URL",
+        )
+    _check_entry_type(entry_in.entry_type)
+    
+    entry = BudgetEntry(
+        project_id=project_id,
+        description=entry_in.description,
+        amount=entry_in.amount,
+        entry_type=entry_in.entry_type,
+        category=entry_in.category,
+        date=entry_in.date,
+    )
+    db.add(entry)
+    db.commit()
+    db.refresh(entry)
+    return entry
+
+@router.put("/{project_id}/budget/entries/{entry_id}", response_model=BudgetEntryResponse)
+async def update_budget_entry(
+    project_id: int,
+    entry_id: int,
+    entry_in: BudgetEntryUpdate,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db),
+) -> Any:
+    """
+    Update a budget entry.
+    """
+    _get_project(db, project_id, current_user)
+    entry = _get_entry(db, project_id, entry_id)
+    
+    update_data = entry_in.model_dump(exclude_unset=True)
+    if "entry_type" in update_data:
+        _check_entry_type(update_data["entry_type"])
+    for field, value in update_data.items():
+        setattr(entry, field, value)
+    
+    db.add(entry)
+    db.commit()
+    db.refresh(entry)
+    return entry
+
+@router.delete("/{project_id}/budget/entries/{entry_id}", response_model=BudgetEntryResponse)
+async def delete_budget_entry(
+    project_id: int,
+    entry_id: int,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db),
+) -> Any:
+    """
+    Delete a budget entry.
+    """
+    _get_project(db, project_id, current_user)
+    entry = _get_entry(db, project_id, entry_id)
+    
+    db.delete(entry)
+    db.commit()
+    return entry
@@ -0,0 +1,21 @@
+from typing import Any
+
+from fastapi import APIRouter, Depends
+
+from app.api.schemas import EscalationRunResponse
+from app.core.auth import get_current_active_superuser
+from app.db.models import User
+from app.services.escalation import escalation_scanner
+
+router = APIRouter()
+
+@router.post("/run", response_model=EscalationRunResponse)
+def run_escalations(
+    current_user: User = Depends(get_current_active_superuser),
+) -> Any:
+    """
+    Run the deadline escalation scan now and report timings and row counts. Only for admins.
+    
+    The scan runs in the threadpool, so other requests are served meanwhile.
+    """
+    return escalation_scanner.run().as_dict()
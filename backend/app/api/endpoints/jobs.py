@@ -0,0 +1,64 @@
+from typing import Any
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+
+from app.api.schemas import JobCreate, JobResponse
+from app.core.auth import get_current_active_superuser, get_current_active_user
+from app.core.jobs import enqueue, job_as_dict, job_kinds
+from app.db.database import get_db
+from app.db.models import Job, User
+
+router = APIRouter()
+
+@router.post("/", response_model=JobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def create_job(
+    job_in: JobCreate,
+    current_user: User = Depends(get_current_active_superuser),
+    db: Session = Depends(get_db),
+) -> Any:
+    """
+    Queue a background job (admin only).
+    
+    With a dedup_key, the job already queued or running under that key is
+    returned instead of queuing another one.
+    """
+    if job_in.kind not in job_kinds():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown job kind: {job_in.kind}",
+        )
+    
+    job = enqueue(
+        db,
+        job_in.kind,
+        job_in.payload,
+        priority=job_in.priority,
+        dedup_key=job_in.dedup_key,
+        max_attempts=job_in.max_attempts,
+        created_by=current_user.id,
+    )
+    return job_as_dict(job)
+
+@router.get("/{job_id}", response_model=JobResponse)
+async def read_job(
+    job_id: int,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db),
+) -> Any:
+    """
+    Get the status, progress and result of a job queued by the current user.
+    """
+    job = db.query(Job).filter(Job.id == job_id).first()
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found",
+        )
+    
+    if current_user.role != "admin" and job.created_by != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions",
+        )
+    return job_as_dict(job)
@@ -0,0 +1,114 @@
+from typing import Any, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+
+from app.api.schemas import (
+    NotificationPage,
+    NotificationReadAllResponse,
+    NotificationResponse,
+    NotificationUpdate,
+    UnreadCountResponse,
+)
+from app.core.auth import get_current_active_user
+from app.db.database import get_db
+from app.db.models import Notification, User
+from app.services.notifications import list_notifications, mark_all_read, set_read, unread_count
+
+router = APIRouter()
+
+@router.get("/", response_model=NotificationPage)
+async def read_notifications(
+    limit: int = Query(50, ge=1, le=200),
+    before_id: Optional[int] = None,
+    unread_only: bool = False,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db),
+) -> Any:
+    """
+    Retrieve the current user's notifications, newest first.
+    
+    Pass the returned next_before_id as before_id to get the next page.
+    """
+    items = list_notifications(db, current_user.id, limit=limit, before_id=before_id, unread_only=unread_only)
+    count = unread_count(db, current_user.id)
+    db.commit()
+    
+    return {
+        "items": items,
+        "next_before_id": items[-1].id if len(items) == limit else None,
+        "unread_count": count,
+    }
+
+@router.get("/unread-count", response_model=UnreadCountResponse)
+async def read_unread_count(
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db),
+) -> Any:
+    """
+    Get the current user's unread notification count.
+    """
+    count = unread_count(db, current_user.id)
+    db.commit()
+    return {"unread_count": count}
+
+@router.post("/read-all", response_model=NotificationReadAllResponse)
+async def read_all_notifications(
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db),
+) -> Any:
+    """
+    Mark all of the current user's notifications as read.
+    """
+    updated = mark_all_read(db, current_user.id)
+    db.commit()
+    return {"updated_count": updated, "unread_count": 0}
+
+@router.put("/{notification_id}", response_model=NotificationResponse)
+async def update_notification(
+    notification_id: int,
+    notification_in: NotificationUpdate,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db),
+) -> Any:
+    """
+    Mark a notification as read or unread.
+    """
+    notification = db.query(Notification).filter(
+        Notification.id == notification_id,
+        Notification.user_id == current_user.id,
+    ).first()
+    if not notification:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Notification not found",
+        )
+    
+    if notification_in.is_read is not None:
+        set_read(db, current_user.id, [notification_id], notification_in.is_read)
+        db.commit()
+        db.refresh(notification)
+    return notification
+
+@router.delete("/{notification_id}", response_model=NotificationResponse)
+async def delete_notification(
+    notification_id: int,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db),
+) -> Any:
+    """
+    Delete a notification.
+    """
+    notification = db.query(Notification).filter(
+        Notification.id == notification_id,
+        Notification.user_id == current_user.id,
+    ).first()
+    if not notification:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Notification not found",
+        )
+    
+    db.delete(notification)
+    db.commit()
+    return notification
@@ -1,32 +1,61 @@
 from typing import Any, List
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from sqlalchemy.orm import Session
 
-from app.api.schemas import ProjectCreate, ProjectUpdate, ProjectResponse
+from app.api.conditional import cached_response, is_not_modified, make_etag, not_modified, validator_headers
+from app.api.fields import loader_options, render_selection, select_fields
+from app.api.schemas import ProjectChangesResponse, ProjectCreate, ProjectUpdate, ProjectResponse, ProjectStatsResponse
 from app.core.auth import get_current_active_user
 from app.db.database import get_db
 from app.db.models import Project, User, user_project
+from app.services.delta_sync import MAX_CHANGES_PER_PAGE, changes_since
+from app.services.project_graph import (
+    BINARY_MEDIA_TYPE,
+    build_project_graph,
+    encode_binary,
+    encode_json,
+)
+from app.services.project_stats import project_stats
+from app.services.versions import project_versions
 
 router = APIRouter()
 
 @router.get("/", response_model=List[ProjectResponse])
 async def read_projects(
+    request: Request,
     skip: int = 0,
     limit: int = 100,
+    fields: str = None,
+    expand: str = None,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db),
 ) -> Any:
     """
     Retrieve projects.
+    
+    ``fields`` / ``expand`` select the fields and nested members/tasks to
+    return; only those are loaded. The page's project ids and versions are
+    read first, so an unchanged page is answered with 304 without loading
+    the projects. Only an ETag is sent: a page also changes when projects
+    leave it, which no change time covers.
     """
-    if current_user.role == "admin":
-        projects = db.query(Project).offset(skip).limit(limit).all()
-    else:
-        projects = db.query(Project).join(user_project).filter(
-            user_project.c.user_id == current_user.id
-        ).offset(skip).limit(limit).all()
-    return projects
+    selection = select_fields(ProjectResponse, fields, expand)
+    query = db.query(Project.id)
+    if current_user.role != "admin":
+        query = query.join(user_project).filter(user_project.c.user_id == current_user.id)
+    project_ids = [project_id for (project_id,) in query.order_by(Project.id).offset(skip).limit(limit)]
+    
+    versions = project_versions(db, project_ids)
+    etag = make_etag("projects", current_user.id, skip, limit, selection.key(), [(i, versions[i][0]) for i in project_ids])
+    headers = validator_headers(etag, None)
+    if is_not_modified(request, etag, None):
+        return not_modified(headers)
+    
+    projects = db.query(Project).options(*loader_options(Project, selection)).filter(
+        Project.id.in_(project_ids)
+    ).order_by(Project.id).all() if project_ids else []
+    return Response(content=render_selection(List[ProjectResponse], projects, selection), media_type="application/json", headers=headers)
 
 @router.post("/", response_model=ProjectResponse)
 async def create_project(
@@ -64,14 +93,55 @@ async def create_project(
     db.refresh(project)
     return project
 
+# Declared before /{project_id} so that "stats" is not taken for a project id
+@router.get("/stats", response_model=List[ProjectStatsResponse])
+async def read_projects_stats(
+    ids: str,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db),
+) -> Any:
+    """
+    Get dashboard stats of several projects, given as comma-separated ids.
+    Projects that do not exist or are not accessible are left out.
+    """
+    try:
+        project_ids = list(dict.fromkeys(int(i) for i in ids.split(",") if i.strip()))
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="ids must be comma-separated integers",
+        )
+    if len(project_ids) > 200:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="At most 200 projects per request",
+        )
+    
+    query = db.query(Project.id).filter(Project.id.in_(project_ids))
+    if current_user.role != "admin":
+        query = query.join(user_project).filter(user_project.c.user_id == current_user.id)
+    accessible = {project_id for (project_id,) in query}
+    
+    stats = project_stats(db, [project_id for project_id in project_ids if project_id in accessible])
+    db.commit()
+    return list(stats.values())
+
 @router.get("/{project_id}", response_model=ProjectResponse)
 async def read_project(
     project_id: int,
+    request: Request,
+    fields: str = None,
+    expand: str = None,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db),
 ) -> Any:
     """
     Get a specific project by id.
+    
+    ``fields`` / ``expand`` select the fields and nested members/tasks to
+    return; only those are loaded. Supports If-None-Match /
+    If-Modified-Since; the serialized response is cached until the project's
+    next write.
     """
     project = db.query(Project).filter(Project.id == project_id).first()
     if not project:
@@ -87,7 +157,130 @@ async def read_project(
             detail="Not enough permissions",
         )
     
-    return project
+    selection = select_fields(ProjectResponse, fields, expand)
+    version, changed_at = project_versions(db, [project_id])[project_id]
+    changed_at = changed_at or project.updated_at or project.created_at
+    etag = make_etag("project", project_id, version, selection.key())
+    headers = validator_headers(etag, changed_at)
+    if is_not_modified(request, etag, changed_at):
+        return not_modified(headers)
+    
+    def build() -> bytes:
+        loaded = db.query(Project).options(*loader_options(Project, selection)).filter(Project.id == project_id).first()
+        return render_selection(ProjectResponse, loaded, selection)
+    
+    return cached_response(project_id, ("project", selection.key()), version, build, headers)
+
+@router.get("/{project_id}/graph")
+def read_project_graph(
+    project_id: int,
+    request: Request,
+    format: str = None,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db),
+) -> Any:
+    """
+    Get a project's dependency graph as a compact columnar payload.
+    
+    Returns parallel node arrays (ids, start/due epoch seconds, status codes)
+    and CSR edge arrays with dictionary-encoded dependency types. Pass
+    ``format=binary`` or ``Accept: application/octet-stream`` for raw typed
+    arrays instead of JSON.
+    """
+    project = db.query(Project).filter(Project.id == project_id).first()
+    if not project:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Project not found",
+        )
+    
+    if current_user.role != "admin" and current_user not in project.members:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions",
+        )
+    
+    if format is None:
+        format = "binary" if BINARY_MEDIA_TYPE in request.headers.get("accept", "") else "json"
+    if format not in ("json", "binary"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid graph format: {format}",
+        )
+    
+    # Every write to the project's tasks and dependencies bumps its version,
+    # so an unchanged graph is answered before it is built
+    version, changed_at = project_versions(db, [project_id])[project_id]
+    changed_at = changed_at or project.updated_at or project.created_at
+    etag = make_etag("graph", project_id, version, format)
+    headers = {**validator_headers(etag, changed_at), "Vary": "Accept"}
+    if is_not_modified(request, etag, changed_at):
+        return not_modified(headers)
+    
+    graph = build_project_graph(db, project_id)
+    if format == "binary":
+        return Response(content=encode_binary(graph), media_type=BINARY_MEDIA_TYPE, headers=headers)
+    return Response(content=encode_json(graph), media_type="application/json", headers=headers)
+
+@router.get("/{project_id}/changes", response_model=ProjectChangesResponse)
+async def read_project_changes(
+    project_id: int,
+    since: int = None,
+    limit: int = Query(1000, ge=1, le=MAX_CHANGES_PER_PAGE),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db),
+) -> Any:
+    """
+    Get the tasks, dependencies and comments of a project that were created,
+    updated or deleted after the ``since`` cursor.
+    
+    Each changed entity is returned once with its current state; deleted
+    ones come back as tombstones. Poll again from the returned ``cursor``
+    (right away while ``has_more`` is set). When ``reset`` is set, the
+    cursor was missing or too old: reload the project, then poll from the
+    returned cursor.
+    """
+    project = db.query(Project).filter(Project.id == project_id).first()
+    if not project:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Project not found",
+        )
+    
+    if current_user.role != "admin" and current_user not in project.members:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions",
+        )
+    
+    return changes_since(db, project_id, since, limit)
+
+@router.get("/{project_id}/stats", response_model=ProjectStatsResponse)
+async def read_project_stats(
+    project_id: int,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db),
+) -> Any:
+    """
+    Get a project's dashboard stats: task counts by status, estimated and
+    actual hours, average completion and the number of high-risk tasks.
+    """
+    project = db.query(Project).filter(Project.id == project_id).first()
+    if not project:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Project not found",
+        )
+    
+    if current_user.role != "admin" and current_user not in project.members:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions",
+        )
+    
+    stats = project_stats(db, [project_id])[project_id]
+    db.commit()
+    return stats
 
 @router.put("/{project_id}", response_model=ProjectResponse)
 async def update_project(
@@ -113,7 +306,7 @@ async def update_project(
             detail="Not enough permissions",
         )
     
-    update_data = project_in.dict(exclude_unset=True)
+    update_data = project_in.model_dump(exclude_unset=True)
     
     # Handle member_ids separately
     if "member_ids" in update_data:
@@ -0,0 +1,105 @@
+import asyncio
+from typing import Optional
+
+from fastapi import APIRouter, WebSocket, status
+
+from app.core.auth import get_user_from_token
+from app.core.realtime import ClientQueue, encode, hub
+from app.db.database import SessionLocal
+from app.db.models import User
+from app.services.push import can_subscribe, user_channel
+
+router = APIRouter()
+
+def _authenticate(websocket: WebSocket) -> Optional[User]:
+    token = websocket.query_params.get("token")
+    if token is None:
+        scheme, _, credentials = websocket.headers.get("authorization", "").partition(" ")
+        if scheme.lower() == "bearer":
+            token = credentials
+    if not token:
+        return None
+
+    db = SessionLocal()
+    try:
+        user = get_user_from_token(db, token)
+        if user is None or not user.is_active:
+            return None
+        db.expunge(user)
+        return user
+    finally:
+        db.close()
+
+def _allowed(user: User, channel: str) -> bool:
+    db = SessionLocal()
+    try:
+        return can_subscribe(db, user, channel)
+    finally:
+        db.close()
+
+async def _send_events(websocket: WebSocket, client: ClientQueue) -> None:
+    while True:
+        message = await client.get()
+        message = {key: value for key, value in message.items() if key != "key"}
+        await websocket.send_text(encode(message))
+
+async def _receive_commands(websocket: WebSocket, user: User, client: ClientQueue) -> None:
+    loop = asyncio.get_running_loop()
+    while True:
+        try:
+            command = await websocket.receive_json()
+        except (ValueError, KeyError):
+            client.put({"type": "error", "detail": "Commands must be JSON objects"})
+            continue
+        if not isinstance(command, dict):
+            client.put({"type": "error", "detail": "Commands must be JSON objects"})
+            continue
+
+        action = command.get("action")
+        channel = command.get("channel")
+        if action == "ping":
+            client.put({"type": "pong"})
+        elif action == "subscribe" and isinstance(channel, str):
+            # Membership checks hit the database; keep them off the event loop
+            if await loop.run_in_executor(None, _allowed, user, channel):
+                hub.subscribe(client, channel)
+                client.put({"type": "subscribed", "channel": channel})
+            else:
+                client.put({"type": "error", "channel": channel, "detail": "Not enough permissions"})
+        elif action == "unsubscribe" and isinstance(channel, str):
+            hub.unsubscribe(client, channel)
+            client.put({"type": "unsubscribed", "channel": channel})
+        else:
+            client.put({"type": "error", "detail": f"Unknown action: {action}"})
+
+@router.websocket("/ws")
+async def websocket_endpoint(websocket: WebSocket):
+    """
+    Push channel for live updates.
+
+    Authenticate with a ``token`` query parameter or a bearer Authorization
+    header. The connection is subscribed to the user's own channel; send
+    ``{"action": "subscribe", "channel": "project:<id>"}`` to follow a project.
+    A ``resync`` event means events were dropped and the client should reload.
+    """
+    user = await asyncio.get_running_loop().run_in_executor(None, _authenticate, websocket)
+    if user is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    client = hub.connect()
+    hub.subscribe(client, user_channel(user.id))
+    client.put({"type": "subscribed", "channel": user_channel(user.id)})
+
+    sender = asyncio.ensure_future(_send_events(websocket, client))
+    receiver = asyncio.ensure_future(_receive_commands(websocket, user, client))
+    try:
+        # Either side ending (disconnect or failed send) closes the connection
+        done, _ = await asyncio.wait({sender, receiver}, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            task.exception()
+    finally:
+        sender.cancel()
+        receiver.cancel()
+        hub.disconnect(client)
@@ -1,13 +1,19 @@
+from datetime import datetime
 from typing import Any
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from sqlalchemy.orm import Session
 
-from app.api.schemas import RiskFactors, RiskPredictionResponse
+from app.api.schemas import JobResponse, RiskFactors, RiskPredictionResponse, RiskPropagationResponse, TimeSeriesResponse
+from app.api.serialization import dumps
 from app.core.auth import get_current_active_user
+from app.core.jobs import enqueue, job_as_dict
 from app.db.database import get_db
-from app.db.models import Task, User
-from app.ml.risk_prediction import risk_model
+from app.db.models import Project, Task, User
+from app.ml.risk_prediction import get_risk_model
+from app.ml.downsampling import METHODS
+from app.ml.risk_propagation import recompute_project_risk
+from app.services.timeseries import RISK_METRICS, downsampled, risk_series
 
 router = APIRouter()
 
@@ -20,7 +26,7 @@ async def predict_risk(
     Predict risk based on provided factors.
     """
     # Use our ML model to predict risk
-    prediction = risk_model.predict_risk_from_factors(risk_factors)
+    prediction = get_risk_model().predict_risk_from_factors(risk_factors)
     return prediction
 
 @router.get("/task/{task_id}", response_model=RiskPredictionResponse)
@@ -41,6 +47,7 @@ async def get_task_risk(
         )
     
     # Calculate risk score
+    risk_model = get_risk_model()
     risk_score = risk_model.predict_risk_for_task(task)
     
     # Create risk factors from task
@@ -63,3 +70,101 @@ async def get_task_risk(
     prediction.risk_score = risk_score
     
     return prediction
+
+@router.post(
+    "/project/{project_id}/propagate",
+    response_model=RiskPropagationResponse,
+    responses={status.HTTP_202_ACCEPTED: {"model": JobResponse}},
+)
+def propagate_project_risk(
+    project_id: int,
+    method: str = "noisy_or",
+    background: bool = False,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db),
+) -> Any:
+    """
+    Recompute predecessor-aware risk scores for every task in a project.
+    
+    With ``background=true`` the work is queued as a job and 202 is returned
+    with the job to poll at ``/jobs/{id}``; a recompute of the project that
+    is already queued or running is returned instead of a second one.
+    """
+    project = db.query(Project).filter(Project.id == project_id).first()
+    if not project:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Project not found",
+        )
+    
+    if current_user.role != "admin" and current_user not in project.members:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions",
+        )
+    
+    if method not in ("noisy_or", "max"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid propagation method: {method}",
+        )
+    
+    if background:
+        job = enqueue(
+            db,
+            "project-risk-recompute",
+            {"project_ids": [project_id], "method": method},
+            dedup_key=f"project-risk-recompute:{project_id}:{method}",
+            created_by=current_user.id,
+        )
+        return Response(content=dumps(job_as_dict(job)), status_code=status.HTTP_202_ACCEPTED, media_type="application/json")
+    
+    summary = recompute_project_risk(db, project_id, method=method)
+    db.commit()
+    return summary
+
+@router.get("/project/{project_id}/timeseries", response_model=TimeSeriesResponse)
+def read_project_risk_timeseries(
+    project_id: int,
+    metric: str = "mean_propagated_risk",
+    points: int = Query(500, ge=2, le=10000),
+    method: str = "lttb",
+    from_date: datetime = Query(None, alias="from"),
+    to_date: datetime = Query(None, alias="to"),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db),
+) -> Any:
+    """
+    Get a project's risk trend from its risk snapshots, downsampled
+    server-side to at most ``points`` points.
+    """
+    project = db.query(Project).filter(Project.id == project_id).first()
+    if not project:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Project not found",
+        )
+    
+    if current_user.role != "admin" and current_user not in project.members:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions",
+        )
+    
+    if metric not in RISK_METRICS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"metric must be one of: {', '.join(RISK_METRICS)}",
+        )
+    if method not in METHODS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"method must be one of: {', '.join(METHODS)}",
+        )
+    
+    x, y = risk_series(db, project_id, metric, from_date, to_date)
+    return {
+        "project_id": project_id,
+        "series": metric,
+        **downsampled(x, y, points, method),
+    }
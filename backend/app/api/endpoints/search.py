@@ -0,0 +1,64 @@
+from typing import Any, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+
+from app.api.schemas import SearchResponse
+from app.core.auth import get_current_active_user
+from app.db.database import get_db
+from app.db.models import Project, User, user_project
+from app.services.search import SearchUnavailable, parse_query, search
+
+router = APIRouter()
+
+@router.get("/", response_model=SearchResponse)
+async def search_tasks(
+    q: str = Query(..., min_length=1, max_length=200),
+    project_id: Optional[int] = None,
+    limit: int = Query(20, ge=1, le=100),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db),
+) -> Any:
+    """
+    Search task titles, descriptions and comments in the projects the user
+    can access, best matches first.
+    
+    Every word of ``q`` must match, as a word prefix ("dep" finds "deploy").
+    Snippets are HTML-escaped with the matches wrapped in ``<mark>``.
+    """
+    terms = parse_query(q)
+    if not terms:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Query has no searchable words",
+        )
+    
+    if project_id is not None:
+        project = db.query(Project).filter(Project.id == project_id).first()
+        if not project:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Project not found",
+            )
+        if current_user.role != "admin" and current_user not in project.members:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Not enough permissions",
+            )
+        project_ids = [project_id]
+    elif current_user.role == "admin":
+        project_ids = None
+    else:
+        project_ids = [
+            member_project_id for (member_project_id,) in
+            db.query(user_project.c.project_id).filter(user_project.c.user_id == current_user.id)
+        ]
+    
+    try:
+        items = search(db, terms, project_ids=project_ids, limit=limit)
+    except SearchUnavailable:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Search index is not available; run python -m app.db.migrate",
+        )
+    return {"query": q, "terms": terms, "items": items}
@@ -4,9 +4,11 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 
 from app.api.schemas import TaskDependencyCreate, TaskDependencyResponse
+from app.api.serialization import json_response
 from app.core.auth import get_current_active_user
 from app.db.database import get_db
 from app.db.models import TaskDependency, Task, Project, User
+from app.ml.risk_propagation import refresh_downstream_risk
 
 router = APIRouter()
 
@@ -59,7 +61,7 @@ async def read_task_dependencies(
             )
     
     dependencies = query.offset(skip).limit(limit).all()
-    return dependencies
+    return json_response(List[TaskDependencyResponse], dependencies)
 
 @router.post("/", response_model=TaskDependencyResponse)
 async def create_task_dependency(
@@ -128,6 +130,11 @@ async def create_task_dependency(
     )
     db.add(dependency)
     db.commit()
+    
+    # The dependent task now inherits risk from its new predecessor
+    refresh_downstream_risk(db, [dependency.dependent_task_id])
+    db.commit()
+    
     db.refresh(dependency)
     return dependency
 
@@ -187,4 +194,7 @@ async def delete_task_dependency(
     
     db.delete(dependency)
     db.commit()
+    
+    refresh_downstream_risk(db, [dependency.dependent_task_id])
+    db.commit()
     return dependency
@@ -1,31 +1,130 @@
-from typing import Any, List
+from datetime import datetime
+from typing import Any, List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session, joinedload
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session, undefer
 
-from app.api.schemas import TaskCreate, TaskUpdate, TaskResponse
+from app.api.conditional import cached_response, is_not_modified, make_etag, not_modified, validator_headers
+from app.api.fields import Selection, loader_options, render_selection, select_fields
+from app.api.schemas import (
+    TaskCommentCreate,
+    TaskCommentPage,
+    TaskCommentResponse,
+    TaskCommentUpdate,
+    TaskCreate,
+    TaskResponse,
+    TaskUpdate,
+)
 from app.core.auth import get_current_active_user
 from app.db.database import get_db
-from app.db.models import Task, Project, User, TaskStatus
+from app.db.models import Task, TaskComment, Project, ProjectVersion, User, TaskStatus, user_project
+from app.ml.risk_prediction import get_risk_model
+from app.ml.risk_propagation import refresh_downstream_risk
+from app.services.interval_index import task_intervals
+from app.services.versions import NO_PROJECT, project_versions
 
 router = APIRouter()
 
+def _list_tasks(
+    db: Session,
+    current_user: User,
+    project_id: Optional[int],
+    version: Optional[int],
+    task_status: Optional[TaskStatus],
+    assignee_id: Optional[int],
+    from_date: Optional[datetime],
+    to_date: Optional[datetime],
+    skip: int,
+    limit: int,
+    selection: Selection,
+) -> List[Task]:
+    query = db.query(Task).options(*loader_options(Task, selection))
+    
+    if project_id is not None:
+        query = query.filter(Task.project_id == project_id)
+    else:
+        # If no project_id is provided, only show tasks from projects the user is a member of
+        if current_user.role != "admin":
+            query = query.join(Project).filter(
+                Project.members.any(User.id == current_user.id)
+            )
+    
+    if task_status is not None:
+        query = query.filter(Task.status == task_status)
+    
+    if assignee_id is not None:
+        query = query.filter(Task.assignee_id == assignee_id)
+    
+    if from_date is not None or to_date is not None:
+        if project_id is not None:
+            # Resolve the window through the project's in-memory interval index,
+            # brought up to the version the response is cached under
+            task_ids = task_intervals.overlapping(db, project_id, version, from_date, to_date)
+            if task_status is None and assignee_id is None:
+                page = task_ids[skip:skip + limit]
+                return query.filter(Task.id.in_(page)).order_by(Task.id).all() if page else []
+            
+            tasks = []
+            for i in range(0, len(task_ids), 500):
+                tasks.extend(query.filter(Task.id.in_(task_ids[i:i + 500])).order_by(Task.id).all())
+                if len(tasks) >= skip + limit:
+                    break
+            return tasks[skip:skip + limit]
+        
+        # Across projects, fall back to the (project_id, start/due date) indexes
+        if to_date is not None:
+            query = query.filter(or_(
+                Task.start_date <= to_date,
+                and_(Task.start_date.is_(None), Task.due_date <= to_date),
+            ))
+        if from_date is not None:
+            query = query.filter(or_(
+                Task.due_date >= from_date,
+                and_(Task.due_date.is_(None), Task.start_date >= from_date),
+            ))
+    
+    # Execute query with pagination
+    return query.offset(skip).limit(limit).all()
+
 @router.get("/", response_model=List[TaskResponse])
 async def read_tasks(
+    request: Request,
     skip: int = 0,
     limit: int = 100,
     project_id: int = None,
-    status: str = None,
+    task_status: str = Query(None, alias="status"),
     assignee_id: int = None,
+    from_date: datetime = Query(None, alias="from"),
+    to_date: datetime = Query(None, alias="to"),
+    fields: str = None,
+    expand: str = None,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db),
 ) -> Any:
     """
     Retrieve tasks with optional filtering.
+    
+    ``from`` / ``to`` restrict the result to tasks whose start/due span
+    overlaps the window; either bound may be omitted. ``fields`` /
+    ``expand`` select the fields and nested dependencies to return.
+    
+    The ETag covers the versions of every project in scope, so an unchanged
+    result is answered with 304 before any task is loaded. Project-scoped
+    lists are also served from the response cache.
     """
-    query = db.query(Task)
+    selection = select_fields(TaskResponse, fields, expand)
+    status_filter = None
+    if task_status is not None:
+        try:
+            status_filter = TaskStatus(task_status)
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Invalid status value: {task_status}",
+            )
     
-    # Filter by project_id if provided
+    changed_at = None
     if project_id is not None:
         # Check if user has access to this project
         project = db.query(Project).filter(Project.id == project_id).first()
@@ -41,41 +140,42 @@ async def read_tasks(
                 detail="Not enough permissions",
             )
         
-        query = query.filter(Task.project_id == project_id)
+        version, changed_at = project_versions(db, [project_id])[project_id]
+        changed_at = changed_at or project.updated_at or project.created_at
+        scope = [(project_id, version)]
+    elif current_user.role == "admin":
+        scope = db.query(ProjectVersion.project_id, ProjectVersion.version).order_by(ProjectVersion.project_id).all()
+        scope = [tuple(row) for row in scope]
     else:
-        # If no project_id is provided, only show tasks from projects the user is a member of
-        if current_user.role != "admin":
-            query = query.join(Project).filter(
-                Project.members.any(User.id == current_user.id)
-            )
+        member_of = db.query(user_project.c.project_id).filter(user_project.c.user_id == current_user.id)
+        versions = project_versions(db, sorted(project_id for (project_id,) in member_of))
+        scope = [(i, version) for i, (version, _) in versions.items()]
     
-    # Filter by status if provided
-    if status is not None:
-        try:
-            task_status = TaskStatus(status)
-            query = query.filter(Task.status == task_status)
-        except ValueError:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Invalid status value: {status}",
-            )
+    params = (project_id, task_status, assignee_id, from_date, to_date, skip, limit, selection.key())
+    etag = make_etag("tasks", scope, params)
+    headers = validator_headers(etag, changed_at)
+    if is_not_modified(request, etag, changed_at):
+        return not_modified(headers)
     
-    # Filter by assignee_id if provided
-    if assignee_id is not None:
-        query = query.filter(Task.assignee_id == assignee_id)
+    def build() -> bytes:
+        version = scope[0][1] if project_id is not None else None
+        tasks = _list_tasks(db, current_user, project_id, version, status_filter, assignee_id, from_date, to_date, skip, limit, selection)
+        return render_selection(List[TaskResponse], tasks, selection)
     
-    # Execute query with pagination
-    tasks = query.offset(skip).limit(limit).all()
-    return tasks
+    if project_id is not None:
+        return cached_response(project_id, ("tasks", params), scope[0][1], build, headers)
+    return Response(content=build(), media_type="application/json", headers=headers)
 
 @router.post("/", response_model=TaskResponse)
-async def create_task(
+def create_task(
     task_in: TaskCreate,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db),
 ) -> Any:
     """
     Create new task.
+    
+    Scoring runs the risk model, so the endpoint runs in the threadpool.
     """
     # Check if project exists and user has access
     project = db.query(Project).filter(Project.id == task_in.project_id).first()
@@ -120,13 +220,10 @@ async def create_task(
         assignee_id=task_in.assignee_id,
         creator_id=current_user.id,
     )
-    db.add(task)
-    db.commit()
-    db.refresh(task)
-    
-    # Calculate risk score (placeholder for ML integration)
-    # In a real implementation, this would call the ML service
-    task.risk_score = 0.0
+    # Scored before it is stored, so the task is written (and pushed) once;
+    # a new task has no predecessors yet
+    task.risk_score = get_risk_model().predict_risk_for_task(task)
+    task.propagated_risk_score = task.risk_score
     db.add(task)
     db.commit()
     db.refresh(task)
@@ -136,36 +233,53 @@ async def create_task(
 @router.get("/{task_id}", response_model=TaskResponse)
 async def read_task(
     task_id: int,
+    request: Request,
+    fields: str = None,
+    expand: str = None,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db),
 ) -> Any:
     """
     Get a specific task by id.
+    
+    ``fields`` / ``expand`` select the fields and nested dependencies to
+    return; comments are counted, and paged at ``/tasks/{id}/comments``.
+    Supports If-None-Match / If-Modified-Since against the version of the
+    task's project; the task itself is only loaded when it has to be sent.
     """
-    task = db.query(Task).options(
-        joinedload(Task.project),
-        joinedload(Task.dependencies),
-        joinedload(Task.predecessors),
-        joinedload(Task.comments),
-    ).filter(Task.id == task_id).first()
+    selection = select_fields(TaskResponse, fields, expand)
+    row = db.query(Task.project_id, Task.updated_at, Task.created_at).filter(Task.id == task_id).first()
     
-    if not task:
+    if not row:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Task not found",
         )
     
     # Check if user has access to this task's project
-    if current_user.role != "admin" and current_user not in task.project.members:
+    project = db.query(Project).filter(Project.id == row.project_id).first()
+    if current_user.role != "admin" and (project is None or current_user not in project.members):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not enough permissions",
         )
     
-    return task
+    version_key = row.project_id if row.project_id is not None else NO_PROJECT
+    version, changed_at = project_versions(db, [version_key])[version_key]
+    changed_at = changed_at or row.updated_at or row.created_at
+    etag = make_etag("task", task_id, version, selection.key())
+    headers = validator_headers(etag, changed_at)
+    if is_not_modified(request, etag, changed_at):
+        return not_modified(headers)
+    
+    def build() -> bytes:
+        task = db.query(Task).options(*loader_options(Task, selection)).filter(Task.id == task_id).first()
+        return render_selection(TaskResponse, task, selection)
+    
+    return cached_response(version_key, ("task", task_id, selection.key()), version, build, headers)
 
 @router.put("/{task_id}", response_model=TaskResponse)
-async def update_task(
+def update_task(
     task_id: int,
     task_in: TaskUpdate,
     current_user: User = Depends(get_current_active_user),
@@ -173,6 +287,9 @@ async def update_task(
 ) -> Any:
     """
     Update a task.
+    
+    Rescoring runs the risk model and may propagate through the whole
+    project, so the endpoint runs in the threadpool.
     """
     task = db.query(Task).filter(Task.id == task_id).first()
     if not task:
@@ -205,21 +322,27 @@ async def update_task(
                 )
     
     # Update task fields
-    update_data = task_in.dict(exclude_unset=True)
+    update_data = task_in.model_dump(exclude_unset=True)
     for field, value in update_data.items():
         setattr(task, field, value)
     
-    # Recalculate risk score (placeholder for ML integration)
-    # In a real implementation, this would call the ML service
-    # task.risk_score = ml_service.calculate_risk_score(task)
+    # Recalculate risk score
+    previous_risk_score = task.risk_score
+    task.risk_score = get_risk_model().predict_risk_for_task(task)
     
     db.add(task)
+    
+    # Push the new score down the dependency chain, in the same transaction
+    if task.risk_score != previous_risk_score:
+        db.flush()
+        refresh_downstream_risk(db, [task.id])
     db.commit()
+    
     db.refresh(task)
     return task
 
 @router.delete("/{task_id}", response_model=TaskResponse)
-async def delete_task(
+def delete_task(
     task_id: int,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db),
@@ -227,7 +350,7 @@ async def delete_task(
     """
     Delete a task.
     """
-    task = db.query(Task).filter(Task.id == task_id).first()
+    task = db.query(Task).options(undefer(Task.comment_count)).filter(Task.id == task_id).first()
     if not task:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -242,6 +365,124 @@ async def delete_task(
             detail="Not enough permissions",
         )
     
+    # Its successors lose a predecessor along with the dependency rows
+    dependent_ids = [dependency.dependent_task_id for dependency in task.predecessors]
     db.delete(task)
+    db.flush()
+    refresh_downstream_risk(db, dependent_ids)
     db.commit()
     return task
+
+def _get_member_task(db: Session, task_id: int, current_user: User) -> Task:
+    """The task, if the user may see its project; 404 / 403 otherwise."""
+    task = db.query(Task).filter(Task.id == task_id).first()
+    if not task:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Task not found",
+        )
+    
+    project = db.query(Project).filter(Project.id == task.project_id).first()
+    if current_user.role != "admin" and (project is None or current_user not in project.members):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions",
+        )
+    return task
+
+def _get_own_comment(db: Session, task_id: int, comment_id: int, current_user: User) -> TaskComment:
+    """A comment of the task that the user wrote (any comment for admins)."""
+    _get_member_task(db, task_id, current_user)
+    comment = db.query(TaskComment).filter(
+        TaskComment.id == comment_id,
+        TaskComment.task_id == task_id,
+    ).first()
+    if not comment:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Comment not found",
+        )
+    
+    if current_user.role != "admin" and comment.user_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions",
+        )
+    return comment
+
+@router.get("/{task_id}/comments", response_model=TaskCommentPage)
+async def read_task_comments(
+    task_id: int,
+    limit: int = Query(50, ge=1, le=200),
+    after_id: Optional[int] = None,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db),
+) -> Any:
+    """
+    Retrieve a task's comments, oldest first.
+    
+    Pass the returned next_after_id as after_id to get the next page. Pages
+    are read by (task_id, id) from the index, so every page costs the same
+    however long the thread is.
+    """
+    _get_member_task(db, task_id, current_user)
+    query = db.query(TaskComment).filter(TaskComment.task_id == task_id)
+    if after_id is not None:
+        query = query.filter(TaskComment.id > after_id)
+    items = query.order_by(TaskComment.id).limit(limit).all()
+    
+    return {
+        "items": items,
+        "next_after_id": items[-1].id if len(items) == limit else None,
+    }
+
+@router.post("/{task_id}/comments", response_model=TaskCommentResponse)
+async def create_task_comment(
+    task_id: int,
+    comment_in: TaskCommentCreate,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db),
+) -> Any:
+    """
+    Comment on a task.
+    """
+    _get_member_task(db, task_id, current_user)
+    comment = TaskComment(content=comment_in.content, task_id=task_id, user_id=current_user.id)
+    db.add(comment)
+    db.commit()
+    db.refresh(comment)
+    return comment
+
+@router.put("/{task_id}/comments/{comment_id}", response_model=TaskCommentResponse)
+async def update_task_comment(
+    task_id: int,
+    comment_id: int,
+    comment_in: TaskCommentUpdate,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db),
+) -> Any:
+    """
+    Edit a comment. Only its author (or an admin) can.
+    """
+    comment = _get_own_comment(db, task_id, comment_id, current_user)
+    if comment_in.content is not None:
+        comment.content = comment_in.content
+        db.add(comment)
+        db.commit()
+        db.refresh(comment)
+    return comment
+
+@router.delete("/{task_id}/comments/{comment_id}", response_model=TaskCommentResponse)
+async def delete_task_comment(
+    task_id: int,
+    comment_id: int,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db),
+) -> Any:
+    """
+    Delete a comment. Only its author (or an admin) can.
+    """
+    comment = _get_own_comment(db, task_id, comment_id, current_user)
+    db.delete(comment)
+    db.commit()
+    return comment
@@ -97,7 +97,7 @@ async def update_user(
             detail="The user doesn't have enough privileges",
         )
     
-    update_data = user_in.dict(exclude_unset=True)
+    update_data = user_in.model_dump(exclude_unset=True)
     if "password" in update_data and update_data["password"]:
         update_data["hashed_password"] = get_password_hash(update_data["password"])
         del update_data["password"]
@@ -0,0 +1,165 @@
+"""
+Sparse fieldsets for read endpoints.
+
+``?fields=`` picks the fields of a response (dotted paths reach into nested
+objects, e.g. ``tasks.title``) and ``?expand=`` picks the nested
+relationships to include (e.g. ``tasks,tasks.dependencies``). Without either
+parameter responses are complete, as before. With either, nested
+relationships are only included when named, so ``?expand=`` alone is a
+summary of the plain fields.
+
+The ORM loader options come from the same selection: only requested columns
+are loaded and only requested relationships are eager-loaded, so nothing
+else is ever queried or serialized.
+"""
+import enum
+import functools
+import typing
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+from fastapi import HTTPException, status
+from pydantic import BaseModel
+from sqlalchemy import inspect
+from sqlalchemy.orm import load_only, selectinload
+
+from app.api.serialization import dumps, render
+
+
+@dataclass(frozen=True)
+class Selection:
+    """Fields of one response schema to include, with nested selections."""
+    scalars: Tuple[str, ...]
+    nested: Dict[str, "Selection"] = field(default_factory=dict)
+
+    def key(self) -> Tuple:
+        """Hashable form, for ETags and cache keys."""
+        return (self.scalars, tuple(sorted((name, sub.key()) for name, sub in self.nested.items())))
+
+
+def relationships(schema: Type[BaseModel]) -> Dict[str, Type[BaseModel]]:
+    """Nested list fields of a schema, with the schema of their items."""
+    nested = {}
+    for name, info in schema.model_fields.items():
+        if typing.get_origin(info.annotation) in (list, List):
+            (item,) = typing.get_args(info.annotation)
+            if isinstance(item, type) and issubclass(item, BaseModel):
+                nested[name] = item
+    return nested
+
+
+def _scalars(schema: Type[BaseModel]) -> Tuple[str, ...]:
+    nested = relationships(schema)
+    return tuple(name for name in schema.model_fields if name not in nested)
+
+
+@functools.lru_cache(maxsize=None)
+def full_selection(schema: Type[BaseModel]) -> Selection:
+    """Everything a schema contains."""
+    return Selection(
+        scalars=_scalars(schema),
+        nested={name: full_selection(item) for name, item in relationships(schema).items()},
+    )
+
+
+def _split(value: Optional[str]) -> List[List[str]]:
+    return [path.strip().split(".") for path in (value or "").split(",") if path.strip()]
+
+
+def _build(schema: Type[BaseModel], fields: List[List[str]], expand: List[List[str]], prefix: str) -> Selection:
+    nested_schemas = relationships(schema)
+    scalars = set()
+    nested_fields: Dict[str, List[List[str]]] = {}
+    nested_expand: Dict[str, List[List[str]]] = {}
+
+    for path in fields:
+        name = path[0]
+        if name in nested_schemas:
+            nested_fields.setdefault(name, [])
+            if path[1:]:
+                nested_fields[name].append(path[1:])
+        elif name in schema.model_fields and len(path) == 1:
+            scalars.add(name)
+        else:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unknown field: {prefix}{'.'.join(path)}",
+            )
+    for path in expand:
+        name = path[0]
+        if name not in nested_schemas:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Cannot expand: {prefix}{'.'.join(path)}",
+            )
+        nested_expand.setdefault(name, [])
+        if path[1:]:
+            nested_expand[name].append(path[1:])
+
+    if scalars:
+        if "id" in schema.model_fields:
+            scalars.add("id")
+        ordered = tuple(name for name in _scalars(schema) if name in scalars)
+    else:
+        ordered = _scalars(schema)
+    return Selection(
+        scalars=ordered,
+        nested={
+            name: _build(item, nested_fields.get(name, []), nested_expand.get(name, []), f"{prefix}{name}.")
+            for name, item in nested_schemas.items()
+            if name in nested_fields or name in nested_expand
+        },
+    )
+
+
+def select_fields(schema: Type[BaseModel], fields: Optional[str], expand: Optional[str]) -> Selection:
+    """
+    Selection for the ``fields`` / ``expand`` query parameters.
+
+    Raises:
+        HTTPException: 400 for names the schema does not have
+    """
+    if fields is None and expand is None:
+        return full_selection(schema)
+    return _build(schema, _split(fields), _split(expand), "")
+
+
+def loader_options(model: Any, selection: Selection) -> List[Any]:
+    """Query options loading exactly the columns and relationships selected."""
+    mapper = inspect(model)
+    columns = [
+        getattr(model, name) for name in selection.scalars
+        if name in mapper.column_attrs
+    ]
+    options: List[Any] = [load_only(*columns)] if columns else []
+    for name, sub in selection.nested.items():
+        relationship = mapper.relationships[name]
+        options.append(selectinload(getattr(model, name)).options(*loader_options(relationship.mapper.class_, sub)))
+    return options
+
+
+def _plain(value: Any) -> Any:
+    return value.value if isinstance(value, enum.Enum) else value
+
+
+def to_dict(obj: Any, selection: Selection) -> Dict[str, Any]:
+    """The selected fields of an ORM object, nested selections included."""
+    data = {name: _plain(getattr(obj, name)) for name in selection.scalars}
+    for name, sub in selection.nested.items():
+        data[name] = [to_dict(item, sub) for item in getattr(obj, name)]
+    return data
+
+
+def render_selection(schema: Any, obj: Any, selection: Selection) -> bytes:
+    """
+    JSON of the selected fields of one ORM object or a list of them.
+
+    Complete selections go through the response schema as usual; partial
+    ones are encoded straight from the loaded attributes.
+    """
+    item_schema = typing.get_args(schema)[0] if typing.get_origin(schema) in (list, List) else schema
+    if selection == full_selection(item_schema):
+        return render(schema, obj)
+    if isinstance(obj, list):
+        return dumps([to_dict(item, selection) for item in obj])
+    return dumps(to_dict(obj, selection))
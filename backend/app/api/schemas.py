@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field, EmailStr, validator
+from pydantic import BaseModel, ConfigDict, Field, EmailStr, validator
 from typing import Optional, List, Dict, Any, Union
 from datetime import datetime
 from enum import Enum
@@ -86,8 +86,8 @@ class TaskCreate(TaskBase):
 class TaskDependencyCreate(TaskDependencyBase):
     pass
 
-class TaskCommentCreate(TaskCommentBase):
-    pass
+class TaskCommentCreate(BaseModel):
+    content: str
 
 class NotificationCreate(NotificationBase):
     pass
@@ -144,48 +144,44 @@ class UserResponse(UserBase):
     created_at: datetime
     updated_at: Optional[datetime] = None
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class TaskDependencyResponse(TaskDependencyBase):
     id: int
     created_at: datetime
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class TaskCommentResponse(TaskCommentBase):
     id: int
     created_at: datetime
+    updated_at: Optional[datetime] = None
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class NotificationResponse(NotificationBase):
     id: int
     created_at: datetime
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class BudgetEntryResponse(BudgetEntryBase):
     id: int
     created_at: datetime
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class TaskResponse(TaskBase):
     id: int
     risk_score: float
+    propagated_risk_score: Optional[float] = None
     creator_id: int
     created_at: datetime
     updated_at: Optional[datetime] = None
     dependencies: List[TaskDependencyResponse] = []
-    comments: List[TaskCommentResponse] = []
+    comment_count: int = 0  # the thread itself is paged at /tasks/{id}/comments
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class ProjectResponse(ProjectBase):
     id: int
@@ -194,8 +190,7 @@ class ProjectResponse(ProjectBase):
     members: List[UserResponse] = []
     tasks: List[TaskResponse] = []
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 # Token schemas
 class Token(BaseModel):
@@ -219,3 +214,200 @@ class RiskPredictionResponse(BaseModel):
     risk_level: str
     contributing_factors: Dict[str, float]
     mitigation_suggestions: List[str]
+
+class RiskPropagationResponse(BaseModel):
+    project_id: int
+    task_count: int
+    updated_count: int
+    max_propagated_risk: float
+    mean_propagated_risk: float
+
+# Escalation schemas
+class EscalationRunResponse(BaseModel):
+    started_at: datetime
+    first_run: bool
+    candidates: int
+    escalations: int
+    notifications: int
+    by_level: Dict[int, int]
+    scan_ms: float
+    write_ms: float
+    total_ms: float
+
+# Notification inbox schemas
+class NotificationPage(BaseModel):
+    items: List[NotificationResponse]
+    next_before_id: Optional[int] = None  # pass as before_id to fetch the next page
+    unread_count: int
+
+class UnreadCountResponse(BaseModel):
+    unread_count: int
+
+class NotificationReadAllResponse(BaseModel):
+    updated_count: int
+    unread_count: int
+
+# Budget rollup schemas
+class BudgetFigures(BaseModel):
+    planned: float
+    actual: float
+    forecast: float
+    variance: float  # planned - actual
+    variance_pct: Optional[float] = None
+
+class BudgetCategorySummary(BudgetFigures):
+    category: str
+
+class BudgetPeriodSummary(BudgetFigures):
+    period_start: str
+    cumulative_planned: float
+    cumulative_actual: float
+    cumulative_forecast: float
+
+class BudgetBurnRate(BaseModel):
+    per_day: Optional[float] = None
+    per_bucket: Optional[float] = None
+    remaining_budget: Optional[float] = None
+    days_remaining: Optional[float] = None
+    projected_exhaustion_date: Optional[datetime] = None
+
+class BudgetSummaryResponse(BaseModel):
+    project_id: int
+    bucket: str
+    budget: Optional[float] = None
+    totals: BudgetFigures
+    categories: List[BudgetCategorySummary]
+    periods: List[BudgetPeriodSummary]
+    burn_rate: BudgetBurnRate
+
+# Project stats schemas
+class ProjectStatsResponse(BaseModel):
+    project_id: int
+    task_count: int
+    status_counts: Dict[str, int]
+    estimated_hours: float
+    actual_hours: float
+    average_completion: float
+    high_risk_count: int
+
+# Budget forecast schemas
+class BudgetScenario(BaseModel):
+    name: Optional[str] = None
+    delays: Dict[int, float] = {}  # task id -> slip in days
+
+class BudgetForecastRequest(BaseModel):
+    scenarios: List[BudgetScenario] = Field([], max_length=100)
+    simulations: int = Field(1000, ge=0, le=20000)
+    slip_fraction: float = Field(0.25, gt=0, le=5)
+    hourly_cost: Optional[float] = Field(None, ge=0)
+    daily_overhead: Optional[float] = Field(None, ge=0)
+    seed: Optional[int] = None
+
+class BudgetScenarioResult(BaseModel):
+    name: str
+    extension_days: float
+    finish_date: datetime
+    absorbed_cost: float
+    extension_cost: float
+    overrun: float
+
+class BudgetSimulationSummary(BaseModel):
+    runs: int
+    mean_overrun: float
+    p50_overrun: float
+    p90_overrun: float
+    p95_overrun: float
+    mean_extension_days: float
+    probability_of_extension: float
+
+class TaskBudgetImpact(BaseModel):
+    task_id: int
+    slack_days: float
+    slip_probability: float
+    impact_if_slipped: float
+    expected_overrun: float
+
+class BudgetForecastResponse(BaseModel):
+    project_id: int
+    hourly_cost: float
+    hourly_cost_source: str
+    daily_overhead: float
+    baseline_finish_date: datetime
+    baseline_remaining_days: float
+    critical_task_ids: List[int]
+    unknown_task_ids: List[int]
+    scenarios: List[BudgetScenarioResult]
+    simulation: Optional[BudgetSimulationSummary] = None
+    tasks: List[TaskBudgetImpact]
+
+# Time series schemas
+class TimeSeriesResponse(BaseModel):
+    project_id: int
+    series: str
+    method: str
+    total_points: int
+    timestamps: List[float]  # epoch seconds
+    values: List[float]
+
+# Delta sync schemas
+class Tombstone(BaseModel):
+    entity: str  # "task", "dependency" or "comment"
+    id: int
+    seq: int
+
+class ProjectChangesResponse(BaseModel):
+    cursor: int  # pass as ``since`` on the next poll
+    has_more: bool
+    reset: bool  # reload everything, then poll from ``cursor``
+    tasks: List[TaskResponse]
+    dependencies: List[TaskDependencyResponse]
+    comments: List[TaskCommentResponse]
+    deleted: List[Tombstone]
+
+# Search schemas
+class SearchHit(BaseModel):
+    type: str  # "task" or "comment"
+    task_id: int
+    comment_id: Optional[int] = None
+    project_id: int
+    title: Optional[str] = None  # of the task
+    title_highlight: str  # title, HTML-escaped, matches wrapped in <mark>
+    snippet: str  # of the description or comment, escaped and marked the same way
+    score: float  # higher is better
+
+class SearchResponse(BaseModel):
+    query: str
+    terms: List[str]
+    items: List[SearchHit]
+
+# Comment thread schemas
+class TaskCommentPage(BaseModel):
+    items: List[TaskCommentResponse]
+    next_after_id: Optional[int] = None  # pass as after_id to fetch the next page
+
+# Background job schemas
+class JobCreate(BaseModel):
+    kind: str
+    payload: Dict[str, Any] = {}
+    priority: int = 0  # higher runs first
+    dedup_key: Optional[str] = None  # returns the queued or running job with this key instead
+    max_attempts: Optional[int] = Field(None, ge=1, le=20)
+
+class JobResponse(BaseModel):
+    id: int
+    kind: str
+    status: str  # "queued", "running", "succeeded" or "failed"
+    priority: int
+    payload: Dict[str, Any]
+    dedup_key: Optional[str] = None
+    attempts: int
+    max_attempts: int
+    progress: float  # 0..1
+    progress_message: Optional[str] = None
+    result: Optional[Any] = None
+    error: Optional[str] = None  # last failure, also kept while a retry is queued
+    created_by: Optional[int] = None
+    created_at: datetime
+    run_after: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
@@ -0,0 +1,56 @@
+"""
+Fast JSON encoding of responses.
+
+Returning ORM objects from an endpoint makes FastAPI validate them against
+the ``response_model`` object by object and then re-encode the result in
+Python. Hot list endpoints instead encode through a ``TypeAdapter`` built
+once per schema, which validates from attributes and writes JSON bytes in
+one pass (pydantic-core), and return those bytes as the response body.
+
+orjson is optional: when installed, plain data is encoded with it and it
+backs the app's default response class.
+"""
+from typing import Any, Dict
+
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+from pydantic_core import to_json
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+if orjson is not None:
+    from fastapi.responses import ORJSONResponse as DefaultResponse
+else:
+    DefaultResponse = JSONResponse
+
+_adapters: Dict[Any, TypeAdapter] = {}
+
+
+def adapter(schema: Any) -> TypeAdapter:
+    """The TypeAdapter of a schema (or ``List[schema]``), built once."""
+    cached = _adapters.get(schema)
+    if cached is None:
+        cached = _adapters[schema] = TypeAdapter(schema)
+    return cached
+
+
+def render(schema: Any, obj: Any) -> bytes:
+    """Validate ORM objects against a response schema and encode them as JSON."""
+    schema_adapter = adapter(schema)
+    return schema_adapter.dump_json(schema_adapter.validate_python(obj, from_attributes=True))
+
+
+def dumps(data: Any) -> bytes:
+    """Encode plain data (dicts, lists, datetimes) as JSON."""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+    return to_json(data)
+
+
+def json_response(schema: Any, obj: Any, headers: Dict[str, str] = None) -> Response:
+    """Response with ORM objects encoded through their schema's adapter."""
+    return Response(content=render(schema, obj), media_type="application/json", headers=headers)
@@ -0,0 +1,273 @@
+"""
+Admission control and load shedding.
+
+Every HTTP request is put in a cost class before it reaches the app:
+
+- ``exempt``: health, readiness and metrics probes; never limited.
+- ``heavy``: routes that score, simulate or aggregate a whole project
+  (``HEAVY_ROUTES``); few run at a time.
+- ``interactive``: everything else.
+
+Each class has its own concurrency limit and a bounded FIFO wait queue, so a
+burst of heavy calls waits in its own queue instead of in front of cheap
+ones. A request that finds the queue full, or waits longer than the class
+allows, is shed with 503 and a ``Retry-After`` estimated from the recent
+service time of the class.
+
+The heavy handlers are plain ``def`` endpoints, or only await while they
+wait, so they run on the threadpool: a full heavy class never holds up the
+event loop that serves the interactive one.
+
+Callers also get a token bucket, keyed by the JWT subject (the client address
+for anonymous calls); a request costs the tokens of its class and is
+rejected with 429 and ``Retry-After`` when the bucket is empty. The token is
+only decoded here, not checked against the database; authentication still
+happens in the endpoint.
+
+Queue depth, in-flight requests, waits and rejections are exported through
+the metrics registry per class.
+"""
+import asyncio
+import math
+import re
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from typing import Deque, Dict, List, Optional, Pattern, Tuple
+
+from jose import JWTError, jwt
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.api.serialization import dumps
+from app.core.config import settings
+from app.core.metrics import Counter, Gauge, Histogram, registry
+
+EXEMPT, INTERACTIVE, HEAVY = "exempt", "interactive", "heavy"
+
+_API = re.escape(settings.API_V1_STR)
+
+# (method, path) of the heavy routes; everything else except the probes is interactive
+HEAVY_ROUTES: List[Tuple[str, Pattern]] = [
+    (method, re.compile(pattern)) for method, pattern in (
+        ("POST", rf"{_API}/risk-prediction/project/\d+/propagate"),
+        ("GET", rf"{_API}/risk-prediction/project/\d+/timeseries"),
+        ("GET", rf"{_API}/projects/\d+/graph"),
+        ("GET", rf"{_API}/projects/\d+/budget/timeseries"),
+        ("POST", rf"{_API}/projects/\d+/budget/forecast"),
+        ("POST", rf"{_API}/escalations/run"),
+        ("GET", rf"{_API}/admin/profile"),
+    )
+]
+
+EXEMPT_PATHS = frozenset({"/", "/health", "/ready", "/metrics"})
+
+admission_in_flight = registry.register(Gauge(
+    "admission_in_flight", "Admitted requests being served.", ("cost_class",),
+))
+admission_queue_depth = registry.register(Gauge(
+    "admission_queue_depth", "Requests waiting for admission.", ("cost_class",),
+))
+admission_wait = registry.register(Histogram(
+    "admission_wait_seconds", "Time requests waited for admission.", ("cost_class",),
+))
+admission_rejected = registry.register(Counter(
+    "admission_rejected_total", "Requests shed by admission control.", ("cost_class", "reason"),
+))
+
+
+def cost_class(method: str, path: str) -> str:
+    if path in EXEMPT_PATHS:
+        return EXEMPT
+    for heavy_method, pattern in HEAVY_ROUTES:
+        if method == heavy_method and pattern.fullmatch(path):
+            return HEAVY
+    return INTERACTIVE
+
+
+@dataclass
+class CostClass:
+    name: str
+    tokens: float  # taken from the caller's bucket per request
+    concurrency: int
+    queue_size: int
+    max_wait: float  # seconds in the queue before the request is shed
+
+
+class ConcurrencyLimiter:
+    """
+    At most ``concurrency`` requests of a class at a time, the next
+    ``queue_size`` waiting in arrival order. Runs on the event loop only.
+    """
+    def __init__(self, cost: CostClass):
+        self.cost = cost
+        self.active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._service_time = 0.05  # moving average, seconds
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    def retry_after(self) -> int:
+        """Seconds until the queue ahead is likely to have drained."""
+        backlog = self.waiting + 1
+        return max(1, math.ceil(self._service_time * backlog / self.cost.concurrency))
+
+    async def acquire(self) -> Optional[str]:
+        """Take a slot; the reason ("queue_full" or "timeout") when shed."""
+        if self.active < self.cost.concurrency and not self._waiters:
+            self.active += 1
+            return None
+        if len(self._waiters) >= self.cost.queue_size:
+            return "queue_full"
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        admission_queue_depth.inc(self.cost.name)
+        try:
+            # The slot is handed over by release() resolving the future
+            await asyncio.wait_for(waiter, self.cost.max_wait)
+            return None
+        except asyncio.TimeoutError:
+            return "timeout"
+        except asyncio.CancelledError:
+            # Client went away; pass on a slot that was handed over meanwhile
+            if waiter.done() and not waiter.cancelled():
+                self.release(0.0)
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+            admission_queue_depth.dec(self.cost.name)
+
+    def release(self, service_time: float) -> None:
+        self._service_time += 0.1 * (service_time - self._service_time)
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)  # the slot goes to the waiter; active is unchanged
+                return
+        self.active -= 1
+
+
+class TokenBuckets:
+    """
+    Per-caller token buckets refilled at ``rate`` tokens a second up to
+    ``burst``. The least recently seen callers are forgotten beyond
+    ``max_callers``; a forgotten caller starts with a full bucket.
+    """
+    def __init__(self, rate: float, burst: float, max_callers: int = 10000):
+        self.rate = rate
+        self.burst = burst
+        self.max_callers = max_callers
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()  # tokens, updated
+
+    def take(self, caller: str, tokens: float) -> float:
+        """Take tokens; 0 when granted, else the seconds until they are available."""
+        now = time.monotonic()
+        available, updated = self._buckets.pop(caller, (self.burst, now))
+        available = min(self.burst, available + (now - updated) * self.rate)
+        wait = 0.0
+        if available >= tokens:
+            available -= tokens
+        else:
+            wait = (tokens - available) / self.rate
+        self._buckets[caller] = (available, now)
+        if len(self._buckets) > self.max_callers:
+            self._buckets.popitem(last=False)
+        return wait
+
+
+def caller_key(scope: Scope) -> str:
+    """JWT subject of the request, or the client address when there is none."""
+    scheme, _, token = Headers(scope=scope).get("authorization", "").partition(" ")
+    if scheme.lower() == "bearer" and token:
+        try:
+            subject = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]).get("sub")
+        except JWTError:
+            subject = None
+        if subject:
+            return f"user:{subject}"
+    client = scope.get("client")
+    return f"addr:{client[0]}" if client else "addr:unknown"
+
+
+async def _reject(send: Send, status_code: int, detail: str, retry_after: int) -> None:
+    await send({
+        "type": "http.response.start",
+        "status": status_code,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"retry-after", str(retry_after).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": dumps({"detail": detail})})
+
+
+class AdmissionMiddleware:
+    """Rate-limits callers and bounds the concurrency of each cost class."""
+    def __init__(
+        self,
+        app: ASGIApp,
+        classes: Dict[str, CostClass],
+        user_rate: float = 0.0,
+        user_burst: float = 0.0,
+    ):
+        self.app = app
+        self.limiters = {name: ConcurrencyLimiter(cost) for name, cost in classes.items()}
+        # A rate of 0 turns per-caller limits off
+        self.buckets = TokenBuckets(user_rate, user_burst) if user_rate > 0 else None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        name = cost_class(scope["method"], scope["path"])
+        limiter = self.limiters.get(name)
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+
+        if self.buckets is not None:
+            wait = self.buckets.take(caller_key(scope), limiter.cost.tokens)
+            if wait:
+                admission_rejected.inc(name, "rate_limited")
+                await _reject(send, 429, "Too many requests", math.ceil(wait))
+                return
+
+        queued = time.perf_counter()
+        reason = await limiter.acquire()
+        admission_wait.observe(time.perf_counter() - queued, name)
+        if reason is not None:
+            admission_rejected.inc(name, reason)
+            await _reject(send, 503, "Server busy, retry later", limiter.retry_after())
+            return
+
+        admission_in_flight.inc(name)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            admission_in_flight.dec(name)
+            limiter.release(time.perf_counter() - started)
+
+
+def default_classes() -> Dict[str, CostClass]:
+    """Cost classes from the settings."""
+    return {
+        INTERACTIVE: CostClass(
+            INTERACTIVE,
+            tokens=1,
+            concurrency=settings.ADMISSION_INTERACTIVE_CONCURRENCY,
+            queue_size=settings.ADMISSION_INTERACTIVE_QUEUE,
+            max_wait=settings.ADMISSION_INTERACTIVE_MAX_WAIT_SECONDS,
+        ),
+        HEAVY: CostClass(
+            HEAVY,
+            tokens=settings.ADMISSION_HEAVY_TOKENS,
+            concurrency=settings.ADMISSION_HEAVY_CONCURRENCY,
+            queue_size=settings.ADMISSION_HEAVY_QUEUE,
+            max_wait=settings.ADMISSION_HEAVY_MAX_WAIT_SECONDS,
+        ),
+    }
@@ -0,0 +1,63 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+_MISSING = object()
+
+
+class ProjectCache:
+    """
+    Small LRU cache of derived per-project data.
+
+    Entries are grouped by project so that a write can drop everything
+    derived from one project at once. Entries also expire after ``ttl``
+    seconds, which bounds staleness from writes made by other worker
+    processes.
+
+    A value computed while a write was committing must not be cached, so
+    callers take ``generation()`` before computing and pass it to ``set``,
+    which ignores the value if the project was invalidated in between.
+    """
+    def __init__(self, max_entries: int = 1024, ttl: float = 60.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[Tuple[int, Hashable], Tuple[float, Any]]" = OrderedDict()
+        self._generations: Dict[Optional[int], int] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, project_id: int, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get((project_id, key), _MISSING)
+            if entry is _MISSING or time.monotonic() - entry[0] > self.ttl:
+                self.misses += 1
+                return default
+            self._entries.move_to_end((project_id, key))
+            self.hits += 1
+            return entry[1]
+
+    def generation(self, project_id: int) -> Tuple[int, int]:
+        with self._lock:
+            return self._generations.get(None, 0), self._generations.get(project_id, 0)
+
+    def set(self, project_id: int, key: Hashable, value: Any, generation: Optional[Tuple[int, int]] = None) -> None:
+        with self._lock:
+            current = (self._generations.get(None, 0), self._generations.get(project_id, 0))
+            if generation is not None and generation != current:
+                return
+            self._entries[(project_id, key)] = (time.monotonic(), value)
+            self._entries.move_to_end((project_id, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, project_id: Optional[int] = None) -> None:
+        """Drop the entries of one project, or all of them."""
+        with self._lock:
+            self._generations[project_id] = self._generations.get(project_id, 0) + 1
+            if project_id is None:
+                self._entries.clear()
+                return
+            for cache_key in [k for k in self._entries if k[0] == project_id]:
+                del self._entries[cache_key]
@@ -0,0 +1,120 @@
+"""
+Response compression.
+
+Compresses response bodies of at least ``minimum_size`` bytes with brotli
+when the client accepts it and the ``brotli`` package is installed, and with
+gzip otherwise. Small bodies, already encoded bodies and media types that
+do not compress (images, archives, binary payloads) are passed through.
+"""
+import zlib
+from typing import List, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/javascript", "application/xml", "image/svg+xml")
+
+
+def _accepted(accept_encoding: str) -> List[str]:
+    accepted = []
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        if params.strip().replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        accepted.append(name.strip().lower())
+    return accepted
+
+
+class _Compressor:
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=brotli_quality)
+            self._compress = self._compressor.process
+            self._flush = self._compressor.finish
+        else:
+            # wbits=31 writes a gzip header and trailer
+            self._compressor = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+            self._compress = self._compressor.compress
+            self._flush = self._compressor.flush
+
+    def compress(self, data: bytes, last: bool) -> bytes:
+        out = self._compress(data)
+        return out + self._flush() if last else out
+
+
+class CompressionMiddleware:
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    def _encoding(self, scope: Scope) -> Optional[str]:
+        accepted = _accepted(Headers(scope=scope).get("accept-encoding", ""))
+        if brotli is not None and "br" in accepted:
+            return "br"
+        if "gzip" in accepted:
+            return "gzip"
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        encoding = self._encoding(scope) if scope["type"] == "http" else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Optional[Message] = None
+        compressor: Optional[_Compressor] = None
+        passthrough = False
+
+        async def send_compressed(message: Message) -> None:
+            nonlocal start, compressor, passthrough
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if compressor is None:
+                headers = MutableHeaders(raw=start["headers"])
+                compressible = (
+                    "content-encoding" not in headers
+                    and headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES)
+                    and (more_body or len(body) >= self.minimum_size)
+                )
+                if not compressible:
+                    passthrough = True
+                    await send(start)
+                    await send(message)
+                    return
+
+                compressor = _Compressor(encoding, self.gzip_level, self.brotli_quality)
+                headers["Content-Encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                if "etag" in headers and not headers["etag"].startswith("W/"):
+                    # The encoded body is a different representation
+                    headers["ETag"] = "W/" + headers["etag"]
+                compressed = compressor.compress(body, last=not more_body)
+                if more_body:
+                    del headers["Content-Length"]
+                else:
+                    headers["Content-Length"] = str(len(compressed))
+                await send(start)
+                await send({"type": "http.response.body", "body": compressed, "more_body": more_body})
+                return
+
+            await send({
+                "type": "http.response.body",
+                "body": compressor.compress(body, last=not more_body),
+                "more_body": more_body,
+            })
+
+        await self.app(scope, receive, send_compressed)
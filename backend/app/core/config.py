@@ -1,6 +1,7 @@
 from pydantic_settings import BaseSettings
 from typing import Optional, Dict, Any, List
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -20,8 +21,82 @@ class Settings(BaseSettings):
     # CORS settings
     BACKEND_CORS_ORIGINS: List[str] = ["http://localhost:3000", "http://localhost:3001", "http://localhost:3002", "http://localhost:3003", "http://localhost:8000"]
     
+    # Create missing tables on startup; turn off when running "python -m app.db.migrate" at deploy time
+    AUTO_MIGRATE: bool = os.getenv("AUTO_MIGRATE", "true").lower() == "true"
+    
     # ML model settings
     MODEL_PATH: str = os.getenv("MODEL_PATH", "./app/ml/models")
+    # Saved risk model; replacing the file is picked up by app.serve without a restart
+    RISK_MODEL_FILE: str = os.getenv("RISK_MODEL_FILE", os.path.join(MODEL_PATH, "risk_model.joblib"))
+    # Build the risk model in the background at startup instead of on first use
+    RISK_MODEL_WARMUP: bool = os.getenv("RISK_MODEL_WARMUP", "true").lower() == "true"
+    # Risk trend: propagation passes within this long of a project's last snapshot update it instead of adding one
+    RISK_SNAPSHOT_INTERVAL_SECONDS: float = float(os.getenv("RISK_SNAPSHOT_INTERVAL_SECONDS", "900"))
+    
+    # Notification scheduler settings (run the scheduler in one process only)
+    SCHEDULER_ENABLED: bool = os.getenv("SCHEDULER_ENABLED", "true").lower() == "true"
+    SCHEDULER_TICK_SECONDS: float = float(os.getenv("SCHEDULER_TICK_SECONDS", "30"))
+    SCHEDULER_MAX_PENDING: int = int(os.getenv("SCHEDULER_MAX_PENDING", "100000"))
+    REMINDER_OFFSETS_HOURS: List[float] = [24.0, 1.0]
+    ESCALATION_INTERVAL_SECONDS: float = float(os.getenv("ESCALATION_INTERVAL_SECONDS", "300"))
+    PROJECT_STATS_RECONCILE_SECONDS: float = float(os.getenv("PROJECT_STATS_RECONCILE_SECONDS", "3600"))
+    UNREAD_COUNTER_RECONCILE_SECONDS: float = float(os.getenv("UNREAD_COUNTER_RECONCILE_SECONDS", "3600"))
+    CHANGE_LOG_PRUNE_SECONDS: float = float(os.getenv("CHANGE_LOG_PRUNE_SECONDS", "3600"))
+    CHANGE_LOG_RETENTION_DAYS: float = float(os.getenv("CHANGE_LOG_RETENTION_DAYS", "30"))
+    RISK_SNAPSHOT_PRUNE_SECONDS: float = float(os.getenv("RISK_SNAPSHOT_PRUNE_SECONDS", "3600"))
+    RISK_SNAPSHOT_RETENTION_DAYS: float = float(os.getenv("RISK_SNAPSHOT_RETENTION_DAYS", "365"))
+    
+    # Durable job queue (app.core.jobs); every worker process claims jobs from the shared table
+    JOBS_ENABLED: bool = os.getenv("JOBS_ENABLED", "true").lower() == "true"
+    JOB_CONCURRENCY: int = int(os.getenv("JOB_CONCURRENCY", "2"))
+    JOB_POLL_SECONDS: float = float(os.getenv("JOB_POLL_SECONDS", "1"))
+    JOB_MAX_ATTEMPTS: int = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+    JOB_RETRY_BASE_SECONDS: float = float(os.getenv("JOB_RETRY_BASE_SECONDS", "10"))
+    JOB_RETRY_MAX_SECONDS: float = float(os.getenv("JOB_RETRY_MAX_SECONDS", "600"))
+    JOB_STALE_SECONDS: float = float(os.getenv("JOB_STALE_SECONDS", "120"))
+    JOB_SHUTDOWN_TIMEOUT_SECONDS: float = float(os.getenv("JOB_SHUTDOWN_TIMEOUT_SECONDS", "20"))
+    JOB_RETENTION_DAYS: float = float(os.getenv("JOB_RETENTION_DAYS", "7"))
+    JOB_PRUNE_SECONDS: float = float(os.getenv("JOB_PRUNE_SECONDS", "3600"))
+
+    # WebSocket push settings; use the "database" broker when running several workers
+    REALTIME_BROKER: str = os.getenv("REALTIME_BROKER", "memory")
+    REALTIME_QUEUE_SIZE: int = int(os.getenv("REALTIME_QUEUE_SIZE", "1000"))
+    REALTIME_POLL_SECONDS: float = float(os.getenv("REALTIME_POLL_SECONDS", "0.5"))
+    
+    # Development only: report requests repeating near-identical queries
+    # (N+1) and attach query plans to slow SELECTs
+    QUERY_DEBUG: bool = os.getenv("QUERY_DEBUG", "false").lower() == "true"
+    QUERY_DEBUG_RAISE: bool = os.getenv("QUERY_DEBUG_RAISE", "false").lower() == "true"
+    N_PLUS_ONE_THRESHOLD: int = int(os.getenv("N_PLUS_ONE_THRESHOLD", "10"))
+    SLOW_QUERY_MS: float = float(os.getenv("SLOW_QUERY_MS", "100"))
+    
+    # Metrics of several worker processes: each writes its samples to this directory and /metrics
+    # serves their sum (app.serve uses a temporary directory when unset)
+    METRICS_DIR: str = os.getenv("METRICS_DIR", "")
+    METRICS_FLUSH_SECONDS: float = float(os.getenv("METRICS_FLUSH_SECONDS", "5"))
+    
+    # Profiles of requests sent with "X-Profile: 1", shared by the workers of a host
+    PROFILE_DIR: str = os.getenv("PROFILE_DIR", os.path.join(tempfile.gettempdir(), "foresightpm-profiles"))
+    
+    # Admission control (app.core.admission): concurrency, queue and wait limits per cost class,
+    # and a token bucket per caller (tokens a second, 0 turns it off)
+    ADMISSION_ENABLED: bool = os.getenv("ADMISSION_ENABLED", "true").lower() == "true"
+    ADMISSION_INTERACTIVE_CONCURRENCY: int = int(os.getenv("ADMISSION_INTERACTIVE_CONCURRENCY", "32"))
+    ADMISSION_INTERACTIVE_QUEUE: int = int(os.getenv("ADMISSION_INTERACTIVE_QUEUE", "128"))
+    ADMISSION_INTERACTIVE_MAX_WAIT_SECONDS: float = float(os.getenv("ADMISSION_INTERACTIVE_MAX_WAIT_SECONDS", "2"))
+    ADMISSION_HEAVY_CONCURRENCY: int = int(os.getenv("ADMISSION_HEAVY_CONCURRENCY", "2"))
+    ADMISSION_HEAVY_QUEUE: int = int(os.getenv("ADMISSION_HEAVY_QUEUE", "8"))
+    ADMISSION_HEAVY_MAX_WAIT_SECONDS: float = float(os.getenv("ADMISSION_HEAVY_MAX_WAIT_SECONDS", "15"))
+    ADMISSION_HEAVY_TOKENS: float = float(os.getenv("ADMISSION_HEAVY_TOKENS", "10"))
+    ADMISSION_USER_RATE: float = float(os.getenv("ADMISSION_USER_RATE", "20"))
+    ADMISSION_USER_BURST: float = float(os.getenv("ADMISSION_USER_BURST", "200"))
+    
+    # Responses smaller than this are sent uncompressed
+    COMPRESSION_MINIMUM_SIZE: int = int(os.getenv("COMPRESSION_MINIMUM_SIZE", "1024"))
+    
+    # In-process cache of serialized project/task read responses
+    RESPONSE_CACHE_SIZE: int = int(os.getenv("RESPONSE_CACHE_SIZE", "512"))
+    RESPONSE_CACHE_TTL_SECONDS: float = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "300"))
     
     class Config:
         case_sensitive = True
@@ -0,0 +1,461 @@
+"""
+Durable background jobs.
+
+Jobs are rows of the ``jobs`` table, so they survive restarts and are shared
+by every worker process. ``enqueue`` adds one; the ``JobWorker`` of each
+process claims queued jobs, highest priority first, and runs their handlers
+on its own thread pool, off the event loop and the request path.
+
+A job is claimed with a conditional UPDATE (``WHERE status = 'queued'``) of
+the next candidate, so two processes never run the same job and no
+database-specific locking is needed. A failed job is queued again with
+exponential backoff until it has used ``max_attempts``. Running jobs send a
+heartbeat; a job whose process died is queued again (or failed) once its
+heartbeat is older than ``JOB_STALE_SECONDS``.
+
+A dedup key makes ``enqueue`` return the job already queued or running under
+that key instead of adding another one; a partial unique index enforces it
+across processes.
+
+Handlers are registered per kind with ``job_handler`` and called as
+``handler(db, job)`` with a fresh session, which is committed when the
+handler returns. ``job.progress(fraction, message)`` is written right away
+in its own transaction and shows in ``GET /jobs/{id}``. A job may run again
+after a crash or an interrupted shutdown, so handlers must be idempotent.
+"""
+import asyncio
+import json
+import logging
+import os
+import random
+import socket
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError, OperationalError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.metrics import Counter, Gauge, Histogram, registry
+from app.db.database import SessionLocal
+from app.db.models import Job
+
+logger = logging.getLogger(__name__)
+
+QUEUED, RUNNING, SUCCEEDED, FAILED = "queued", "running", "succeeded", "failed"
+
+JOB_DURATION_BUCKETS = (0.1, 0.5, 1.0, 5.0, 15.0, 60.0, 300.0, 900.0, 3600.0)
+
+jobs_finished = registry.register(Counter(
+    "jobs_total", "Background job attempts finished.", ("kind", "outcome"),
+))
+job_duration = registry.register(Histogram(
+    "job_duration_seconds", "Background job attempt duration.", ("kind",), buckets=JOB_DURATION_BUCKETS,
+))
+jobs_running = registry.register(Gauge(
+    "jobs_running", "Background jobs running in this process.", ("kind",),
+))
+
+
+def _update_jobs(*criteria: Any) -> Any:
+    """UPDATE of the matching job rows, leaving loaded objects alone."""
+    return update(Job).where(*criteria).execution_options(synchronize_session=False)
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class JobContext:
+    """The job a handler runs, and its channel for progress reports."""
+    def __init__(self, job: Job, worker: str, session_factory: Callable[[], Session]):
+        self.id = job.id
+        self.kind = job.kind
+        self.payload: Dict[str, Any] = json.loads(job.payload or "{}")
+        self.attempt = job.attempts
+        self.max_attempts = job.max_attempts
+        self.worker = worker
+        self.session_factory = session_factory
+        self._reported = 0.0
+        self._message: Optional[str] = None
+
+    def progress(self, fraction: float, message: Optional[str] = None) -> None:
+        """
+        Report progress (0..1) and keep the job's heartbeat fresh.
+
+        Reports with the same message are written at most once a second,
+        except the final one. A report that cannot be written (the database
+        is busy) is dropped.
+        """
+        now = time.monotonic()
+        if fraction < 1 and message == self._message and now - self._reported < 1:
+            return
+        self._reported, self._message = now, message
+        db = self.session_factory()
+        try:
+            db.execute(
+                _update_jobs(Job.id == self.id, Job.locked_by == self.worker).values(
+                    progress=min(max(fraction, 0.0), 1.0),
+                    progress_message=message,
+                    heartbeat_at=_now(),
+                )
+            )
+            db.commit()
+        except OperationalError as exc:
+            logger.debug("Progress of job %d not recorded: %s", self.id, exc.orig)
+        finally:
+            db.close()
+
+
+Handler = Callable[[Session, JobContext], Any]
+
+_handlers: Dict[str, Handler] = {}
+
+
+def job_handler(kind: str) -> Callable[[Handler], Handler]:
+    """Register a function as the handler of a job kind."""
+    def register(func: Handler) -> Handler:
+        _handlers[kind] = func
+        return func
+    return register
+
+
+def job_kinds() -> List[str]:
+    return sorted(_handlers)
+
+
+def retry_delay(attempt: int) -> float:
+    """Seconds before retrying after the given failed attempt: doubling, capped, with jitter."""
+    delay = min(settings.JOB_RETRY_BASE_SECONDS * 2 ** (attempt - 1), settings.JOB_RETRY_MAX_SECONDS)
+    return delay * random.uniform(0.75, 1.25)
+
+
+def _active_with_key(db: Session, dedup_key: str) -> Optional[Job]:
+    return db.query(Job).filter(Job.dedup_key == dedup_key, Job.status.in_((QUEUED, RUNNING))).first()
+
+
+def enqueue(
+    db: Session,
+    kind: str,
+    payload: Optional[Dict[str, Any]] = None,
+    priority: int = 0,
+    dedup_key: Optional[str] = None,
+    max_attempts: Optional[int] = None,
+    created_by: Optional[int] = None,
+    delay: float = 0.0,
+) -> Job:
+    """
+    Queue a job, or return the queued or running job with the same dedup key.
+
+    Commits the session, so the job is durable before the caller responds,
+    and wakes this process's worker.
+
+    Args:
+        db: Database session
+        kind: Registered handler name
+        payload: JSON-serializable arguments of the handler
+        priority: Higher runs first
+        dedup_key: Key of the work; None never deduplicates
+        max_attempts: Runs before the job fails (default JOB_MAX_ATTEMPTS)
+        created_by: User who asked for the job
+        delay: Seconds before the job may start
+
+    Returns:
+        The new or the existing job
+
+    Raises:
+        ValueError: for a kind without a handler
+    """
+    if kind not in _handlers:
+        raise ValueError(f"Unknown job kind: {kind}")
+    if dedup_key is not None:
+        existing = _active_with_key(db, dedup_key)
+        if existing is not None:
+            return existing
+
+    job = Job(
+        kind=kind,
+        payload=json.dumps(payload or {}),
+        status=QUEUED,
+        priority=priority,
+        dedup_key=dedup_key,
+        max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+        created_by=created_by,
+        run_after=_now() + timedelta(seconds=delay),
+    )
+    db.add(job)
+    try:
+        db.commit()
+    except IntegrityError:
+        # Another request queued the same key first
+        db.rollback()
+        existing = _active_with_key(db, dedup_key) if dedup_key is not None else None
+        if existing is None:
+            raise
+        return existing
+    db.refresh(job)
+    job_worker.wake()
+    return job
+
+
+def job_as_dict(job: Job) -> Dict[str, Any]:
+    """A job with its payload and result decoded, for responses."""
+    return {
+        "id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "priority": job.priority,
+        "payload": json.loads(job.payload or "{}"),
+        "dedup_key": job.dedup_key,
+        "attempts": job.attempts,
+        "max_attempts": job.max_attempts,
+        "progress": job.progress,
+        "progress_message": job.progress_message,
+        "result": json.loads(job.result) if job.result is not None else None,
+        "error": job.error,
+        "created_by": job.created_by,
+        "created_at": job.created_at,
+        "run_after": job.run_after,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+    }
+
+
+class JobWorker:
+    """
+    Claims queued jobs and runs up to ``concurrency`` of them at a time.
+
+    The claim loop runs on the event loop and does its (short) database work
+    on the default executor; handlers run on a dedicated thread pool.
+    """
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        concurrency: int = 2,
+        poll_interval: float = 1.0,
+        stale_after: float = 120.0,
+    ):
+        self.session_factory = session_factory
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.stale_after = stale_after
+        self.name = ""
+        self._running: Dict[int, asyncio.Future] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def start(self) -> None:
+        """Start claiming jobs on the running event loop."""
+        if self._task is not None:
+            return
+        # Named when started: app.serve forks the workers after importing the app
+        self.name = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._executor = ThreadPoolExecutor(self.concurrency, thread_name_prefix="job")
+        self._task = self._loop.create_task(self._run())
+
+    def wake(self) -> None:
+        """Look for work now instead of at the next poll; callable from any thread."""
+        if self._loop is not None and self._wake is not None:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    async def stop(self, timeout: float = 20.0) -> None:
+        """
+        Stop claiming, give running jobs ``timeout`` seconds to finish, and
+        hand the rest back to the queue for another process to run.
+        """
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+        if self._running:
+            logger.info("Waiting for %d running jobs", len(self._running))
+            await asyncio.wait(list(self._running.values()), timeout=timeout)
+        unfinished = list(self._running)
+        if unfinished:
+            await asyncio.get_running_loop().run_in_executor(None, self._release, unfinished)
+            logger.warning("Returned %d unfinished jobs to the queue", len(unfinished))
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._executor = None
+        self._loop = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        next_heartbeat = 0.0
+        while True:
+            self._wake.clear()
+            try:
+                if loop.time() >= next_heartbeat:
+                    next_heartbeat = loop.time() + self.stale_after / 4
+                    await loop.run_in_executor(None, self._heartbeat)
+                while len(self._running) < self.concurrency:
+                    job = await loop.run_in_executor(None, self._claim)
+                    if job is None:
+                        break
+                    future = self._running[job.id] = loop.run_in_executor(self._executor, self._execute, job)
+                    future.add_done_callback(lambda _, job_id=job.id: self._done(job_id))
+            except Exception:
+                logger.exception("Job worker poll failed")
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def _done(self, job_id: int) -> None:
+        self._running.pop(job_id, None)
+        if self._wake is not None:
+            self._wake.set()
+
+    def _claim(self) -> Optional[JobContext]:
+        """Take the next due job of a known kind, or None."""
+        kinds = job_kinds()
+        db = self.session_factory()
+        try:
+            # A few tries: other processes may claim the candidate first
+            for _ in range(5):
+                now = _now()
+                candidate = db.query(Job.id).filter(
+                    Job.status == QUEUED, Job.run_after <= now, Job.kind.in_(kinds),
+                ).order_by(Job.priority.desc(), Job.id).first()
+                if candidate is None:
+                    return None
+                claimed = db.execute(
+                    _update_jobs(Job.id == candidate.id, Job.status == QUEUED).values(
+                        status=RUNNING,
+                        locked_by=self.name,
+                        attempts=Job.attempts + 1,
+                        started_at=now,
+                        heartbeat_at=now,
+                        error=None,
+                    )
+                ).rowcount
+                db.commit()
+                if claimed:
+                    return JobContext(db.get(Job, candidate.id), self.name, self.session_factory)
+            return None
+        finally:
+            db.close()
+
+    def _execute(self, job: JobContext) -> None:
+        """Run one claimed job on a pool thread and record the outcome."""
+        started = time.perf_counter()
+        jobs_running.inc(job.kind)
+        db = self.session_factory()
+        try:
+            result = _handlers[job.kind](db, job)
+            db.commit()
+            outcome = self._finish(job, result)
+        except Exception as exc:
+            db.rollback()
+            logger.exception("Job %d (%s) failed on attempt %d", job.id, job.kind, job.attempt)
+            outcome = self._fail(job, f"{type(exc).__name__}: {exc}")
+        finally:
+            db.close()
+            jobs_running.dec(job.kind)
+            job_duration.observe(time.perf_counter() - started, job.kind)
+        jobs_finished.inc(job.kind, outcome)
+
+    def _finish(self, job: JobContext, result: Any) -> str:
+        self._update(job.id, status=SUCCEEDED, result=json.dumps(result, default=str), progress=1.0, finished_at=_now(), locked_by=None)
+        return SUCCEEDED
+
+    def _fail(self, job: JobContext, error: str) -> str:
+        if job.attempt < job.max_attempts:
+            run_after = _now() + timedelta(seconds=retry_delay(job.attempt))
+            self._update(job.id, status=QUEUED, error=error, run_after=run_after, locked_by=None)
+            return "retried"
+        self._update(job.id, status=FAILED, error=error, finished_at=_now(), locked_by=None)
+        return FAILED
+
+    def _update(self, job_id: int, **values: Any) -> None:
+        """Write the outcome of a job this worker still holds."""
+        db = self.session_factory()
+        try:
+            db.execute(_update_jobs(
+                Job.id == job_id, Job.status == RUNNING, Job.locked_by == self.name,
+            ).values(**values))
+            db.commit()
+        finally:
+            db.close()
+
+    def _heartbeat(self) -> None:
+        """Refresh the heartbeat of running jobs and requeue those of dead workers."""
+        now = _now()
+        db = self.session_factory()
+        try:
+            if self._running:
+                db.execute(_update_jobs(
+                    Job.id.in_(list(self._running)), Job.locked_by == self.name,
+                ).values(heartbeat_at=now))
+
+            cutoff = now - timedelta(seconds=self.stale_after)
+            for job in db.query(Job).filter(Job.status == RUNNING, Job.heartbeat_at < cutoff):
+                logger.warning("Job %d (%s) of %s stopped responding", job.id, job.kind, job.locked_by)
+                values: Dict[str, Any] = {"locked_by": None, "error": f"Worker {job.locked_by} stopped responding"}
+                if job.attempts < job.max_attempts:
+                    values.update(status=QUEUED, run_after=now + timedelta(seconds=retry_delay(job.attempts)))
+                else:
+                    values.update(status=FAILED, finished_at=now)
+                db.execute(_update_jobs(
+                    Job.id == job.id, Job.status == RUNNING, Job.heartbeat_at < cutoff,
+                ).values(**values))
+            db.commit()
+        finally:
+            db.close()
+
+    def _release(self, job_ids: List[int]) -> None:
+        """Queue jobs interrupted by shutdown again; the attempt does not count."""
+        db = self.session_factory()
+        try:
+            db.execute(_update_jobs(
+                Job.id.in_(job_ids), Job.status == RUNNING, Job.locked_by == self.name,
+            ).values(status=QUEUED, locked_by=None, attempts=Job.attempts - 1, run_after=_now()))
+            db.commit()
+        finally:
+            db.close()
+
+
+def prune_jobs(session_factory: Callable[[], Session] = SessionLocal) -> int:
+    """
+    Delete finished jobs older than the retention period.
+
+    Returns:
+        Number of jobs deleted
+    """
+    cutoff = _now() - timedelta(days=settings.JOB_RETENTION_DAYS)
+    db = session_factory()
+    try:
+        deleted = db.query(Job).filter(
+            Job.status.in_((SUCCEEDED, FAILED)),
+            Job.finished_at < cutoff,
+        ).delete(synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+    if deleted:
+        logger.info("Pruned %d finished jobs", deleted)
+    return deleted
+
+
+job_worker = JobWorker(
+    concurrency=settings.JOB_CONCURRENCY,
+    poll_interval=settings.JOB_POLL_SECONDS,
+    stale_after=settings.JOB_STALE_SECONDS,
+)
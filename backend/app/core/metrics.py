@@ -0,0 +1,389 @@
+"""
+Prometheus metrics for requests, database queries and model inference.
+
+Metrics live in a small in-process registry and are rendered in the
+Prometheus text format by ``/metrics``. Recording a sample is a dict lookup,
+a bisect and a few additions under a lock; rendering walks the existing
+series once, so scraping costs nothing per request served.
+
+Request metrics are labelled with the route template (``/api/v1/tasks/{task_id}``),
+never the raw path, to keep the number of series bounded. Database queries
+are counted globally and, through a context variable, per request.
+
+Each process has its own registry. Behind the pre-fork launcher
+(``app.serve``) a scrape lands on whichever worker accepts it, so workers
+also write their samples to ``METRICS_DIR`` every ``METRICS_FLUSH_SECONDS``,
+one file per process, and ``/metrics`` serves the sum over all of them.
+Counters and histograms of exited workers are kept so totals never go
+back; their gauges are dropped.
+"""
+import bisect
+import json
+import os
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+LabelValues = Tuple[str, ...]
+# Samples of one metric as written to METRICS_DIR: label values -> value,
+# or -> (bucket counts, sum) for histograms
+Snapshot = Dict[LabelValues, Any]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Iterable[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    def snapshot(self) -> Snapshot:
+        raise NotImplementedError
+
+    def merge(self, total: Snapshot, other: Snapshot) -> None:
+        """Add the samples of another process into ``total``."""
+        raise NotImplementedError
+
+    def render(self, snapshot: Optional[Snapshot] = None) -> List[str]:
+        """Lines of this process's samples, or of the given ones."""
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def snapshot(self) -> Snapshot:
+        with self._lock:
+            return dict(self._values)
+
+    def merge(self, total: Snapshot, other: Snapshot) -> None:
+        for labels, value in other.items():
+            total[labels] = total.get(labels, 0) + value
+
+    def render(self, snapshot: Optional[Snapshot] = None) -> List[str]:
+        values = self.snapshot() if snapshot is None else snapshot
+        return self.header() + [
+            f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}" for labels, value in values.items()
+        ]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label values: non-cumulative bucket counts (last one is +Inf), sum
+        self._series: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = ([0] * (len(self.buckets) + 1), [0.0])
+            series[0][index] += 1
+            series[1][0] += value
+
+    def snapshot(self) -> Snapshot:
+        with self._lock:
+            return {labels: (list(counts), total[0]) for labels, (counts, total) in self._series.items()}
+
+    def merge(self, total: Snapshot, other: Snapshot) -> None:
+        for labels, (counts, value) in other.items():
+            if labels in total:
+                merged_counts, merged_value = total[labels]
+                total[labels] = ([a + b for a, b in zip(merged_counts, counts)], merged_value + value)
+            else:
+                total[labels] = (list(counts), value)
+
+    def render(self, snapshot: Optional[Snapshot] = None) -> List[str]:
+        series = self.snapshot() if snapshot is None else snapshot
+        lines = self.header()
+        for labels, (counts, total) in series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="' + _number(bound) + '"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self, directory: str = "") -> str:
+        """
+        The samples in the Prometheus text format.
+
+        Args:
+            directory: Where the processes write their samples; when given,
+                the sum over all of them is rendered, this one's brought up to date
+        """
+        if not directory:
+            lines: List[str] = []
+            for metric in self._metrics:
+                lines.extend(metric.render())
+            return "\n".join(lines) + "\n"
+
+        self.write(directory)
+        totals: Dict[str, Snapshot] = {metric.name: {} for metric in self._metrics}
+        for path in sorted(os.listdir(directory)):
+            if not path.endswith(".json"):
+                continue
+            samples = _read_samples(os.path.join(directory, path))
+            for metric in self._metrics:
+                if metric.name in samples:
+                    metric.merge(totals[metric.name], samples[metric.name])
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render(totals[metric.name]))
+        return "\n".join(lines) + "\n"
+
+    def write(self, directory: str) -> None:
+        """Write this process's samples to its file in ``directory``."""
+        samples = {metric.name: metric.snapshot() for metric in self._metrics}
+        _write_samples(_samples_path(directory, os.getpid()), samples)
+
+    def mark_process_dead(self, directory: str, pid: int) -> None:
+        """Drop the gauges of an exited process, keeping its counts."""
+        path = _samples_path(directory, pid)
+        if not os.path.exists(path):
+            return
+        samples = _read_samples(path)
+        for metric in self._metrics:
+            if metric.kind == "gauge":
+                samples.pop(metric.name, None)
+        _write_samples(path, samples)
+
+
+def _samples_path(directory: str, pid: int) -> str:
+    return os.path.join(directory, f"metrics-{pid}.json")
+
+
+def _write_samples(path: str, samples: Dict[str, Snapshot]) -> None:
+    raw = {name: [[list(labels), value] for labels, value in series.items()] for name, series in samples.items()}
+    # Readers never see a half-written file
+    with open(path + ".tmp", "w") as file:
+        json.dump(raw, file)
+    os.replace(path + ".tmp", path)
+
+
+def _read_samples(path: str) -> Dict[str, Snapshot]:
+    try:
+        with open(path) as file:
+            raw = json.load(file)
+    except (OSError, ValueError):
+        return {}
+    return {name: {tuple(labels): value for labels, value in series} for name, series in raw.items()}
+
+
+registry = Registry()
+
+http_requests = registry.register(Counter(
+    "http_requests_total", "HTTP requests served.", ("method", "route", "status"),
+))
+http_latency = registry.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency.", ("method", "route"),
+))
+http_in_flight = registry.register(Gauge(
+    "http_requests_in_flight", "HTTP requests being served.", ("method",),
+))
+http_response_size = registry.register(Histogram(
+    "http_response_size_bytes", "HTTP response body size.", ("method", "route"), buckets=SIZE_BUCKETS,
+))
+db_queries = registry.register(Counter(
+    "db_queries_total", "SQL statements executed.", ("operation",),
+))
+db_query_latency = registry.register(Histogram(
+    "db_query_duration_seconds", "SQL statement latency.", ("operation",),
+))
+db_queries_per_request = registry.register(Histogram(
+    "http_request_db_queries", "SQL statements executed per HTTP request.", ("method", "route"), buckets=QUERY_COUNT_BUCKETS,
+))
+db_time_per_request = registry.register(Histogram(
+    "http_request_db_seconds", "Time spent in SQL statements per HTTP request.", ("method", "route"),
+))
+inference_latency = registry.register(Histogram(
+    "model_inference_duration_seconds", "Model inference latency.", ("model",),
+))
+inference_rows = registry.register(Counter(
+    "model_inference_rows_total", "Rows scored by models.", ("model",),
+))
+
+
+# Per-request database statistics
+
+@dataclass
+class RequestStats:
+    queries: int = 0
+    db_seconds: float = 0.0
+
+
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def current_request_stats() -> Optional[RequestStats]:
+    """Database statistics of the request being served, if any."""
+    return _request_stats.get()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany) -> None:
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _record_query(conn, cursor, statement, parameters, context, executemany) -> None:
+    started = conn.info["query_started"].pop()
+    elapsed = time.perf_counter() - started
+    operation = statement.lstrip()[:6].upper()
+    operation = operation if operation in ("SELECT", "INSERT", "UPDATE", "DELETE") else "OTHER"
+    db_queries.inc(operation)
+    db_query_latency.observe(elapsed, operation)
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_seconds += elapsed
+
+
+@event.listens_for(Engine, "handle_error")
+def _discard_query_timer(context) -> None:
+    started = context.connection.info.get("query_started") if context.connection is not None else None
+    if started:
+        started.pop()
+
+
+# Model inference
+
+class observe_inference:
+    """Context manager timing one model call."""
+    def __init__(self, model: str, rows: int = 1):
+        self.model = model
+        self.rows = rows
+
+    def __enter__(self) -> "observe_inference":
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        inference_latency.observe(time.perf_counter() - self._started, self.model)
+        inference_rows.inc(self.model, amount=self.rows)
+
+
+# HTTP middleware
+
+_route_templates: Dict[Callable, str] = {}
+
+
+def _route_template(scope: Scope) -> str:
+    endpoint = scope.get("endpoint")
+    if endpoint is None:
+        return "unmatched"
+    template = _route_templates.get(endpoint)
+    if template is None:
+        app = scope.get("app")
+        for route in getattr(app, "routes", ()):
+            if getattr(route, "endpoint", None) is endpoint:
+                template = route.path_format
+                break
+        else:
+            template = getattr(endpoint, "__name__", "unknown")
+        _route_templates[endpoint] = template
+    return template
+
+
+class MetricsMiddleware:
+    """Records latency, status, response size and DB usage of each HTTP request."""
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_code = 500
+        size = 0
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+
+        async def send_with_metrics(message: Message) -> None:
+            nonlocal status_code, size
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        http_in_flight.inc(method)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            elapsed = time.perf_counter() - started
+            http_in_flight.dec(method)
+            _request_stats.reset(token)
+            route = _route_template(scope)
+            http_requests.inc(method, route, str(status_code))
+            http_latency.observe(elapsed, method, route)
+            http_response_size.observe(size, method, route)
+            db_queries_per_request.observe(stats.queries, method, route)
+            db_time_per_request.observe(stats.db_seconds, method, route)
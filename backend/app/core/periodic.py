@@ -0,0 +1,44 @@
+import asyncio
+import logging
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicTask:
+    """
+    Run a blocking function every ``interval`` seconds on the event loop's
+    thread pool, so background jobs never block request handling.
+    """
+    def __init__(self, name: str, func: Callable[[], Any], interval: float):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                await loop.run_in_executor(None, self.func)
+            except Exception:
+                logger.exception("Periodic task %s failed", self.name)
+            await asyncio.sleep(self.interval)
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def start(self) -> None:
+        """Start the task on the running event loop."""
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -0,0 +1,258 @@
+"""
+On-demand sampling profiler for the live worker.
+
+A background thread reads the stack of every other thread with
+``sys._current_frames()`` at a fixed interval and counts identical stacks.
+Nothing is hooked into the interpreter, so the profiled code runs at full
+speed; the cost is one stack walk per thread per sample, in the sampling
+thread.
+
+Profiles are rendered as collapsed stacks (``root;caller;callee count``, the
+input of flamegraph.pl and most flame graph tools) or as a speedscope
+document. Only one profile runs at a time.
+
+Besides ``/admin/profile``, an admin can profile a single request by sending
+``X-Profile: 1``; the process is sampled while the request runs and the
+profile is saved to ``PROFILE_DIR`` under the id returned in
+``X-Profile-Id``, before the response completes, so any worker can serve it
+right away. Everything else running in the worker at that time is sampled
+too, so send targeted traces to a quiet worker.
+"""
+import json
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+Frame = Tuple[str, str, int]  # function, file, first line
+Stack = Tuple[Frame, ...]  # root first
+
+FORMATS = ("collapsed", "speedscope")
+
+# Leaf functions of threads that are blocked rather than running
+IDLE_FUNCTIONS = frozenset({"select", "poll", "wait", "_wait_for_tstate_lock", "accept"})
+
+_PATHS = sorted({os.path.abspath(path) + os.sep for path in sys.path if path}, key=len, reverse=True)
+_busy = threading.Lock()
+
+
+def _short_path(filename: str) -> str:
+    for prefix in _PATHS:
+        if filename.startswith(prefix):
+            return filename[len(prefix):]
+    return filename
+
+
+class Profile:
+    """Counted stacks of one profiling run."""
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self.started = time.time()
+        self.duration = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "interval": self.interval,
+            "started": self.started,
+            "duration": self.duration,
+            "samples": [[stack, count] for stack, count in self.samples.items()],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Profile":
+        profile = cls(data["interval"])
+        profile.started = data["started"]
+        profile.duration = data["duration"]
+        for stack, count in data["samples"]:
+            profile.samples[tuple(tuple(frame) for frame in stack)] = count
+        return profile
+
+    def collapsed(self) -> str:
+        lines = []
+        for stack, count in self.samples.most_common():
+            frames = (f"{name} ({path}:{line})" if path else name for name, path, line in stack)
+            lines.append(";".join(frames) + f" {count}")
+        return "\n".join(lines) + "\n"
+
+    def speedscope(self, name: str = "profile") -> Dict[str, Any]:
+        frames: Dict[Frame, int] = {}
+        samples, weights = [], []
+        for stack, count in self.samples.items():
+            samples.append([frames.setdefault(frame, len(frames)) for frame in stack])
+            weights.append(count * self.interval * 1000)
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "foresightpm",
+            "shared": {"frames": [{"name": n, "file": path, "line": line} for n, path, line in frames]},
+            "profiles": [{
+                "type": "sampled",
+                "name": name,
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": sum(weights),
+                "samples": samples,
+                "weights": weights,
+            }],
+        }
+
+
+class SamplingProfiler:
+    """
+    Samples the stacks of all other threads until stopped.
+
+    Args:
+        interval: Seconds between samples
+        include_idle: Keep samples of threads blocked in select, poll or wait
+    """
+    def __init__(self, interval: float = 0.005, include_idle: bool = False):
+        self.interval = interval
+        self.include_idle = include_idle
+        self.profile = Profile(interval)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _sample(self) -> None:
+        own = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own:
+                continue
+            if not self.include_idle and frame.f_code.co_name in IDLE_FUNCTIONS:
+                continue
+            stack: List[Frame] = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append((code.co_name, _short_path(code.co_filename), code.co_firstlineno))
+                frame = frame.f_back
+            stack.append((names.get(thread_id, f"thread-{thread_id}"), "", 0))
+            self.profile.samples[tuple(reversed(stack))] += 1
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def start(self) -> bool:
+        """Start sampling; False when another profile is already running."""
+        if not _busy.acquire(blocking=False):
+            return False
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self) -> Profile:
+        self._stop.set()
+        self._thread.join()
+        self.profile.duration = time.perf_counter() - self._started
+        _busy.release()
+        return self.profile
+
+
+# Profiles of single requests kept in PROFILE_DIR, newest first
+MAX_RECENT_PROFILES = 20
+
+_PROFILE_ID = re.compile(r"^[0-9a-f]{12}$")
+
+
+def _profile_path(directory: str, profile_id: str) -> str:
+    return os.path.join(directory, f"{profile_id}.json")
+
+
+def save_profile(directory: str, profile_id: str, profile: Profile) -> None:
+    """Keep a request profile where every worker finds it, dropping the oldest ones."""
+    os.makedirs(directory, exist_ok=True)
+    path = _profile_path(directory, profile_id)
+    with open(path + ".tmp", "w") as file:
+        json.dump(profile.to_dict(), file)
+    os.replace(path + ".tmp", path)
+
+    saved = []
+    for name in os.listdir(directory):
+        if name.endswith(".json"):
+            try:
+                saved.append((os.path.getmtime(os.path.join(directory, name)), name))
+            except FileNotFoundError:
+                pass  # pruned by another worker
+    for _, name in sorted(saved, reverse=True)[MAX_RECENT_PROFILES:]:
+        try:
+            os.remove(os.path.join(directory, name))
+        except FileNotFoundError:
+            pass
+
+
+def load_profile(directory: str, profile_id: str) -> Optional[Profile]:
+    """A saved request profile, or None when unknown or already dropped."""
+    if not _PROFILE_ID.match(profile_id):
+        return None
+    try:
+        with open(_profile_path(directory, profile_id)) as file:
+            return Profile.from_dict(json.load(file))
+    except FileNotFoundError:
+        return None
+
+
+class ProfileMiddleware:
+    """Profiles requests of admins that carry an ``X-Profile`` header."""
+    def __init__(self, app: ASGIApp, directory: str, interval: float = 0.001):
+        self.app = app
+        self.directory = directory
+        self.interval = interval
+
+    def _is_admin(self, headers: Headers) -> bool:
+        scheme, _, token = headers.get("authorization", "").partition(" ")
+        if scheme.lower() != "bearer" or not token:
+            return False
+        from app.core.auth import get_user_from_token
+        from app.db.database import SessionLocal
+
+        db = SessionLocal()
+        try:
+            user = get_user_from_token(db, token)
+            return user is not None and user.is_active and user.role == "admin"
+        finally:
+            db.close()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = Headers(scope=scope)
+        if headers.get("x-profile", "").lower() not in ("1", "true") or not self._is_admin(headers):
+            await self.app(scope, receive, send)
+            return
+
+        profiler = SamplingProfiler(self.interval)
+        if not profiler.start():
+            await self.app(scope, receive, send)
+            return
+        profile_id = uuid.uuid4().hex[:12]
+        saved = False
+
+        async def save() -> None:
+            nonlocal saved
+            if not saved:
+                saved = True
+                await run_in_threadpool(save_profile, self.directory, profile_id, profiler.stop())
+
+        async def send_with_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message)["X-Profile-Id"] = profile_id
+            elif message["type"] == "http.response.body" and not message.get("more_body", False):
+                # Saved before the client has the whole response and asks for the profile
+                await save()
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            await save()
@@ -0,0 +1,266 @@
+"""
+Push channels for WebSocket clients.
+
+Clients subscribe to channels such as ``project:12`` or ``user:3``; events
+published to a channel are fanned out to the outboxes of its subscribers.
+Publishing is thread-safe and never blocks: it only schedules delivery on the
+event loop. Each outbox is bounded and coalesces events about the same entity,
+and a client that still falls behind gets a single ``resync`` event telling
+it to reload instead of an unbounded backlog.
+
+With several worker processes, the database broker relays events between
+them through the ``realtime_messages`` table.
+"""
+import asyncio
+import json
+import logging
+import os
+import socket
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Hashable, List, Optional, Set, Tuple
+
+from sqlalchemy import func, insert
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.database import SessionLocal
+from app.db.models import RealtimeMessage
+from app.db.sequence import SequenceCursor
+
+logger = logging.getLogger(__name__)
+
+Message = Dict[str, Any]
+
+RESYNC: Message = {"type": "resync"}
+
+
+def encode(message: Message) -> str:
+    """JSON-encode an event; datetimes and other values fall back to str()."""
+    return json.dumps(message, default=str)
+
+
+def _merge(queued: Message, message: Message) -> Message:
+    """Coalesce a newer event about an entity into the queued one."""
+    if queued.get("op") == "insert" and message.get("op") == "update":
+        # The client has not seen the insert yet; send the latest row as the insert
+        return {**message, "op": "insert"}
+    return message
+
+
+class ClientQueue:
+    """
+    Bounded outbox of one connection.
+
+    Events carrying a ``key`` replace the queued event with the same key, so
+    a burst of writes to one task costs one slot. On overflow the backlog is
+    dropped and replaced by a single resync event.
+    """
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._items: "OrderedDict[Hashable, Message]" = OrderedDict()
+        self._ready = asyncio.Event()
+        self._overflowed = False
+        self.dropped = 0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def put(self, message: Message) -> None:
+        """Queue an event; must be called on the event loop."""
+        if self._overflowed:
+            self.dropped += 1
+            return
+        key = message.get("key")
+        if key is not None and key in self._items:
+            self._items[key] = _merge(self._items[key], message)
+        elif len(self._items) >= self.maxsize:
+            self.dropped += len(self._items) + 1
+            self._items.clear()
+            self._items["resync"] = RESYNC
+            self._overflowed = True
+        else:
+            self._items[key if key is not None else object()] = message
+        self._ready.set()
+
+    async def get(self) -> Message:
+        while not self._items:
+            self._ready.clear()
+            await self._ready.wait()
+        _, message = self._items.popitem(last=False)
+        if message is RESYNC:
+            self._overflowed = False
+        return message
+
+
+class InProcessBroker:
+    """Delivers events to the clients of this process only."""
+    def start(self, hub: "Hub") -> None:
+        self.hub = hub
+
+    async def stop(self) -> None:
+        pass
+
+    def publish(self, channel: str, message: Message) -> None:
+        self.hub.deliver(channel, message)
+
+
+class DatabaseBroker:
+    """
+    Relays events between worker processes through the database.
+
+    Events are delivered locally right away and buffered; a poll loop writes
+    the buffer to ``realtime_messages`` in one statement and reads the rows
+    other workers wrote since the last poll, including rows that committed
+    after rows with higher ids. Old rows are pruned as it goes.
+    """
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        poll_interval: float = 0.5,
+        retention: timedelta = timedelta(minutes=5),
+        batch_size: int = 1000,
+    ):
+        self.session_factory = session_factory
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self.batch_size = batch_size
+        self.origin = ""
+        self._outbox: List[Tuple[str, Message]] = []
+        self._lock = threading.Lock()
+        self._cursor: Optional[SequenceCursor] = None
+        self._polls = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self, hub: "Hub") -> None:
+        self.hub = hub
+        # Named when started: the broker is created before app.serve forks the workers
+        self.origin = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def publish(self, channel: str, message: Message) -> None:
+        self.hub.deliver(channel, message)
+        with self._lock:
+            self._outbox.append((channel, message))
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                for channel, message in await loop.run_in_executor(None, self._sync):
+                    self.hub._deliver(channel, message)
+            except Exception:
+                logger.exception("Realtime broker poll failed")
+            await asyncio.sleep(self.poll_interval)
+
+    def _sync(self) -> List[Tuple[str, Message]]:
+        """Write buffered events and read the ones other workers published."""
+        with self._lock:
+            outbox, self._outbox = self._outbox, []
+
+        db = self.session_factory()
+        try:
+            if self._cursor is None:
+                # Start from the current end of the stream, not its history
+                self._cursor = SequenceCursor(db.query(func.max(RealtimeMessage.id)).scalar() or 0)
+            if outbox:
+                db.execute(insert(RealtimeMessage), [
+                    {"channel": channel, "payload": encode(message), "origin": self.origin}
+                    for channel, message in outbox
+                ])
+
+            received = []
+            rows = db.query(
+                RealtimeMessage.id, RealtimeMessage.channel, RealtimeMessage.payload, RealtimeMessage.origin
+            ).filter(
+                self._cursor.criterion(RealtimeMessage.id)
+            ).order_by(RealtimeMessage.id).limit(self.batch_size).all()
+            new = set(self._cursor.advance(message_id for message_id, _, _, _ in rows))
+            for message_id, channel, payload, origin in rows:
+                if message_id in new and origin != self.origin:
+                    received.append((channel, json.loads(payload)))
+
+            self._polls += 1
+            if self._polls % 100 == 0:
+                db.query(RealtimeMessage).filter(
+                    RealtimeMessage.created_at < datetime.utcnow() - self.retention
+                ).delete(synchronize_session=False)
+            db.commit()
+            return received
+        finally:
+            db.close()
+
+
+class Hub:
+    """Channel subscriptions of the connected clients of this process."""
+    def __init__(self, broker, queue_size: int = 1000):
+        self.broker = broker
+        self.queue_size = queue_size
+        self._channels: Dict[str, Set[ClientQueue]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def running(self) -> bool:
+        return self._loop is not None
+
+    def start(self) -> None:
+        """Start delivering events on the running event loop."""
+        self._loop = asyncio.get_running_loop()
+        self.broker.start(self)
+
+    async def stop(self) -> None:
+        await self.broker.stop()
+        self._loop = None
+
+    def connect(self) -> ClientQueue:
+        return ClientQueue(self.queue_size)
+
+    def subscribe(self, client: ClientQueue, channel: str) -> None:
+        self._channels.setdefault(channel, set()).add(client)
+
+    def unsubscribe(self, client: ClientQueue, channel: str) -> None:
+        subscribers = self._channels.get(channel)
+        if subscribers is not None:
+            subscribers.discard(client)
+            if not subscribers:
+                del self._channels[channel]
+
+    def disconnect(self, client: ClientQueue) -> None:
+        for channel in [c for c, subscribers in self._channels.items() if client in subscribers]:
+            self.unsubscribe(client, channel)
+
+    def publish(self, channel: str, message: Message) -> None:
+        """Publish an event from any thread; a no-op until the hub is started."""
+        if self._loop is not None:
+            self.broker.publish(channel, message)
+
+    def deliver(self, channel: str, message: Message) -> None:
+        """Hand an event to this process's subscribers, from any thread."""
+        loop = self._loop
+        if loop is not None and channel in self._channels:
+            loop.call_soon_threadsafe(self._deliver, channel, message)
+
+    def _deliver(self, channel: str, message: Message) -> None:
+        for client in list(self._channels.get(channel, ())):
+            client.put(message)
+
+
+def _create_broker():
+    if settings.REALTIME_BROKER == "database":
+        return DatabaseBroker(poll_interval=settings.REALTIME_POLL_SECONDS)
+    return InProcessBroker()
+
+
+hub = Hub(_create_broker(), queue_size=settings.REALTIME_QUEUE_SIZE)
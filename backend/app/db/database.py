@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
@@ -7,12 +7,33 @@ from app.core.config import settings
 # Create SQLAlchemy engine
 engine = create_engine(settings.DATABASE_URL)
 
+if settings.QUERY_DEBUG:
+    from app.db.query_debug import install as install_query_debug
+
+    install_query_debug(
+        engine,
+        threshold=settings.N_PLUS_ONE_THRESHOLD,
+        slow_ms=settings.SLOW_QUERY_MS,
+        raise_errors=settings.QUERY_DEBUG_RAISE,
+    )
+
 # Create SessionLocal class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 # Create Base class
 Base = declarative_base()
 
+def dialect_insert(db, table):
+    """INSERT supporting ON CONFLICT on this database, or None."""
+    dialect_name = db.get_bind().dialect.name
+    if dialect_name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    elif dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        return None
+    return insert(table)
+
 # Dependency to get DB session
 def get_db():
     db = SessionLocal()
@@ -20,3 +41,30 @@ def get_db():
         yield db
     finally:
         db.close()
+
+def init_db() -> None:
+    """
+    Create missing tables, columns and indexes for the current models.
+
+    ``create_all`` only creates tables that do not exist yet, so columns and
+    indexes added to existing models are applied here as well. Only additive
+    changes are handled; anything else needs a real migration. The
+    full-text search indexes, which are not models, are installed last.
+    """
+    from app.db import models  # noqa: F401 - registers the models on Base
+    from app.services.search import install_search_index
+
+    Base.metadata.create_all(bind=engine)
+
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+            for index in table.indexes:
+                index.create(bind=conn, checkfirst=True)
+        install_search_index(conn)
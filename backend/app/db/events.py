@@ -0,0 +1,169 @@
+"""
+Commit-time change notifications for ORM writes.
+
+Rows inserted, updated or deleted through a Session are collected when the
+session flushes and handed to the registered listeners once the transaction
+commits, so in-process structures (indexes, caches, push channels) only ever
+see durable changes. Rolled back changes are discarded.
+
+Writers that bypass the unit of work (Core ``insert()`` / bulk operations)
+can ``record`` their changes on the session so they are dispatched with the
+commit as well.
+
+Listeners registered with ``on_flush`` instead run inside the transaction,
+as soon as the changes reach the database, so whatever they write commits or
+rolls back together with the changes themselves.
+"""
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+_CHANGES_KEY = "pending_changes"
+
+
+@dataclass(frozen=True)
+class Change:
+    op: str  # "insert", "update" or "delete"
+    table: str
+    id: Any
+    values: Dict[str, Any] = field(default_factory=dict)  # loaded column values at flush time
+    previous: Dict[str, Any] = field(default_factory=dict)  # prior values of the columns an update changed
+
+
+Listener = Callable[[List[Change]], None]
+FlushListener = Callable[[Session, List[Change]], None]
+
+_listeners: Dict[str, List[Listener]] = {}
+_flush_listeners: Dict[str, List[FlushListener]] = {}
+
+
+def on_commit(*tables: str) -> Callable[[Listener], Listener]:
+    """
+    Register a function to be called with the committed changes of some tables.
+
+    The listener receives the list of changes of one commit, restricted to
+    the tables it subscribed to.
+    """
+    def decorator(listener: Listener) -> Listener:
+        for table in tables:
+            _listeners.setdefault(table, []).append(listener)
+        return listener
+    return decorator
+
+
+def on_flush(*tables: str) -> Callable[[FlushListener], FlushListener]:
+    """
+    Register a function to be called with the flushed changes of some tables.
+
+    The listener receives the session and the changes of one flush (or one
+    ``record`` call), restricted to the tables it subscribed to, and may
+    write through ``session.connection()``. It must not flush or commit.
+    """
+    def decorator(listener: FlushListener) -> FlushListener:
+        for table in tables:
+            _flush_listeners.setdefault(table, []).append(listener)
+        return listener
+    return decorator
+
+
+def _run_flush_listeners(session: Session, changes: List[Change]) -> None:
+    by_listener: Dict[FlushListener, List[Change]] = {}
+    for change in changes:
+        for listener in _flush_listeners.get(change.table, ()):
+            by_listener.setdefault(listener, []).append(change)
+    # Errors propagate: the transaction must not commit without these writes
+    for listener, listener_changes in by_listener.items():
+        listener(session, listener_changes)
+
+
+def publish(changes: List[Change]) -> None:
+    """Dispatch committed changes to their listeners."""
+    by_listener: Dict[Listener, List[Change]] = {}
+    for change in changes:
+        for listener in _listeners.get(change.table, ()):
+            by_listener.setdefault(listener, []).append(change)
+
+    for listener, listener_changes in by_listener.items():
+        try:
+            listener(listener_changes)
+        except Exception:
+            # A broken listener must never fail a request that already committed
+            logger.exception("Change listener %r failed", listener)
+
+
+def record(session: Session, changes: List[Change]) -> None:
+    """Queue changes written outside the unit of work for dispatch on commit."""
+    session.info.setdefault(_CHANGES_KEY, []).extend(changes)
+    _run_flush_listeners(session, changes)
+
+
+def _snapshot(obj: Any) -> Dict[str, Any]:
+    """Column values of an instance that are currently loaded."""
+    state = inspect(obj)
+    return {
+        attr.key: state.dict[attr.key]
+        for attr in state.mapper.column_attrs
+        if attr.key in state.dict
+    }
+
+
+def _previous_values(obj: Any) -> Dict[str, Any]:
+    """Values that modified columns held before the flush."""
+    state = inspect(obj)
+    previous = {}
+    for attr in state.mapper.column_attrs:
+        history = state.attrs[attr.key].history
+        if not history.has_changes():
+            continue
+        old = history.deleted[0] if history.deleted else None
+        # Assigning the value a column already had is not a change
+        if history.added and history.added[0] == old:
+            continue
+        previous[attr.key] = old
+    return previous
+
+
+def _record(session: Session, op: str, objects) -> List[Change]:
+    recorded = []
+    for obj in objects:
+        table = getattr(obj, "__tablename__", None)
+        if table not in _listeners and table not in _flush_listeners:
+            continue
+        previous = {}
+        if op == "update":
+            previous = _previous_values(obj)
+            if not previous:
+                continue
+        values = _snapshot(obj)
+        recorded.append(Change(op=op, table=table, id=values.get("id"), values=values, previous=previous))
+    return recorded
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changes(session: Session, flush_context) -> None:
+    # The new/dirty/deleted sets still describe the flush that just ran,
+    # while primary keys have already been assigned.
+    changes = (
+        _record(session, "insert", session.new)
+        + _record(session, "update", session.dirty)
+        + _record(session, "delete", session.deleted)
+    )
+    session.info.setdefault(_CHANGES_KEY, []).extend(changes)
+    _run_flush_listeners(session, changes)
+
+
+@event.listens_for(Session, "after_commit")
+def _dispatch_changes(session: Session) -> None:
+    changes = session.info.pop(_CHANGES_KEY, None)
+    if changes:
+        publish(changes)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changes(session: Session) -> None:
+    session.info.pop(_CHANGES_KEY, None)
@@ -0,0 +1,26 @@
+"""
+Explicit schema migration step.
+
+Run once per deploy, before the workers start:
+
+    python -m app.db.migrate
+
+Workers also run it on startup while ``AUTO_MIGRATE`` is set (the default,
+convenient in development); deployments that migrate explicitly turn it off
+so that booting a worker does not touch the schema.
+"""
+import logging
+
+from app.db.database import init_db
+
+logger = logging.getLogger(__name__)
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    init_db()
+    logger.info("Database schema is up to date")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,5 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Float, Boolean, Table, Text, Enum
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Float, Boolean, Table, Text, Enum, Index, UniqueConstraint, select, text
+from sqlalchemy.orm import column_property, relationship
 from sqlalchemy.sql import func
 import enum
 from datetime import datetime
@@ -14,7 +14,7 @@ user_project = Table(
     Column("project_id", Integer, ForeignKey("projects.id"), primary_key=True)
 )
 
-class TaskStatus(enum.Enum):
+class TaskStatus(str, enum.Enum):
     NOT_STARTED = "not_started"
     IN_PROGRESS = "in_progress"
     COMPLETED = "completed"
@@ -22,7 +22,7 @@ class TaskStatus(enum.Enum):
     BLOCKED = "blocked"
     CANCELLED = "cancelled"
 
-class TaskPriority(enum.Enum):
+class TaskPriority(str, enum.Enum):
     LOW = "low"
     MEDIUM = "medium"
     HIGH = "high"
@@ -43,7 +43,7 @@ class User(Base):
     
     # Relationships
     projects = relationship("Project", secondary=user_project, back_populates="members")
-    assigned_tasks = relationship("Task", back_populates="assignee")
+    assigned_tasks = relationship("Task", back_populates="assignee", foreign_keys="Task.assignee_id")
     created_tasks = relationship("Task", back_populates="creator", foreign_keys="Task.creator_id")
     notifications = relationship("Notification", back_populates="user")
 
@@ -70,14 +70,15 @@ class Task(Base):
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, index=True)
     description = Column(Text)
-    status = Column(Enum(TaskStatus), default=TaskStatus.NOT_STARTED)
-    priority = Column(Enum(TaskPriority), default=TaskPriority.MEDIUM)
+    status = Column(Enum(TaskStatus, values_callable=lambda e: [m.value for m in e]), default=TaskStatus.NOT_STARTED)
+    priority = Column(Enum(TaskPriority, values_callable=lambda e: [m.value for m in e]), default=TaskPriority.MEDIUM)
     start_date = Column(DateTime(timezone=True))
     due_date = Column(DateTime(timezone=True))
     estimated_hours = Column(Float)
     actual_hours = Column(Float, default=0)
     completion_percentage = Column(Float, default=0)
     risk_score = Column(Float, default=0)  # AI-calculated risk score
+    propagated_risk_score = Column(Float, default=0)  # risk_score combined with upstream predecessors
     
     # Foreign keys
     project_id = Column(Integer, ForeignKey("projects.id"))
@@ -94,6 +95,15 @@ class Task(Base):
     dependencies = relationship("TaskDependency", back_populates="dependent_task", foreign_keys="TaskDependency.dependent_task_id", cascade="all, delete-orphan")
     predecessors = relationship("TaskDependency", back_populates="prerequisite_task", foreign_keys="TaskDependency.prerequisite_task_id", cascade="all, delete-orphan")
     comments = relationship("TaskComment", back_populates="task", cascade="all, delete-orphan")
+    
+    __table_args__ = (
+        # Timeline window queries filter on a project's start/due dates
+        Index("ix_tasks_project_start_date", "project_id", "start_date"),
+        Index("ix_tasks_project_due_date", "project_id", "due_date"),
+        # Deadline scans look up open tasks by due date, and recently changed tasks
+        Index("ix_tasks_status_due_date", "status", "due_date"),
+        Index("ix_tasks_updated_at", "updated_at"),
+    )
 
 class TaskDependency(Base):
     __tablename__ = "task_dependencies"
@@ -116,10 +126,23 @@ class TaskComment(Base):
     task_id = Column(Integer, ForeignKey("tasks.id"))
     user_id = Column(Integer, ForeignKey("users.id"))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
     # Relationships
     task = relationship("Task", back_populates="comments")
     user = relationship("User")
+    
+    __table_args__ = (
+        # Keyset pagination of a task's thread
+        Index("ix_task_comments_task_id_id", "task_id", "id"),
+    )
+
+# Counted in the query instead of loading the thread; deferred, so it is only
+# computed where a response needs it (load_only / undefer)
+Task.comment_count = column_property(
+    select(func.count(TaskComment.id)).where(TaskComment.task_id == Task.id).correlate_except(TaskComment).scalar_subquery(),
+    deferred=True,
+)
 
 class Notification(Base):
     __tablename__ = "notifications"
@@ -136,6 +159,18 @@ class Notification(Base):
     # Relationships
     user = relationship("User", back_populates="notifications")
     related_task = relationship("Task")
+    
+    __table_args__ = (
+        # Keyset pagination of a user's inbox, all or unread only
+        Index("ix_notifications_user_id_id", "user_id", "id"),
+        Index("ix_notifications_user_unread_id", "user_id", "is_read", "id"),
+    )
+
+class UserNotificationCounter(Base):
+    __tablename__ = "user_notification_counters"
+    
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    unread_count = Column(Integer, nullable=False, default=0)
 
 class BudgetEntry(Base):
     __tablename__ = "budget_entries"
@@ -151,3 +186,128 @@ class BudgetEntry(Base):
     
     # Relationships
     project = relationship("Project")
+    
+    __table_args__ = (
+        # Budget rollups scan a project's entries by type and date
+        Index("ix_budget_entries_project_type_date", "project_id", "entry_type", "date"),
+    )
+
+class TaskEscalation(Base):
+    __tablename__ = "task_escalations"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    task_id = Column(Integer, ForeignKey("tasks.id", ondelete="CASCADE"), index=True)
+    level = Column(Integer)
+    completion_percentage = Column(Float)  # progress when the level fired
+    escalated_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    __table_args__ = (
+        # Each level fires at most once per task
+        UniqueConstraint("task_id", "level", name="uq_task_escalations_task_level"),
+    )
+
+class JobWatermark(Base):
+    __tablename__ = "job_watermarks"
+    
+    name = Column(String, primary_key=True)  # e.g. "escalation"
+    watermark = Column(DateTime(timezone=True))  # time up to which the job has processed
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class RealtimeMessage(Base):
+    __tablename__ = "realtime_messages"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    channel = Column(String)
+    payload = Column(Text)  # JSON-encoded event
+    origin = Column(String)  # worker that published the message
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+
+class ProjectStats(Base):
+    __tablename__ = "project_stats"
+    
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), primary_key=True)
+    task_count = Column(Integer, nullable=False, default=0)
+    not_started_count = Column(Integer, nullable=False, default=0)
+    in_progress_count = Column(Integer, nullable=False, default=0)
+    completed_count = Column(Integer, nullable=False, default=0)
+    delayed_count = Column(Integer, nullable=False, default=0)
+    blocked_count = Column(Integer, nullable=False, default=0)
+    cancelled_count = Column(Integer, nullable=False, default=0)
+    estimated_hours = Column(Float, nullable=False, default=0)
+    actual_hours = Column(Float, nullable=False, default=0)
+    completion_total = Column(Float, nullable=False, default=0)  # sum of completion percentages
+    high_risk_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class RiskSnapshot(Base):
+    __tablename__ = "risk_snapshots"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"))
+    task_count = Column(Integer)
+    mean_risk = Column(Float)
+    max_risk = Column(Float)
+    mean_propagated_risk = Column(Float)
+    max_propagated_risk = Column(Float)
+    taken_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    __table_args__ = (
+        Index("ix_risk_snapshots_project_taken_at", "project_id", "taken_at"),
+    )
+
+class ProjectVersion(Base):
+    __tablename__ = "project_versions"
+    
+    # Not a foreign key: 0 counts writes to tasks outside any project
+    project_id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)  # bumped by every write to the project's data
+    changed_at = Column(DateTime(timezone=True))
+
+class ChangeLogEntry(Base):
+    __tablename__ = "change_log"
+    
+    seq = Column(Integer, primary_key=True)  # monotonic cursor of delta sync
+    project_id = Column(Integer, nullable=False)
+    entity = Column(String, nullable=False)  # "task", "dependency" or "comment"
+    entity_id = Column(Integer, nullable=False)
+    op = Column(String, nullable=False)  # "insert", "update" or "delete"
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    __table_args__ = (
+        Index("ix_change_log_project_seq", "project_id", "seq"),
+        # Never reuse the sequence numbers of pruned entries
+        {"sqlite_autoincrement": True},
+    )
+
+class Job(Base):
+    __tablename__ = "jobs"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String, nullable=False)  # handler name, e.g. "project-risk-recompute"
+    payload = Column(Text)  # JSON-encoded arguments
+    status = Column(String, nullable=False, default="queued")  # "queued", "running", "succeeded" or "failed"
+    priority = Column(Integer, nullable=False, default=0)  # higher runs first
+    dedup_key = Column(String, nullable=True)  # at most one queued or running job per key
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+    run_after = Column(DateTime(timezone=True), server_default=func.now())  # not claimed before (retry backoff)
+    progress = Column(Float, nullable=False, default=0)  # 0..1, reported by the handler
+    progress_message = Column(String, nullable=True)
+    result = Column(Text, nullable=True)  # JSON-encoded return value of the handler
+    error = Column(Text, nullable=True)  # last failure
+    locked_by = Column(String, nullable=True)  # worker running the job
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)
+    created_by = Column(Integer, ForeignKey("users.id"), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    
+    __table_args__ = (
+        # Claiming picks the next queued job by priority
+        Index("ix_jobs_status_priority_id", "status", "priority", "id"),
+        Index(
+            "uq_jobs_active_dedup_key", "dedup_key", unique=True,
+            sqlite_where=text("status IN ('queued', 'running')"),
+            postgresql_where=text("status IN ('queued', 'running')"),
+        ),
+    )
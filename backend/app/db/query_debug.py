@@ -0,0 +1,168 @@
+"""
+N+1 and slow-query detection for development and tests.
+
+When ``QUERY_DEBUG`` is enabled, every SQL statement executed inside a
+``track_queries()`` block (each HTTP request gets one from
+``QueryDebugMiddleware``) is recorded with its duration. Statements that
+differ only in their parameters share a fingerprint; a fingerprint repeated
+more than ``N_PLUS_ONE_THRESHOLD`` times in one block is reported as a
+likely N+1 (typically a lazy relationship load inside a loop), and raised as
+``NPlusOneError`` when ``QUERY_DEBUG_RAISE`` is set, so tests fail on it.
+
+SELECT statements slower than ``SLOW_QUERY_MS`` get the database's query
+plan attached to their record and to the log.
+"""
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER = r"(?:\?|%s|%\(\w+\)s|:\w+|\$\d+)"
+_IN_LIST = re.compile(rf"\bIN\s*\(\s*{_PLACEHOLDER}(?:\s*,\s*{_PLACEHOLDER})*\s*\)", re.IGNORECASE)
+_SPACE = re.compile(r"\s+")
+
+
+class NPlusOneError(AssertionError):
+    """A block issued too many near-identical queries."""
+
+
+def fingerprint(statement: str) -> str:
+    """Statement text with literals and IN lists normalized away."""
+    text = _STRING.sub("?", statement)
+    text = _NUMBER.sub("?", text)
+    text = _IN_LIST.sub("IN (...)", text)
+    return _SPACE.sub(" ", text).strip()
+
+
+@dataclass
+class QueryRecord:
+    statement: str
+    parameters: Any
+    duration_ms: float
+    plan: Optional[str] = None
+
+
+@dataclass
+class QueryLog:
+    """Statements executed within one ``track_queries()`` block."""
+    label: str
+    queries: List[QueryRecord] = field(default_factory=list)
+
+    def repeated(self, threshold: int) -> Dict[str, int]:
+        """Fingerprints executed more than ``threshold`` times."""
+        counts = Counter(fingerprint(query.statement) for query in self.queries)
+        return {text: count for text, count in counts.items() if count > threshold}
+
+    @property
+    def slow(self) -> List[QueryRecord]:
+        return [query for query in self.queries if query.plan is not None]
+
+
+_current: ContextVar[Optional[QueryLog]] = ContextVar("query_log", default=None)
+
+_settings: Dict[str, Any] = {"threshold": 10, "slow_ms": 100.0, "raise_errors": False}
+
+
+def _explain(conn, statement: str, parameters: Any) -> Optional[str]:
+    """Query plan of a statement, read through a separate DBAPI cursor."""
+    dialect = conn.dialect.name
+    prefix = "EXPLAIN QUERY PLAN " if dialect == "sqlite" else "EXPLAIN "
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        cursor.execute(prefix + statement, parameters)
+        return "\n".join(" | ".join(str(column) for column in row) for row in cursor.fetchall())
+    except Exception as exc:  # the plan is diagnostic only
+        return f"EXPLAIN failed: {exc}"
+    finally:
+        cursor.close()
+
+
+def _before_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    if _current.get() is not None:
+        conn.info.setdefault("debug_query_started", []).append(time.perf_counter())
+
+
+def _after_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    log = _current.get()
+    if log is None or not conn.info.get("debug_query_started"):
+        return
+    duration_ms = (time.perf_counter() - conn.info["debug_query_started"].pop()) * 1000
+    record = QueryRecord(statement=statement, parameters=parameters, duration_ms=duration_ms)
+    if duration_ms > _settings["slow_ms"] and not executemany and statement.lstrip()[:6].upper() == "SELECT":
+        record.plan = _explain(conn, statement, parameters)
+        logger.warning(
+            "Slow query (%.1f ms) in %s:\n%s\nPlan:\n%s", duration_ms, log.label, statement, record.plan,
+        )
+    log.queries.append(record)
+
+
+def install(engine: Engine, threshold: int = 10, slow_ms: float = 100.0, raise_errors: bool = False) -> None:
+    """Record the statements of ``engine`` executed inside ``track_queries()`` blocks."""
+    _settings.update(threshold=threshold, slow_ms=slow_ms, raise_errors=raise_errors)
+    if not event.contains(engine, "before_cursor_execute", _before_execute):
+        event.listen(engine, "before_cursor_execute", _before_execute)
+        event.listen(engine, "after_cursor_execute", _after_execute)
+
+
+def check(log: QueryLog, threshold: Optional[int] = None, raise_errors: Optional[bool] = None) -> Dict[str, int]:
+    """
+    Report repeated statements of a block.
+
+    Returns:
+        Execution counts of the fingerprints over the threshold
+
+    Raises:
+        NPlusOneError: if any, when raising is enabled
+    """
+    threshold = _settings["threshold"] if threshold is None else threshold
+    repeated = log.repeated(threshold)
+    for text, count in repeated.items():
+        logger.warning("Possible N+1 in %s: %d executions of\n%s", log.label, count, text)
+    if repeated and (_settings["raise_errors"] if raise_errors is None else raise_errors):
+        worst = max(repeated, key=repeated.get)
+        raise NPlusOneError(f"{log.label}: {repeated[worst]} executions of {worst}")
+    return repeated
+
+
+@contextmanager
+def track_queries(label: str = "block", threshold: Optional[int] = None, raise_errors: Optional[bool] = None) -> Iterator[QueryLog]:
+    """
+    Record the statements executed in a block and check them on exit.
+
+    Usable directly around code under test::
+
+        with track_queries("project stats", threshold=3, raise_errors=True):
+            project_stats(db, project_ids)
+    """
+    log = QueryLog(label=label)
+    token = _current.set(log)
+    try:
+        yield log
+    finally:
+        _current.reset(token)
+    check(log, threshold, raise_errors)
+
+
+class QueryDebugMiddleware:
+    """Tracks the queries of each HTTP request."""
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        with track_queries(f"{scope['method']} {scope['path']}"):
+            await self.app(scope, receive, send)
@@ -0,0 +1,57 @@
+"""
+Reading append-only tables in id order while writers commit out of order.
+
+Ids come from a sequence when rows are inserted, not when they commit, so on
+PostgreSQL a row can become visible after rows with higher ids were already
+read. A reader that only asks for ids above the highest one it has seen
+would skip it for good. ``SequenceCursor`` remembers the ids it skipped over
+and asks for them again until they show up or a grace period passes (the
+insert may have rolled back, which leaves a permanent hole).
+"""
+import time
+from typing import Callable, Dict, Iterable, List
+
+from sqlalchemy import or_
+from sqlalchemy.sql import ColumnElement
+
+# Ids skipped in one jump beyond this are not tracked; such jumps come from
+# sequence caching or bulk rollbacks, not from in-flight transactions
+MAX_GAPS = 1000
+
+
+class SequenceCursor:
+    """Position in an id-ordered table, plus the skipped ids still awaited."""
+    def __init__(self, position: int, grace: float = 30.0, clock: Callable[[], float] = time.monotonic):
+        self.position = position
+        self.grace = grace
+        self.clock = clock
+        self._gaps: Dict[int, float] = {}  # skipped id -> when it was skipped
+
+    def criterion(self, column: ColumnElement) -> ColumnElement:
+        """Filter for the rows not read yet, including late commits."""
+        now = self.clock()
+        for missing in [i for i, skipped_at in self._gaps.items() if now - skipped_at > self.grace]:
+            del self._gaps[missing]
+        if not self._gaps:
+            return column > self.position
+        return or_(column > self.position, column.in_(sorted(self._gaps)))
+
+    def advance(self, ids: Iterable[int]) -> List[int]:
+        """
+        Move past the ids of rows just read, in ascending order.
+
+        Returns:
+            The ids seen for the first time; rows read again are dropped
+        """
+        now = self.clock()
+        new = []
+        for row_id in ids:
+            if row_id > self.position:
+                if row_id - self.position - 1 <= MAX_GAPS:
+                    for missing in range(self.position + 1, row_id):
+                        self._gaps[missing] = now
+                self.position = row_id
+                new.append(row_id)
+            elif self._gaps.pop(row_id, None) is not None:
+                new.append(row_id)
+        return new
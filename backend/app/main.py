@@ -1,22 +1,77 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Depends, HTTPException, Response, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from datetime import datetime, timedelta
+from sqlalchemy import text
 import uvicorn
 
 from app.api.api import api_router
+from app.api.serialization import DefaultResponse
+from app.core.admission import AdmissionMiddleware, default_classes
+from app.core.compression import CompressionMiddleware
 from app.core.config import settings
-from app.db.database import engine, Base
+from app.core.jobs import job_worker, prune_jobs
+from app.core.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, MetricsMiddleware, registry
+from app.core.periodic import PeriodicTask
+from app.core.profiler import ProfileMiddleware
+from app.core.realtime import hub
+from app.db.database import engine, init_db
+from app.ml.risk_prediction import is_risk_model_ready, warm_up_risk_model
+from app.ml.risk_propagation import prune_risk_snapshots
+from app.services.delta_sync import prune_change_log
+from app.services import jobs as job_handlers  # registers the handlers of the job kinds
+from app.services.escalation import escalation_scanner
+from app.services.notifications import reconcile_unread_counters
+from app.services.project_stats import reconcile_project_stats
+from app.services.reminders import reminder_scheduler
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Schema changes are normally applied by "python -m app.db.migrate" at deploy time
+    if settings.AUTO_MIGRATE:
+        init_db()
+    if settings.RISK_MODEL_WARMUP:
+        warm_up_risk_model()
+    
+    hub.start()
+    if settings.SCHEDULER_ENABLED:
+        for task in background_jobs:
+            task.start()
+    if settings.JOBS_ENABLED:
+        job_worker.start()
+    if settings.METRICS_DIR:
+        metrics_flush.start()
+    try:
+        yield
+    finally:
+        # Running jobs finish, or go back to the queue, before anything they use stops
+        await job_worker.stop(settings.JOB_SHUTDOWN_TIMEOUT_SECONDS)
+        for task in background_jobs:
+            await task.stop()
+        await hub.stop()
+        if settings.METRICS_DIR:
+            await metrics_flush.stop()
+            write_metrics()
 
 app = FastAPI(
     title="ForesightPM API",
     description="API for the ForesightPM project management application",
-    version="0.1.0"
+    version="0.1.0",
+    default_response_class=DefaultResponse,
+    lifespan=lifespan,
 )
 
+# Shed load before any work is done, but inside CORS so that browsers can read the 429/503
+if settings.ADMISSION_ENABLED:
+    app.add_middleware(
+        AdmissionMiddleware,
+        classes=default_classes(),
+        user_rate=settings.ADMISSION_USER_RATE,
+        user_burst=settings.ADMISSION_USER_BURST,
+    )
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -26,9 +81,40 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress large responses (brotli when installed, else gzip)
+app.add_middleware(CompressionMiddleware, minimum_size=settings.COMPRESSION_MINIMUM_SIZE)
+
+# Admins can profile a single request with an "X-Profile: 1" header
+app.add_middleware(ProfileMiddleware, directory=settings.PROFILE_DIR)
+
+# Outermost, so latency and sizes cover everything including compression
+app.add_middleware(MetricsMiddleware)
+
+if settings.QUERY_DEBUG:
+    from app.db.query_debug import QueryDebugMiddleware
+
+    app.add_middleware(QueryDebugMiddleware)
+
 # Include API router
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
+# Periodic background tasks; enable them in one process only
+background_jobs = [
+    PeriodicTask("reminders", reminder_scheduler.tick, settings.SCHEDULER_TICK_SECONDS),
+    PeriodicTask("escalations", escalation_scanner.run, settings.ESCALATION_INTERVAL_SECONDS),
+    PeriodicTask("project-stats", reconcile_project_stats, settings.PROJECT_STATS_RECONCILE_SECONDS),
+    PeriodicTask("unread-counters", reconcile_unread_counters, settings.UNREAD_COUNTER_RECONCILE_SECONDS),
+    PeriodicTask("change-log", prune_change_log, settings.CHANGE_LOG_PRUNE_SECONDS),
+    PeriodicTask("risk-snapshots", prune_risk_snapshots, settings.RISK_SNAPSHOT_PRUNE_SECONDS),
+    PeriodicTask("finished-jobs", prune_jobs, settings.JOB_PRUNE_SECONDS),
+]
+
+def write_metrics() -> None:
+    registry.write(settings.METRICS_DIR)
+
+# Every process publishes its metrics for the one serving the scrape
+metrics_flush = PeriodicTask("metrics", write_metrics, settings.METRICS_FLUSH_SECONDS)
+
 @app.get("/")
 async def root():
     return {
@@ -45,5 +131,31 @@ async def health_check():
         "timestamp": datetime.now().isoformat()
     }
 
+@app.get("/ready")
+async def readiness_check(response: Response):
+    """
+    Ready once the database answers and the risk model is warm; 503 before.
+    """
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        database = "ok"
+    except Exception:
+        database = "unavailable"
+    model = "warm" if is_risk_model_ready() else "loading"
+    ready = database == "ok" and model == "warm"
+    if not ready:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return {
+        "status": "ready" if ready else "starting",
+        "database": database,
+        "model": model,
+        "timestamp": datetime.now().isoformat()
+    }
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return Response(content=registry.render(settings.METRICS_DIR), media_type=METRICS_CONTENT_TYPE)
+
 if __name__ == "__main__":
     uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
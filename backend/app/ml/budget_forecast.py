@@ -0,0 +1,354 @@
+import numpy as np
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.db.models import BudgetEntry, Task, TaskDependency, TaskStatus
+from app.ml.risk_propagation import MAX_RISK, topological_levels
+
+# Working hours per day, used when a task has no start/due dates
+HOURS_PER_DAY = 8.0
+
+# Fallback cost of an hour of work when the project has no spend recorded
+DEFAULT_HOURLY_COST = 50.0
+
+# Upper bound on tasks x scenarios generated and evaluated at once; the
+# delays of a batch are only built when it is evaluated, so this bounds the
+# memory of a forecast however many simulations it runs
+MAX_CELLS_PER_BATCH = 2_000_000
+
+CLOSED_STATUSES = (TaskStatus.COMPLETED, TaskStatus.CANCELLED)
+SLIPPING_STATUSES = (TaskStatus.DELAYED, TaskStatus.BLOCKED)
+
+
+class ProjectSchedule:
+    """
+    Remaining-work schedule of a project as arrays, with its CPM baseline.
+
+    Durations are the remaining working days of each task (zero for closed
+    tasks), so the critical path runs from now to the projected finish.
+    Dependencies are treated as finish-to-start; tasks on a dependency cycle
+    are scheduled as if they had no predecessors.
+    """
+    def __init__(
+        self,
+        ids: np.ndarray,
+        durations: np.ndarray,
+        rates: np.ndarray,
+        risks: np.ndarray,
+        src: np.ndarray,
+        dst: np.ndarray,
+    ):
+        self.ids = ids
+        self.durations = durations
+        self.rates = rates  # remaining hours per remaining day
+        self.risks = risks  # slip probability, 0-1
+        levels = topological_levels(ids.size, src, dst)
+        self.levels = np.maximum(levels, 1)
+
+        # Edges grouped by the level of their dependent task
+        keep = (levels[src] > 0) & (levels[dst] > 0)
+        src, dst = src[keep], dst[keep]
+        order = np.argsort(self.levels[dst], kind="stable")
+        self.src, self.dst = src[order], dst[order]
+        top = int(self.levels.max()) if ids.size else 0
+        self.edge_bounds = np.searchsorted(self.levels[self.dst], np.arange(1, top + 2))
+        self.node_order = np.argsort(self.levels, kind="stable")
+        self.node_bounds = np.searchsorted(self.levels[self.node_order], np.arange(1, top + 2))
+
+        earliest_start, earliest_finish = self.forward(durations[:, None])
+        self.earliest_start = earliest_start[:, 0]
+        self.finish = float(earliest_finish.max()) if ids.size else 0.0
+        self.slack = self._backward() - self.earliest_start
+
+    def forward(self, durations: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        CPM forward pass for many duration scenarios at once.
+
+        Args:
+            durations: Remaining days per task, one column per scenario
+
+        Returns:
+            (earliest start, earliest finish) with the same shape
+        """
+        start = np.zeros_like(durations)
+        finish = durations.copy()
+        for level in range(2, self.edge_bounds.size):
+            lo, hi = self.edge_bounds[level - 1], self.edge_bounds[level]
+            if lo == hi:
+                continue
+            # Predecessors sit on lower levels, so their finish is final
+            np.maximum.at(start, self.dst[lo:hi], finish[self.src[lo:hi]])
+            nodes = self.node_order[self.node_bounds[level - 1]:self.node_bounds[level]]
+            finish[nodes] = start[nodes] + durations[nodes]
+        return start, finish
+
+    def _backward(self) -> np.ndarray:
+        """Latest start of every task that keeps the baseline finish."""
+        latest_finish = np.full(self.ids.size, self.finish)
+        for level in range(self.edge_bounds.size - 1, 1, -1):
+            lo, hi = self.edge_bounds[level - 1], self.edge_bounds[level]
+            if lo == hi:
+                continue
+            # Dependents sit on this level, so their latest finish is final
+            dst = self.dst[lo:hi]
+            np.minimum.at(latest_finish, self.src[lo:hi], latest_finish[dst] - self.durations[dst])
+        return latest_finish - self.durations
+
+    def evaluate(
+        self,
+        scenarios: int,
+        delays: Callable[[int, int], np.ndarray],
+        hourly_cost: float,
+        daily_overhead: float,
+    ) -> Dict[str, np.ndarray]:
+        """
+        Cost overrun of many slip scenarios, evaluated in vectorized batches.
+
+        A slip that fits in a task's slack stretches its remaining effort
+        over more days, charged at its effort rate. Slips beyond the slack
+        push out the project finish, and every extra day costs the project's
+        daily running cost instead.
+
+        Args:
+            scenarios: Number of scenarios
+            delays: Builds the slip in days per task of scenarios [lo, hi),
+                one column per scenario; called once per batch
+            hourly_cost: Cost of an hour of work
+            daily_overhead: Cost of keeping the project running one more day
+
+        Returns:
+            Per scenario: finish and extension in days, absorbed cost,
+            extension cost and total overrun
+        """
+        finish = np.zeros(scenarios)
+        absorbed = np.zeros(scenarios)
+        columns_per_batch = max(1, MAX_CELLS_PER_BATCH // max(self.ids.size, 1))
+        for lo in range(0, scenarios, columns_per_batch):
+            hi = min(lo + columns_per_batch, scenarios)
+            batch = delays(lo, hi)
+            _, batch_finish = self.forward(self.durations[:, None] + batch)
+            finish[lo:hi] = batch_finish.max(axis=0) if self.ids.size else 0.0
+            np.minimum(batch, self.slack[:, None], out=batch)
+            absorbed[lo:hi] = (batch * self.rates[:, None]).sum(axis=0) * hourly_cost
+
+        extension = np.maximum(finish - self.finish, 0.0)
+        extension_cost = extension * daily_overhead
+        return {
+            "finish": finish,
+            "extension": extension,
+            "absorbed_cost": absorbed,
+            "extension_cost": extension_cost,
+            "overrun": absorbed + extension_cost,
+        }
+
+
+def _days(value: Optional[timedelta]) -> float:
+    return value.total_seconds() / 86400.0 if value is not None else 0.0
+
+
+def load_schedule(db: Session, project_id: int) -> Tuple[ProjectSchedule, np.ndarray]:
+    """
+    Load a project's remaining-work schedule.
+
+    Returns:
+        The schedule, and a mask of tasks that are currently slipping
+        (delayed or blocked)
+    """
+    rows = db.query(
+        Task.id, Task.status, Task.start_date, Task.due_date, Task.estimated_hours,
+        Task.completion_percentage, Task.risk_score, Task.propagated_risk_score,
+    ).filter(Task.project_id == project_id).order_by(Task.id).all()
+
+    n = len(rows)
+    ids = np.fromiter((row.id for row in rows), dtype=np.int64, count=n)
+    durations = np.zeros(n)
+    rates = np.zeros(n)
+    risks = np.zeros(n)
+    slipping = np.zeros(n, dtype=bool)
+    for i, row in enumerate(rows):
+        if row.status in CLOSED_STATUSES:
+            continue
+        remaining = 1.0 - min(max(row.completion_percentage or 0.0, 0.0), 100.0) / 100.0
+        hours = (row.estimated_hours or 0.0) * remaining
+        if row.start_date is not None and row.due_date is not None:
+            duration = max(_days(row.due_date - row.start_date), 0.0)
+        else:
+            duration = (row.estimated_hours or 0.0) / HOURS_PER_DAY
+        durations[i] = duration * remaining
+        rates[i] = hours / durations[i] if durations[i] > 0 else 0.0
+        score = row.propagated_risk_score if row.propagated_risk_score is not None else row.risk_score
+        risks[i] = min(max((score or 0.0) / MAX_RISK, 0.0), 1.0)
+        slipping[i] = row.status in SLIPPING_STATUSES
+
+    edges = db.query(TaskDependency.prerequisite_task_id, TaskDependency.dependent_task_id).join(
+        Task, TaskDependency.dependent_task_id == Task.id
+    ).filter(Task.project_id == project_id).all()
+    edge_ids = np.array(edges, dtype=np.int64).reshape(-1, 2)
+    src = np.searchsorted(ids, edge_ids[:, 0])
+    dst = np.searchsorted(ids, edge_ids[:, 1])
+    valid = (src < n) & (dst < n)
+    valid[valid] &= (ids[src[valid]] == edge_ids[valid, 0]) & (ids[dst[valid]] == edge_ids[valid, 1])
+    return ProjectSchedule(ids, durations, rates, risks, src[valid], dst[valid]), slipping
+
+
+def project_cost_rates(db: Session, project_id: int) -> Tuple[Optional[float], Optional[float]]:
+    """
+    Hourly cost and daily running cost of a project, from its actual spend.
+
+    The hourly cost is actual spend over logged task hours; the daily cost
+    is actual spend over the days between the first and last actual entry.
+    Either is None when there is not enough data.
+    """
+    spend, first, last = db.query(
+        func.sum(BudgetEntry.amount), func.min(BudgetEntry.date), func.max(BudgetEntry.date)
+    ).filter(
+        BudgetEntry.project_id == project_id,
+        BudgetEntry.entry_type == "actual",
+    ).one()
+    hours = db.query(func.sum(Task.actual_hours)).filter(Task.project_id == project_id).scalar()
+
+    hourly = spend / hours if spend and hours else None
+    daily = spend / (_days(last - first) + 1.0) if spend and first is not None else None
+    return hourly, daily
+
+
+def forecast_budget_impact(
+    db: Session,
+    project_id: int,
+    scenarios: Optional[List[Dict[str, Any]]] = None,
+    simulations: int = 1000,
+    slip_fraction: float = 0.25,
+    hourly_cost: Optional[float] = None,
+    daily_overhead: Optional[float] = None,
+    seed: Optional[int] = None,
+    top: int = 20,
+) -> Dict[str, Any]:
+    """
+    Forecast the budget impact of schedule slips in a project.
+
+    Evaluates in vectorized batches: the explicit what-if scenarios, a
+    scenario for the currently delayed/blocked tasks, and ``simulations``
+    random scenarios in which each task slips with a probability given by
+    its propagated risk score. Per-task impact of slipping alone follows in
+    closed form from the CPM slack.
+
+    Args:
+        db: Database session
+        project_id: Project to forecast
+        scenarios: What-if scenarios, each with a ``name`` and ``delays``
+            mapping task ids to slip in days
+        simulations: Number of risk-driven random scenarios
+        slip_fraction: Mean slip of a slipping task, as a fraction of its
+            remaining duration
+        hourly_cost: Override for the cost of an hour of work
+        daily_overhead: Override for the cost of one more project day
+        seed: Random seed, for reproducible simulations
+        top: Number of riskiest tasks to report
+
+    Returns:
+        Forecast with cost rates, baseline, scenario results, simulation
+        percentiles and the tasks with the largest expected overrun
+    """
+    schedule, slipping = load_schedule(db, project_id)
+    actual_hourly, actual_daily = project_cost_rates(db, project_id)
+    if hourly_cost is not None:
+        hourly_source = "override"
+    elif actual_hourly is not None:
+        hourly_cost, hourly_source = actual_hourly, "actuals"
+    else:
+        hourly_cost, hourly_source = DEFAULT_HOURLY_COST, "default"
+    if daily_overhead is None:
+        # Without recorded spend, a project day costs a full working day of work
+        daily_overhead = actual_daily if actual_daily is not None else hourly_cost * HOURS_PER_DAY
+
+    n = schedule.ids.size
+    mean_slip = slip_fraction * schedule.durations
+
+    # Named scenarios first, then the random ones
+    named = [{"name": "current_delays", "delays": {}}] + list(scenarios or [])
+    named_delays = np.zeros((n, len(named)))
+    named_delays[:, 0] = np.where(slipping, mean_slip, 0.0)
+    unknown = set()
+    for column, scenario in enumerate(named[1:], start=1):
+        for task_id, days in scenario.get("delays", {}).items():
+            i = int(np.searchsorted(schedule.ids, int(task_id)))
+            if i < n and schedule.ids[i] == int(task_id):
+                named_delays[i, column] = max(float(days), 0.0)
+            else:
+                unknown.add(int(task_id))
+    rng = np.random.default_rng(seed)
+
+    def delays(lo: int, hi: int) -> np.ndarray:
+        batch = np.empty((n, hi - lo))
+        split = min(max(len(named) - lo, 0), hi - lo)
+        batch[:, :split] = named_delays[:, lo:lo + split]
+        # Random scenarios are drawn batch by batch, never all at once
+        simulated = batch[:, split:]
+        simulated[...] = rng.standard_exponential(simulated.shape)
+        simulated *= mean_slip[:, None]
+        simulated[rng.random(simulated.shape) >= schedule.risks[:, None]] = 0.0
+        return batch
+
+    result = schedule.evaluate(len(named) + simulations, delays, hourly_cost, daily_overhead)
+    now = datetime.now(timezone.utc)
+
+    scenario_results = [
+        {
+            "name": scenario.get("name") or f"scenario_{column}",
+            "extension_days": float(result["extension"][column]),
+            "finish_date": now + timedelta(days=float(result["finish"][column])),
+            "absorbed_cost": float(result["absorbed_cost"][column]),
+            "extension_cost": float(result["extension_cost"][column]),
+            "overrun": float(result["overrun"][column]),
+        }
+        for column, scenario in enumerate(named)
+    ]
+
+    simulation = None
+    if simulations:
+        overruns = result["overrun"][len(named):]
+        extensions = result["extension"][len(named):]
+        p50, p90, p95 = np.percentile(overruns, [50, 90, 95])
+        simulation = {
+            "runs": simulations,
+            "mean_overrun": float(overruns.mean()),
+            "p50_overrun": float(p50),
+            "p90_overrun": float(p90),
+            "p95_overrun": float(p95),
+            "mean_extension_days": float(extensions.mean()),
+            "probability_of_extension": float((extensions > 1e-9).mean()),
+        }
+
+    # A single slip costs its absorbed part plus whatever exceeds the slack
+    impact = (
+        np.minimum(mean_slip, schedule.slack) * schedule.rates * hourly_cost
+        + np.maximum(mean_slip - schedule.slack, 0.0) * daily_overhead
+    )
+    expected = schedule.risks * impact
+    riskiest = np.argsort(-expected, kind="stable")[:top]
+
+    return {
+        "project_id": project_id,
+        "hourly_cost": hourly_cost,
+        "hourly_cost_source": hourly_source,
+        "daily_overhead": daily_overhead,
+        "baseline_finish_date": now + timedelta(days=schedule.finish),
+        "baseline_remaining_days": schedule.finish,
+        "critical_task_ids": schedule.ids[(schedule.slack <= 1e-9) & (schedule.durations > 0)].tolist(),
+        "unknown_task_ids": sorted(unknown),
+        "scenarios": scenario_results,
+        "simulation": simulation,
+        "tasks": [
+            {
+                "task_id": int(schedule.ids[i]),
+                "slack_days": float(schedule.slack[i]),
+                "slip_probability": float(schedule.risks[i]),
+                "impact_if_slipped": float(impact[i]),
+                "expected_overrun": float(expected[i]),
+            }
+            for i in riskiest if expected[i] > 0
+        ],
+    }
@@ -0,0 +1,103 @@
+import numpy as np
+
+METHODS = ("lttb", "minmax")
+
+
+def lttb(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets downsampling.
+
+    Keeps the first and last points and, from each of ``n_out - 2``
+    equal-count buckets in between, the point forming the largest triangle
+    with the point kept from the previous bucket and the mean of the next
+    bucket. Preserves the visual shape of a line chart far better than
+    picking every k-th point. Each bucket is one vectorized step.
+
+    Args:
+        x: Sorted x values (e.g. epoch seconds)
+        y: Values
+        n_out: Number of points to keep
+
+    Returns:
+        Sorted indices of the points to keep
+    """
+    n = x.size
+    if n_out >= n:
+        return np.arange(n)
+    if n_out < 3:
+        return np.array([0, n - 1][:max(n_out, 0)], dtype=np.int64)
+
+    # Bucket boundaries over the interior points 1 .. n-2
+    edges = np.floor(np.linspace(1, n - 1, n_out - 1)).astype(np.int64)
+    starts, stops = edges[:-1], edges[1:]
+    sums_x = np.add.reduceat(x[1:n - 1], starts - 1)
+    sums_y = np.add.reduceat(y[1:n - 1], starts - 1)
+    counts = stops - starts
+    # Mean of the following bucket; the last bucket looks at the final point
+    next_x = np.append(sums_x[1:] / counts[1:], x[-1])
+    next_y = np.append(sums_y[1:] / counts[1:], y[-1])
+
+    kept = np.empty(n_out, dtype=np.int64)
+    kept[0], kept[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        bx, by = x[starts[i]:stops[i]], y[starts[i]:stops[i]]
+        # Twice the triangle area; the constant factor does not change the argmax
+        area = np.abs((x[a] - next_x[i]) * (by - y[a]) - (x[a] - bx) * (next_y[i] - y[a]))
+        a = starts[i] + int(np.argmax(area))
+        kept[i + 1] = a
+    return kept
+
+
+def minmax(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Min/max bucketing: keep the lowest and highest point of each x-range.
+
+    Splits the x range into ``n_out // 2`` equal-width buckets and keeps
+    the extremes of each, so spikes are never lost. Fully vectorized.
+
+    Args:
+        x: Sorted x values
+        y: Values
+        n_out: Maximum number of points to keep
+
+    Returns:
+        Sorted indices of the points to keep
+    """
+    n = x.size
+    if n_out >= n:
+        return np.arange(n)
+    buckets = max(n_out // 2, 1)
+    span = x[-1] - x[0]
+    if span > 0:
+        bucket = np.minimum(((x - x[0]) / span * buckets).astype(np.int64), buckets - 1)
+    else:
+        bucket = np.arange(n) * buckets // n
+
+    # x is sorted, so every bucket is a contiguous run of points
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    counts = np.diff(np.r_[starts, n])
+    keep = []
+    for extreme in (np.minimum, np.maximum):
+        values = np.repeat(extreme.reduceat(y, starts), counts)
+        hits = np.flatnonzero(y == values)
+        # First hit of each run
+        keep.append(hits[np.r_[True, bucket[hits[1:]] != bucket[hits[:-1]]]])
+    return np.unique(np.concatenate(keep))
+
+
+def downsample(x: np.ndarray, y: np.ndarray, n_out: int, method: str = "lttb") -> np.ndarray:
+    """
+    Indices of at most ``n_out`` points that represent a series.
+
+    Args:
+        x: Sorted x values
+        y: Values, NaN-free
+        n_out: Target number of points
+        method: "lttb" or "minmax"
+    """
+    if method == "lttb":
+        return lttb(x, y, n_out)
+    if method == "minmax":
+        return minmax(x, y, n_out)
+    raise ValueError(f"Unknown downsampling method: {method}")
@@ -1,13 +1,13 @@
 import numpy as np
-import pandas as pd
-from sklearn.ensemble import RandomForestRegressor
-from typing import Dict, List, Tuple
-import joblib
+from typing import Dict, List, Optional, Tuple
 import os
+import threading
 from datetime import datetime, timedelta
 
 from app.db.models import Task, TaskStatus, TaskPriority
 from app.api.schemas import RiskFactors, RiskPredictionResponse
+from app.core.config import settings
+from app.core.metrics import observe_inference
 
 class RiskPredictionModel:
     """
@@ -31,9 +31,15 @@ class RiskPredictionModel:
             'completion_percentage'
         ]
         
+        # scikit-learn and joblib take most of a second to import; they are
+        # only imported once a model is built (see get_risk_model)
         if model_path and os.path.exists(model_path):
+            import joblib
+
             self.model = joblib.load(model_path)
         else:
+            from sklearn.ensemble import RandomForestRegressor
+
             # Create a new model
             self.model = RandomForestRegressor(
                 n_estimators=100,
@@ -63,7 +69,8 @@ class RiskPredictionModel:
         Returns:
             Predicted risk scores
         """
-        return self.model.predict(X)
+        with observe_inference("risk", rows=len(X)):
+            return self.model.predict(X)
     
     def save_model(self, model_path: str) -> None:
         """
@@ -72,6 +79,8 @@ class RiskPredictionModel:
         Args:
             model_path: Path to save the model
         """
+        import joblib
+
         os.makedirs(os.path.dirname(model_path), exist_ok=True)
         joblib.dump(self.model, model_path)
     
@@ -88,7 +97,7 @@ class RiskPredictionModel:
         # Calculate days until due
         days_until_due = 30  # Default value if due_date is not set
         if task.due_date:
-            days_until_due = max(0, (task.due_date - datetime.now()).days)
+            days_until_due = max(0, (task.due_date - datetime.now(task.due_date.tzinfo)).days)
         
         # Convert priority to numeric value
         priority_mapping = {
@@ -136,7 +145,7 @@ class RiskPredictionModel:
         risk_score = self.predict(features)[0]
         
         # Ensure risk score is between 0 and 10
-        return max(0, min(10, risk_score))
+        return float(max(0, min(10, risk_score)))
     
     def predict_risk_from_factors(self, risk_factors: RiskFactors) -> RiskPredictionResponse:
         """
@@ -263,10 +272,7 @@ class RiskPredictionModel:
         
         return suggestions
 
-# Create a singleton instance
-risk_model = RiskPredictionModel()
-
-def train_model_with_dummy_data():
+def train_model_with_dummy_data(risk_model: RiskPredictionModel) -> RiskPredictionModel:
     """
     Train the risk model with dummy data for demonstration purposes.
     In a real application, this would use historical project data.
@@ -306,5 +312,64 @@ def train_model_with_dummy_data():
     
     return risk_model
 
-# Initialize the model with dummy data
-train_model_with_dummy_data()
+# The shared model is built on first use, or ahead of time by warm_up_risk_model()
+# at startup (or by the pre-fork launcher, app.serve), so importing the app stays fast
+_risk_model: Optional[RiskPredictionModel] = None
+_risk_model_lock = threading.Lock()
+
+def load_risk_model() -> RiskPredictionModel:
+    """
+    Build a risk model: the saved one at ``RISK_MODEL_FILE`` if present,
+    otherwise one trained on dummy data.
+    
+    Returns:
+        The trained model
+    """
+    if os.path.exists(settings.RISK_MODEL_FILE):
+        return RiskPredictionModel(settings.RISK_MODEL_FILE)
+    return train_model_with_dummy_data(RiskPredictionModel())
+
+def risk_model_version() -> Optional[float]:
+    """Modification time of the saved model, None when there is none."""
+    try:
+        return os.path.getmtime(settings.RISK_MODEL_FILE)
+    except OSError:
+        return None
+
+def get_risk_model() -> RiskPredictionModel:
+    """
+    Get the shared risk model, building it on first use.
+    
+    Returns:
+        The trained model
+    """
+    global _risk_model
+    if _risk_model is None:
+        with _risk_model_lock:
+            if _risk_model is None:
+                _risk_model = load_risk_model()
+    return _risk_model
+
+def reload_risk_model() -> RiskPredictionModel:
+    """
+    Build the model again and swap it in; requests keep using the old one
+    until the new one is ready.
+    
+    Returns:
+        The new model
+    """
+    global _risk_model
+    model = load_risk_model()
+    with _risk_model_lock:
+        _risk_model = model
+    return model
+
+def is_risk_model_ready() -> bool:
+    """Whether the shared model has been built."""
+    return _risk_model is not None
+
+def warm_up_risk_model() -> threading.Thread:
+    """Build the shared model in a background thread."""
+    thread = threading.Thread(target=get_risk_model, name="risk-model-warmup", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,331 @@
+import logging
+import numpy as np
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import insert, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.database import SessionLocal
+from app.db.events import Change, record
+from app.db.models import RiskSnapshot, Task, TaskDependency
+
+logger = logging.getLogger(__name__)
+
+# Risk scores are stored on a 0-10 scale
+MAX_RISK = 10.0
+
+# How much of a predecessor's risk carries over to its dependents
+DEFAULT_DECAY = 0.8
+
+
+def build_csr(n: int, src: np.ndarray, dst: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Build a compressed sparse row adjacency (successors) for a graph.
+
+    Args:
+        n: Number of nodes
+        src: Edge source node indices
+        dst: Edge target node indices
+
+    Returns:
+        (offsets, targets) where the successors of node i are
+        targets[offsets[i]:offsets[i + 1]]
+    """
+    order = np.argsort(src, kind="stable")
+    offsets = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(src, minlength=n), out=offsets[1:])
+    return offsets, dst[order]
+
+
+def _gather_successors(offsets: np.ndarray, targets: np.ndarray, nodes: np.ndarray) -> np.ndarray:
+    """Concatenate the successor lists of several nodes without a Python loop."""
+    starts = offsets[nodes]
+    counts = offsets[nodes + 1] - starts
+    total = int(counts.sum())
+    if total == 0:
+        return np.empty(0, dtype=targets.dtype)
+    shifts = np.repeat(starts - np.cumsum(counts) + counts, counts)
+    return targets[np.arange(total) + shifts]
+
+
+def topological_levels(
+    n: int,
+    src: np.ndarray,
+    dst: np.ndarray,
+    active: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    Assign each node its topological level (longest path from a root).
+
+    Args:
+        n: Number of nodes
+        src: Edge source node indices
+        dst: Edge target node indices
+        active: Optional boolean mask; only edges between active nodes are
+            considered and inactive nodes get level 0
+
+    Returns:
+        Level per node, starting at 1 for active roots. Nodes that sit on or
+        behind a cycle are assigned -1.
+    """
+    if active is None:
+        active = np.ones(n, dtype=bool)
+    keep = active[src] & active[dst]
+    src, dst = src[keep], dst[keep]
+
+    offsets, targets = build_csr(n, src, dst)
+    indegree = np.bincount(dst, minlength=n)
+    levels = np.where(active, -1, 0)
+
+    frontier = np.flatnonzero(active & (indegree == 0))
+    level = 1
+    while frontier.size:
+        levels[frontier] = level
+        successors = _gather_successors(offsets, targets, frontier)
+        if successors.size == 0:
+            break
+        np.subtract.at(indegree, successors, 1)
+        frontier = np.unique(successors[indegree[successors] == 0])
+        level += 1
+    return levels
+
+
+def propagate_risk(
+    scores: np.ndarray,
+    src: np.ndarray,
+    dst: np.ndarray,
+    method: str = "noisy_or",
+    decay: float = DEFAULT_DECAY,
+    active: Optional[np.ndarray] = None,
+    current: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    Combine each task's own risk score with the risk of its predecessors.
+
+    Nodes are processed level by level in topological order, so every
+    predecessor is final before its dependents are computed. Each level is a
+    single vectorized step over the edges that point into it.
+
+    Args:
+        scores: Own (model) risk score per node on a 0-10 scale
+        src: Edge source (prerequisite) node indices
+        dst: Edge target (dependent) node indices
+        method: "noisy_or" treats the upstream risks as independent failure
+            probabilities, "max" takes the riskiest upstream path
+        decay: Fraction of a predecessor's propagated risk that is inherited
+        active: Optional boolean mask of nodes to recompute; the others keep
+            their ``current`` value and only act as fixed inputs
+        current: Previously propagated scores, required with ``active``
+
+    Returns:
+        Propagated risk score per node on a 0-10 scale
+    """
+    if method not in ("noisy_or", "max"):
+        raise ValueError(f"Unknown propagation method: {method}")
+
+    n = scores.shape[0]
+    own = np.clip(np.asarray(scores, dtype=np.float64) / MAX_RISK, 0.0, 1.0)
+    if active is None:
+        propagated = own.copy()
+    else:
+        propagated = np.where(active, own, np.asarray(current, dtype=np.float64) / MAX_RISK)
+
+    levels = topological_levels(n, src, dst, active)
+
+    # Only edges pointing into a recomputed, acyclic node contribute
+    keep = levels[dst] > 0
+    src, dst = src[keep], dst[keep]
+    order = np.argsort(levels[dst], kind="stable")
+    src, dst = src[order], dst[order]
+    edge_levels = levels[dst]
+    if edge_levels.size == 0:
+        return propagated * MAX_RISK
+
+    bounds = np.searchsorted(edge_levels, np.arange(1, edge_levels[-1] + 2))
+    for level in range(1, edge_levels[-1] + 1):
+        start, stop = bounds[level - 1], bounds[level]
+        if start == stop:
+            continue
+        level_src, level_dst = src[start:stop], dst[start:stop]
+        inherited = decay * propagated[level_src]
+
+        if method == "max":
+            np.maximum.at(propagated, level_dst, inherited)
+            continue
+
+        nodes, inverse = np.unique(level_dst, return_inverse=True)
+        log_survival = np.bincount(
+            inverse,
+            weights=np.log1p(-np.minimum(inherited, 1.0 - 1e-12)),
+            minlength=nodes.size,
+        )
+        propagated[nodes] = 1.0 - (1.0 - own[nodes]) * np.exp(log_survival)
+
+    return propagated * MAX_RISK
+
+
+def _load_project_graph(db: Session, project_id: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Load task ids, scores and dependency edges of a project as arrays."""
+    rows = db.query(Task.id, Task.risk_score, Task.propagated_risk_score).filter(
+        Task.project_id == project_id
+    ).order_by(Task.id).all()
+    ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+    scores = np.fromiter((row[1] or 0.0 for row in rows), dtype=np.float64, count=len(rows))
+    current = np.fromiter((row[2] or 0.0 for row in rows), dtype=np.float64, count=len(rows))
+
+    edges = db.query(TaskDependency.prerequisite_task_id, TaskDependency.dependent_task_id).join(
+        Task, TaskDependency.dependent_task_id == Task.id
+    ).filter(Task.project_id == project_id).all()
+    edge_ids = np.array(edges, dtype=np.int64).reshape(-1, 2)
+
+    # Map task ids to positions; ids are sorted so searchsorted is exact
+    src = np.searchsorted(ids, edge_ids[:, 0])
+    dst = np.searchsorted(ids, edge_ids[:, 1])
+    valid = (src < ids.size) & (dst < ids.size)
+    valid[valid] &= (ids[src[valid]] == edge_ids[valid, 0]) & (ids[dst[valid]] == edge_ids[valid, 1])
+    return ids, scores, current, src[valid], dst[valid]
+
+
+def _descendants(n: int, src: np.ndarray, dst: np.ndarray, seeds: np.ndarray) -> np.ndarray:
+    """Boolean mask of the seed nodes and everything downstream of them."""
+    offsets, targets = build_csr(n, src, dst)
+    mask = np.zeros(n, dtype=bool)
+    mask[seeds] = True
+    frontier = np.unique(seeds)
+    while frontier.size:
+        successors = _gather_successors(offsets, targets, frontier)
+        frontier = np.unique(successors[~mask[successors]])
+        mask[frontier] = True
+    return mask
+
+
+def _write_changes(db: Session, project_id: int, ids: np.ndarray, old: np.ndarray, new: np.ndarray) -> int:
+    """Persist the propagated scores that actually changed."""
+    changed = np.flatnonzero(np.abs(new - old) > 1e-9)
+    if changed.size:
+        db.bulk_update_mappings(Task, [
+            {"id": int(ids[i]), "propagated_risk_score": float(new[i])}
+            for i in changed
+        ])
+        # Bulk updates skip the unit of work, so announce them explicitly
+        record(db, [
+            Change(
+                op="update",
+                table="tasks",
+                id=int(ids[i]),
+                values={"id": int(ids[i]), "project_id": project_id, "propagated_risk_score": float(new[i])},
+                previous={"propagated_risk_score": float(old[i])},
+            )
+            for i in changed
+        ])
+    return int(changed.size)
+
+
+def _record_snapshot(db: Session, project_id: int, scores: np.ndarray, propagated: np.ndarray) -> None:
+    """
+    Record the project's risk level after a pass, for the risk trend chart.
+
+    A project keeps at most one snapshot per ``RISK_SNAPSHOT_INTERVAL_SECONDS``:
+    a pass within that long of the latest snapshot overwrites its figures,
+    keeping its time, so frequent edits do not grow the table.
+    """
+    if not scores.size:
+        return
+    values = {
+        "task_count": int(scores.size),
+        "mean_risk": float(scores.mean()),
+        "max_risk": float(scores.max()),
+        "mean_propagated_risk": float(propagated.mean()),
+        "max_propagated_risk": float(propagated.max()),
+    }
+    since = datetime.now(timezone.utc) - timedelta(seconds=settings.RISK_SNAPSHOT_INTERVAL_SECONDS)
+    latest = db.query(RiskSnapshot.id).filter(
+        RiskSnapshot.project_id == project_id,
+        RiskSnapshot.taken_at >= since,
+    ).order_by(RiskSnapshot.taken_at.desc(), RiskSnapshot.id.desc()).limit(1).scalar()
+    if latest is not None:
+        db.execute(update(RiskSnapshot).where(RiskSnapshot.id == latest).values(**values))
+    else:
+        db.execute(insert(RiskSnapshot).values(project_id=project_id, **values))
+
+
+def prune_risk_snapshots(session_factory: Callable[[], Session] = SessionLocal) -> int:
+    """
+    Delete risk snapshots older than the retention period.
+
+    Returns:
+        Number of snapshots deleted
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(days=settings.RISK_SNAPSHOT_RETENTION_DAYS)
+    db = session_factory()
+    try:
+        deleted = db.query(RiskSnapshot).filter(RiskSnapshot.taken_at < cutoff).delete(synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+    if deleted:
+        logger.info("Pruned %d risk snapshots", deleted)
+    return deleted
+
+
+def recompute_project_risk(db: Session, project_id: int, method: str = "noisy_or") -> Dict[str, Any]:
+    """
+    Recompute the propagated risk of every task in a project.
+
+    Args:
+        db: Database session; the caller is responsible for committing
+        project_id: Project to recompute
+        method: Propagation method, see ``propagate_risk``
+
+    Returns:
+        Summary of the pass
+    """
+    ids, scores, current, src, dst = _load_project_graph(db, project_id)
+    propagated = propagate_risk(scores, src, dst, method=method)
+    updated = _write_changes(db, project_id, ids, current, propagated)
+    _record_snapshot(db, project_id, scores, propagated)
+    return {
+        "project_id": project_id,
+        "task_count": int(ids.size),
+        "updated_count": updated,
+        "max_propagated_risk": float(propagated.max()) if ids.size else 0.0,
+        "mean_propagated_risk": float(propagated.mean()) if ids.size else 0.0,
+    }
+
+
+def refresh_downstream_risk(db: Session, task_ids: Iterable[int], method: str = "noisy_or") -> int:
+    """
+    Refresh the propagated risk of tasks whose upstream scores changed.
+
+    Only the given tasks and their descendants are recomputed; every other
+    task keeps its stored propagated score and is used as a fixed input.
+
+    Args:
+        db: Database session; the caller is responsible for committing
+        task_ids: Tasks whose own score or dependencies changed
+        method: Propagation method, see ``propagate_risk``
+
+    Returns:
+        Number of tasks whose propagated score was updated
+    """
+    task_ids = list(task_ids)
+    if not task_ids:
+        return 0
+
+    by_project: Dict[int, List[int]] = {}
+    for task_id, project_id in db.query(Task.id, Task.project_id).filter(Task.id.in_(task_ids)):
+        by_project.setdefault(project_id, []).append(task_id)
+
+    updated = 0
+    for project_id, seeds in by_project.items():
+        ids, scores, current, src, dst = _load_project_graph(db, project_id)
+        active = _descendants(ids.size, src, dst, np.searchsorted(ids, seeds))
+        propagated = propagate_risk(scores, src, dst, method=method, active=active, current=current)
+        changed = _write_changes(db, project_id, ids, current, propagated)
+        if changed:
+            _record_snapshot(db, project_id, scores, propagated)
+        updated += changed
+    return updated
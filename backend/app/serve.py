@@ -0,0 +1,244 @@
+"""
+Pre-fork launcher for multi-worker deployments.
+
+The parent process imports the app, applies migrations (when
+``AUTO_MIGRATE`` is set), builds the risk model and the other lookup data
+once, freezes the garbage collector and then forks the workers, which serve
+on a socket the parent opened. Memory pages holding the model stay shared
+between workers through copy-on-write; ``gc.freeze()`` keeps the collector
+of each worker from writing to them.
+
+The parent supervises the workers and restarts any that exit. On SIGHUP, or
+when the saved model file (``RISK_MODEL_FILE``) changes, it builds the
+model again and replaces the workers one at a time, so the new model is
+served without a restart and without refusing connections; the listening
+socket stays open throughout. SIGTERM / SIGINT shut everything down.
+
+Periodic tasks run in the first worker only; queued jobs (``app.core.jobs``)
+are claimed by every worker. Realtime push needs the ``database`` broker
+(``REALTIME_BROKER``) to reach clients of other workers. Each worker writes
+its metrics to ``METRICS_DIR`` (a temporary directory unless set), so
+``/metrics`` reports the whole server whichever worker answers the scrape.
+
+Usage (from backend/):
+    python -m app.serve [--host 0.0.0.0] [--port 8000] [--workers 4]
+"""
+import argparse
+import gc
+import logging
+import os
+import shutil
+import signal
+import socket
+import sys
+import tempfile
+import time
+from typing import Dict, Optional
+
+logger = logging.getLogger("app.serve")
+
+
+def preload(app) -> None:
+    """Build what every worker needs before forking, so it is shared."""
+    from app.api.schemas import ProjectResponse, TaskResponse
+    from app.api.serialization import adapter
+    from app.ml.risk_prediction import get_risk_model
+
+    get_risk_model()
+    app.openapi()
+    for schema in (ProjectResponse, TaskResponse):
+        adapter(schema)
+
+
+def freeze() -> None:
+    """Move everything allocated so far out of reach of the collector."""
+    gc.collect()
+    gc.freeze()
+
+
+class Arbiter:
+    """Forks, supervises and replaces the worker processes."""
+    def __init__(self, app, sock: socket.socket, workers: int, log_level: str, model_check_seconds: float, graceful_timeout: float):
+        self.app = app
+        self.sock = sock
+        self.workers = workers
+        self.log_level = log_level
+        self.model_check_seconds = model_check_seconds
+        self.graceful_timeout = graceful_timeout
+        self.pids: Dict[int, int] = {}  # pid -> worker index
+        self.reload_requested = False
+        self.stopping = False
+
+    def spawn(self, index: int) -> None:
+        pid = os.fork()
+        if pid:
+            self.pids[pid] = index
+            return
+        exit_code = 0
+        try:
+            self._run_worker(index)
+        except BaseException:
+            logger.exception("Worker %d failed", index)
+            exit_code = 1
+        finally:
+            os._exit(exit_code)
+
+    def _run_worker(self, index: int) -> None:
+        import uvicorn
+
+        from app.core.config import settings
+        from app.db.database import engine
+
+        for signum in (signal.SIGHUP, signal.SIGTERM, signal.SIGINT, signal.SIGCHLD):
+            signal.signal(signum, signal.SIG_DFL)
+        signal.signal(signal.SIGHUP, signal.SIG_IGN)
+        # Connections opened by the parent must not be shared with it
+        engine.dispose(close=False)
+        settings.AUTO_MIGRATE = False
+        settings.SCHEDULER_ENABLED = settings.SCHEDULER_ENABLED and index == 0
+        config = uvicorn.Config(self.app, log_level=self.log_level, timeout_graceful_shutdown=self.graceful_timeout)
+        uvicorn.Server(config).run(sockets=[self.sock])
+
+    def stop_worker(self, pid: int) -> None:
+        """Stop a worker gracefully, killing it after the graceful timeout."""
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+        deadline = time.monotonic() + self.graceful_timeout + 5
+        while time.monotonic() < deadline:
+            done, _ = os.waitpid(pid, os.WNOHANG)
+            if done:
+                break
+            time.sleep(0.1)
+        else:
+            os.kill(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+        self.pids.pop(pid, None)
+        self.forget(pid)
+
+    def forget(self, pid: int) -> None:
+        """Drop the live-only metrics of an exited worker."""
+        from app.core.config import settings
+        from app.core.metrics import registry
+
+        if settings.METRICS_DIR:
+            registry.mark_process_dead(settings.METRICS_DIR, pid)
+
+    def reload(self) -> None:
+        """Build the model again in the parent and replace the workers one by one."""
+        from app.ml.risk_prediction import reload_risk_model
+
+        logger.info("Reloading the risk model")
+        try:
+            reload_risk_model()
+        except Exception:
+            logger.exception("Model reload failed; keeping the current workers")
+            return
+        freeze()
+        for pid, index in sorted(self.pids.items(), key=lambda item: item[1]):
+            if self.stopping:
+                return
+            self.stop_worker(pid)
+            self.spawn(index)
+        logger.info("Workers replaced")
+
+    def reap(self) -> None:
+        """Restart workers that exited on their own."""
+        while self.pids:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+            if not pid:
+                return
+            index = self.pids.pop(pid, None)
+            self.forget(pid)
+            if index is not None and not self.stopping:
+                logger.warning("Worker %d (pid %d) exited with status %d; restarting", index, pid, status)
+                time.sleep(1)
+                self.spawn(index)
+
+    def run(self) -> None:
+        from app.ml.risk_prediction import risk_model_version
+
+        def request_stop(signum, frame):
+            self.stopping = True
+
+        def request_reload(signum, frame):
+            self.reload_requested = True
+
+        signal.signal(signal.SIGTERM, request_stop)
+        signal.signal(signal.SIGINT, request_stop)
+        signal.signal(signal.SIGHUP, request_reload)
+
+        for index in range(self.workers):
+            self.spawn(index)
+        logger.info("Serving with %d workers (parent pid %d)", self.workers, os.getpid())
+
+        version: Optional[float] = risk_model_version()
+        next_check = time.monotonic() + self.model_check_seconds
+        while not self.stopping:
+            time.sleep(0.5)
+            self.reap()
+            if time.monotonic() >= next_check:
+                next_check = time.monotonic() + self.model_check_seconds
+                current = risk_model_version()
+                if current != version:
+                    version = current
+                    self.reload_requested = True
+            if self.reload_requested:
+                self.reload_requested = False
+                self.reload()
+
+        logger.info("Shutting down")
+        for pid in list(self.pids):
+            self.stop_worker(pid)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", "2")))
+    parser.add_argument("--log-level", default="info")
+    parser.add_argument("--model-check-seconds", type=float, default=30.0, help="how often to look for a new model file")
+    parser.add_argument("--graceful-timeout", type=float, default=30.0)
+    args = parser.parse_args()
+    logging.basicConfig(level=args.log_level.upper(), format="%(asctime)s %(process)d %(name)s %(levelname)s %(message)s")
+
+    from app.core.config import settings
+    from app.db.database import engine, init_db
+    from app.main import app
+
+    if args.workers > 1 and settings.REALTIME_BROKER == "memory":
+        logger.warning("REALTIME_BROKER=memory: push events only reach clients of the worker that produced them")
+    temporary_metrics_dir = not settings.METRICS_DIR
+    if temporary_metrics_dir:
+        settings.METRICS_DIR = tempfile.mkdtemp(prefix="foresightpm-metrics-")
+    else:
+        # Counts of a previous run must not add to this one's
+        os.makedirs(settings.METRICS_DIR, exist_ok=True)
+        for name in os.listdir(settings.METRICS_DIR):
+            if name.startswith("metrics-"):
+                os.remove(os.path.join(settings.METRICS_DIR, name))
+    if settings.AUTO_MIGRATE:
+        init_db()
+    started = time.perf_counter()
+    preload(app)
+    logger.info("Preloaded the model and lookup data in %.1f s", time.perf_counter() - started)
+    engine.dispose()
+    freeze()
+
+    sock = socket.socket(socket.AF_INET6 if ":" in args.host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((args.host, args.port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+
+    Arbiter(app, sock, args.workers, args.log_level, args.model_check_seconds, args.graceful_timeout).run()
+    sock.close()
+    if temporary_metrics_dir:
+        shutil.rmtree(settings.METRICS_DIR, ignore_errors=True)
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.core.cache import ProjectCache
+from app.db.events import Change, on_commit
+from app.db.models import BudgetEntry
+from app.services.versions import project_versions
+
+ENTRY_TYPES = ("planned", "actual", "forecast")
+
+BUCKETS = ("day", "week", "month")
+
+# Rollups per project and bucket size, as (project version, summary); budget
+# entry writes bump the version, so entries left by a write in another worker
+# process are never served
+budget_cache = ProjectCache()
+
+
+def _period(db: Session, bucket: str):
+    """SQL expression for the ISO date (YYYY-MM-DD) a bucket starts on."""
+    if db.get_bind().dialect.name == "sqlite":
+        if bucket == "day":
+            return func.strftime("%Y-%m-%d", BudgetEntry.date)
+        if bucket == "week":
+            # Back to the Monday of the week
+            return func.date(BudgetEntry.date, "weekday 0", "-6 days")
+        return func.strftime("%Y-%m-01", BudgetEntry.date)
+    return func.to_char(func.date_trunc(bucket, BudgetEntry.date), "YYYY-MM-DD")
+
+
+def _figures(amounts: Dict[str, float]) -> Dict[str, Any]:
+    planned, actual = amounts["planned"], amounts["actual"]
+    variance = planned - actual
+    return {
+        **amounts,
+        "variance": variance,
+        "variance_pct": variance / planned * 100 if planned else None,
+    }
+
+
+def _zero() -> Dict[str, float]:
+    return dict.fromkeys(ENTRY_TYPES, 0.0)
+
+
+def compute_budget_summary(db: Session, project_id: int, budget: Optional[float], bucket: str = "month") -> Dict[str, Any]:
+    """
+    Planned vs actual vs forecast spend of a project, by category and bucket.
+
+    All figures come from one grouped query over (category, bucket, entry
+    type); totals, variance, cumulative series and burn rate are derived in a
+    single pass over its rows.
+
+    Args:
+        db: Database session
+        project_id: Project to summarize
+        budget: The project's total budget, if set
+        bucket: "day", "week" or "month"
+
+    Returns:
+        Summary with totals, per-category and per-bucket figures and burn rate
+    """
+    period = _period(db, bucket).label("period")
+    rows = db.query(
+        BudgetEntry.category,
+        period,
+        BudgetEntry.entry_type,
+        func.sum(BudgetEntry.amount),
+        func.min(BudgetEntry.date),
+        func.max(BudgetEntry.date),
+    ).filter(
+        BudgetEntry.project_id == project_id,
+        BudgetEntry.entry_type.in_(ENTRY_TYPES),
+    ).group_by(BudgetEntry.category, period, BudgetEntry.entry_type).all()
+
+    totals = _zero()
+    by_category: Dict[str, Dict[str, float]] = {}
+    by_period: Dict[str, Dict[str, float]] = {}
+    first_spend: Optional[datetime] = None
+    last_spend: Optional[datetime] = None
+    for category, period_start, entry_type, amount, first, last in rows:
+        amount = amount or 0.0
+        totals[entry_type] += amount
+        by_category.setdefault(category or "uncategorized", _zero())[entry_type] += amount
+        if period_start is not None:
+            by_period.setdefault(str(period_start), _zero())[entry_type] += amount
+        if entry_type == "actual" and first is not None:
+            first_spend = first if first_spend is None else min(first_spend, first)
+            last_spend = last if last_spend is None else max(last_spend, last)
+
+    periods: List[Dict[str, Any]] = []
+    cumulative = _zero()
+    for period_start in sorted(by_period):
+        amounts = by_period[period_start]
+        for entry_type in ENTRY_TYPES:
+            cumulative[entry_type] += amounts[entry_type]
+        periods.append({
+            "period_start": period_start,
+            **_figures(amounts),
+            "cumulative_planned": cumulative["planned"],
+            "cumulative_actual": cumulative["actual"],
+            "cumulative_forecast": cumulative["forecast"],
+        })
+
+    # Burn rate over the span with recorded spend
+    burn = {
+        "per_day": None,
+        "per_bucket": None,
+        "remaining_budget": budget - totals["actual"] if budget is not None else None,
+        "days_remaining": None,
+        "projected_exhaustion_date": None,
+    }
+    if first_spend is not None:
+        days = (last_spend - first_spend).days + 1
+        burn["per_day"] = totals["actual"] / days
+        spent_periods = [p for p in periods if p["actual"]]
+        burn["per_bucket"] = totals["actual"] / len(spent_periods) if spent_periods else None
+        if burn["remaining_budget"] is not None and burn["per_day"] > 0:
+            days_remaining = max(burn["remaining_budget"], 0.0) / burn["per_day"]
+            burn["days_remaining"] = days_remaining
+            burn["projected_exhaustion_date"] = last_spend + timedelta(days=days_remaining)
+
+    return {
+        "project_id": project_id,
+        "bucket": bucket,
+        "budget": budget,
+        "totals": _figures(totals),
+        "categories": [
+            {"category": category, **_figures(amounts)}
+            for category, amounts in sorted(by_category.items())
+        ],
+        "periods": periods,
+        "burn_rate": burn,
+    }
+
+
+def budget_summary(db: Session, project_id: int, budget: Optional[float], bucket: str = "month") -> Dict[str, Any]:
+    """``compute_budget_summary``, cached while the project's version is current."""
+    version = project_versions(db, [project_id])[project_id][0]
+    entry = budget_cache.get(project_id, bucket)
+    if entry is not None and entry[0] == version:
+        return entry[1]
+    generation = budget_cache.generation(project_id)
+    summary = compute_budget_summary(db, project_id, budget, bucket)
+    budget_cache.set(project_id, bucket, (version, summary), generation)
+    return summary
+
+
+@on_commit("budget_entries", "projects")
+def _invalidate_budget_summaries(changes: List[Change]) -> None:
+    for change in changes:
+        if change.table == "projects":
+            budget_cache.invalidate(change.id)
+            continue
+        project_ids = {change.values.get("project_id"), change.previous.get("project_id")} - {None}
+        if not project_ids:
+            budget_cache.invalidate()
+        for project_id in project_ids:
+            budget_cache.invalidate(project_id)
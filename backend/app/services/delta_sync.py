@@ -0,0 +1,128 @@
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session, selectinload, undefer
+
+from app.core.config import settings
+from app.db.database import SessionLocal
+from app.db.models import ChangeLogEntry, Task, TaskComment, TaskDependency
+
+logger = logging.getLogger(__name__)
+
+MAX_CHANGES_PER_PAGE = 5000
+
+
+def current_cursor(db: Session) -> int:
+    """Sequence number of the newest change log entry."""
+    return db.query(func.max(ChangeLogEntry.seq)).scalar() or 0
+
+
+def _cursor_expired(db: Session, since: int) -> bool:
+    """Whether entries after ``since`` may have been pruned already."""
+    oldest = db.query(func.min(ChangeLogEntry.seq)).scalar()
+    return oldest is not None and since < oldest - 1
+
+
+def changes_since(db: Session, project_id: int, since: Optional[int], limit: int = 1000) -> Dict[str, Any]:
+    """
+    Tasks, dependencies and comments of a project changed after a cursor.
+
+    Change log entries are collapsed per entity, so each entity is sent once
+    with its current state, or as a tombstone if its last change was a
+    deletion (or it no longer exists). Without a cursor, or with one older
+    than the retained log, nothing is returned but ``reset`` and the current
+    cursor: the client reloads everything, then polls from that cursor.
+
+    Args:
+        db: Database session
+        project_id: Project to sync
+        since: Cursor returned by the previous call
+        limit: Maximum number of log entries to read
+
+    Returns:
+        Changed entities, tombstones and the cursor to poll from next
+    """
+    empty = {"tasks": [], "dependencies": [], "comments": [], "deleted": []}
+    if since is None or _cursor_expired(db, since):
+        return {"cursor": current_cursor(db), "has_more": False, "reset": True, **empty}
+
+    entries = db.query(ChangeLogEntry.seq, ChangeLogEntry.entity, ChangeLogEntry.entity_id, ChangeLogEntry.op).filter(
+        ChangeLogEntry.project_id == project_id,
+        ChangeLogEntry.seq > since,
+    ).order_by(ChangeLogEntry.seq).limit(limit + 1).all()
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+    if not entries:
+        return {"cursor": since, "has_more": False, "reset": False, **empty}
+
+    # Last change of each entity
+    latest: Dict[Tuple[str, int], Tuple[int, str]] = {}
+    for seq, entity, entity_id, op in entries:
+        latest[(entity, entity_id)] = (seq, op)
+
+    def live_ids(entity: str) -> List[int]:
+        return [entity_id for (kind, entity_id), (_, op) in latest.items() if kind == entity and op != "delete"]
+
+    tasks = _load(db, Task, live_ids("task"), Task.project_id == project_id, options=(
+        selectinload(Task.dependencies), undefer(Task.comment_count),
+    ))
+    dependencies = _load(db, TaskDependency, live_ids("dependency"))
+    comments = _load(db, TaskComment, live_ids("comment"))
+    found = {
+        ("task", task.id) for task in tasks
+    } | {
+        ("dependency", dependency.id) for dependency in dependencies
+    } | {
+        ("comment", comment.id) for comment in comments
+    }
+
+    deleted = [
+        {"entity": entity, "id": entity_id, "seq": seq}
+        for (entity, entity_id), (seq, op) in latest.items()
+        if op == "delete" or (entity, entity_id) not in found
+    ]
+    return {
+        "cursor": entries[-1].seq,
+        "has_more": has_more,
+        "reset": False,
+        "tasks": tasks,
+        "dependencies": dependencies,
+        "comments": comments,
+        "deleted": sorted(deleted, key=lambda tombstone: tombstone["seq"]),
+    }
+
+
+def _load(db: Session, model, ids: List[int], *criteria, options=()) -> List[Any]:
+    rows: List[Any] = []
+    for i in range(0, len(ids), 500):
+        rows.extend(db.query(model).options(*options).filter(model.id.in_(ids[i:i + 500]), *criteria).order_by(model.id))
+    return rows
+
+
+def prune_change_log(session_factory: Callable[[], Session] = SessionLocal) -> int:
+    """
+    Delete change log entries older than the retention period.
+
+    The newest entry is always kept, so the oldest retained sequence number
+    tells which cursors have expired.
+
+    Returns:
+        Number of entries deleted
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(days=settings.CHANGE_LOG_RETENTION_DAYS)
+    db = session_factory()
+    try:
+        newest = current_cursor(db)
+        deleted = db.query(ChangeLogEntry).filter(
+            ChangeLogEntry.created_at < cutoff,
+            ChangeLogEntry.seq < newest,
+        ).delete(synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+    if deleted:
+        logger.info("Pruned %d change log entries", deleted)
+    return deleted
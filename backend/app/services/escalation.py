@@ -0,0 +1,260 @@
+import logging
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Set
+
+from sqlalchemy import func, insert
+from sqlalchemy.orm import Session
+
+from app.db.database import SessionLocal, dialect_insert
+from app.db.models import JobWatermark, Project, Task, TaskEscalation, TaskStatus, User
+from app.services.notifications import insert_notifications
+
+logger = logging.getLogger(__name__)
+
+WATERMARK_NAME = "escalation"
+
+# Overlap when looking for recently updated tasks, covering coarse database
+# timestamps; re-evaluating a task is harmless since levels fire once
+UPDATE_LOOKBACK = timedelta(seconds=5)
+
+OPEN_STATUSES = [s for s in TaskStatus if s not in (TaskStatus.COMPLETED, TaskStatus.CANCELLED)]
+
+
+class EscalationLevel(NamedTuple):
+    level: int
+    hours_before_due: float  # the level applies from this long before the due date
+    max_completion: float  # ... to tasks whose completion is still below this
+    min_progress: float  # ... that gained less than this since the previous level
+
+
+ESCALATION_LEVELS = [
+    EscalationLevel(level=1, hours_before_due=72, max_completion=50, min_progress=0),
+    EscalationLevel(level=2, hours_before_due=24, max_completion=80, min_progress=20),
+    EscalationLevel(level=3, hours_before_due=0, max_completion=100, min_progress=10),
+]
+
+
+@dataclass
+class EscalationReport:
+    started_at: datetime
+    first_run: bool = False
+    candidates: int = 0
+    escalations: int = 0
+    notifications: int = 0
+    by_level: Dict[int, int] = field(default_factory=dict)
+    scan_ms: float = 0.0
+    write_ms: float = 0.0
+    total_ms: float = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def _naive_utc(epoch: float) -> datetime:
+    return datetime.fromtimestamp(epoch, tz=timezone.utc).replace(tzinfo=None)
+
+
+def _record_escalations(db: Session, escalations: List[Dict[str, Any]]) -> Set[int]:
+    """
+    Insert fired levels, skipping those another run recorded first.
+
+    Returns:
+        Ids of the tasks whose level was recorded by this call
+    """
+    table = TaskEscalation.__table__
+    statement = dialect_insert(db, table)
+    if statement is None:
+        db.execute(insert(table), escalations)
+        return {row["task_id"] for row in escalations}
+    statement = statement.on_conflict_do_nothing(
+        index_elements=[table.c.task_id, table.c.level],
+    ).returning(table.c.task_id)
+    return {task_id for (task_id,) in db.execute(statement, escalations)}
+
+
+def _advance_watermark(db: Session, now: datetime) -> None:
+    table = JobWatermark.__table__
+    statement = dialect_insert(db, table)
+    if statement is None:
+        if not db.execute(table.update().where(table.c.name == WATERMARK_NAME).values(watermark=now)).rowcount:
+            db.execute(table.insert().values(name=WATERMARK_NAME, watermark=now))
+        return
+    db.execute(statement.values(name=WATERMARK_NAME, watermark=now).on_conflict_do_update(
+        index_elements=[table.c.name],
+        set_={"watermark": now, "updated_at": func.now()},
+    ))
+
+
+class EscalationScanner:
+    """
+    Escalates open tasks that approach their due date without progress.
+
+    Each run only looks at tasks that newly entered a level's window since
+    the previous run (a due_date range scan on the (status, due_date) index,
+    bounded by the stored watermark) plus tasks updated since then, instead
+    of scanning the whole table. Fired levels are recorded per task so each
+    level fires once; the watermark advances in the same transaction as the
+    escalations and their notifications.
+
+    Runs may overlap (the periodic scan and an admin's manual run): a level
+    another run recorded first is skipped, together with its notifications.
+    """
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        clock: Callable[[], float] = time.time,
+        levels: List[EscalationLevel] = ESCALATION_LEVELS,
+    ):
+        self.session_factory = session_factory
+        self.clock = clock
+        self.levels = sorted(levels, key=lambda level: level.level)
+
+    def _candidates(self, db: Session, since: Optional[datetime], now: datetime) -> Dict[int, Task]:
+        """Open tasks that entered a level window, or changed, since the last run."""
+        columns = (
+            Task.id, Task.title, Task.project_id, Task.due_date,
+            Task.completion_percentage, Task.assignee_id, Task.creator_id,
+        )
+        widest = max(level.hours_before_due for level in self.levels)
+        candidates = {}
+        for level in self.levels:
+            lead = timedelta(hours=level.hours_before_due)
+            query = db.query(*columns).filter(
+                Task.status.in_(OPEN_STATUSES),
+                Task.due_date <= now + lead,
+            )
+            if since is not None:
+                query = query.filter(Task.due_date > since + lead)
+            for row in query:
+                candidates[row.id] = row
+
+        if since is not None:
+            # Due dates or progress may have changed for tasks already in a window
+            for row in db.query(*columns).filter(
+                Task.updated_at > since - UPDATE_LOOKBACK,
+                Task.status.in_(OPEN_STATUSES),
+                Task.due_date <= now + timedelta(hours=widest),
+            ):
+                candidates[row.id] = row
+        return candidates
+
+    def run(self) -> EscalationReport:
+        """Run one incremental scan and record what fired."""
+        started = time.perf_counter()
+        now = _naive_utc(self.clock())
+        report = EscalationReport(started_at=now)
+
+        db = self.session_factory()
+        try:
+            since = db.query(JobWatermark.watermark).filter(JobWatermark.name == WATERMARK_NAME).scalar()
+            if since is not None and since.tzinfo is not None:
+                since = since.astimezone(timezone.utc).replace(tzinfo=None)
+            report.first_run = since is None
+
+            candidates = self._candidates(db, since, now)
+            report.candidates = len(candidates)
+
+            fired: Dict[int, Dict[int, float]] = {}
+            task_ids = list(candidates)
+            for i in range(0, len(task_ids), 500):
+                for task_id, level, completion in db.query(
+                    TaskEscalation.task_id, TaskEscalation.level, TaskEscalation.completion_percentage
+                ).filter(TaskEscalation.task_id.in_(task_ids[i:i + 500])):
+                    fired.setdefault(task_id, {})[level] = completion or 0.0
+            report.scan_ms = (time.perf_counter() - started) * 1000
+
+            escalations, notifications = self._evaluate(db, candidates, fired, now)
+
+            write_started = time.perf_counter()
+            if escalations:
+                recorded = _record_escalations(db, escalations)
+                escalations = [row for row in escalations if row["task_id"] in recorded]
+                notifications = [row for row in notifications if row["related_task_id"] in recorded]
+            report.notifications = insert_notifications(db, notifications)
+            _advance_watermark(db, now)
+            db.commit()
+            report.write_ms = (time.perf_counter() - write_started) * 1000
+        finally:
+            db.close()
+
+        report.escalations = len(escalations)
+        for row in escalations:
+            report.by_level[row["level"]] = report.by_level.get(row["level"], 0) + 1
+        report.total_ms = (time.perf_counter() - started) * 1000
+        logger.info(
+            "Escalation scan: %d candidates, %d escalations, %d notifications "
+            "(scan %.1f ms, write %.1f ms, total %.1f ms)",
+            report.candidates, report.escalations, report.notifications,
+            report.scan_ms, report.write_ms, report.total_ms,
+        )
+        return report
+
+    def _evaluate(self, db: Session, candidates, fired, now: datetime):
+        escalations: List[Dict[str, Any]] = []
+        notifications: List[Dict[str, Any]] = []
+        admins_by_project: Dict[int, List[int]] = {}
+
+        for task in candidates.values():
+            due_date = task.due_date
+            if due_date.tzinfo is not None:
+                due_date = due_date.astimezone(timezone.utc).replace(tzinfo=None)
+            completion = task.completion_percentage or 0.0
+            task_fired = fired.get(task.id, {})
+
+            # Fire only the most severe applicable level; lower ones are implied
+            due_level = None
+            for level in self.levels:
+                if now < due_date - timedelta(hours=level.hours_before_due):
+                    continue
+                if any(fired_level >= level.level for fired_level in task_fired):
+                    continue
+                if completion >= level.max_completion:
+                    continue
+                previous = [lvl for lvl in task_fired if lvl < level.level]
+                if previous and completion - task_fired[max(previous)] >= level.min_progress:
+                    continue
+                due_level = level
+            if due_level is None:
+                continue
+
+            escalations.append({
+                "task_id": task.id,
+                "level": due_level.level,
+                "completion_percentage": completion,
+            })
+
+            recipients = {task.assignee_id or task.creator_id}
+            if due_level.level >= 2:
+                recipients.add(task.creator_id)
+            if due_level.level >= 3:
+                if task.project_id not in admins_by_project:
+                    admins_by_project[task.project_id] = [
+                        user_id for (user_id,) in db.query(User.id).filter(
+                            User.role == "admin",
+                            User.projects.any(Project.id == task.project_id),
+                        )
+                    ]
+                recipients.update(admins_by_project[task.project_id])
+
+            overdue = now >= due_date
+            message = (
+                f"'{task.title}' is overdue at {completion:.0f}% complete."
+                if overdue else
+                f"'{task.title}' is due {due_date:%Y-%m-%d %H:%M} UTC and only {completion:.0f}% complete."
+            )
+            for user_id in recipients:
+                if user_id is None:
+                    continue
+                notifications.append({
+                    "user_id": user_id,
+                    "title": f"Escalation level {due_level.level}",
+                    "message": message,
+                    "notification_type": "escalation",
+                    "related_task_id": task.id,
+                })
+        return escalations, notifications
+
+
+escalation_scanner = EscalationScanner()
@@ -0,0 +1,298 @@
+import threading
+import time
+import numpy as np
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.db.models import ChangeLogEntry, Task
+
+# Rebuild a project's tree once this many writes have piled up in its overlay
+REBUILD_THRESHOLD = 256
+
+# Reload from the database after this long; between reloads an index is
+# brought up to date from the change log, which keeps entries for far longer
+RELOAD_AFTER_SECONDS = 60.0
+
+# Indexes kept per process; the least recently queried projects are dropped
+MAX_PROJECTS = 256
+
+# Subtrees of this height or lower are scanned linearly
+_LEAF_LEVEL = 3
+
+
+def to_epoch(value: Optional[datetime]) -> Optional[float]:
+    """Convert a datetime to epoch seconds; naive values are treated as UTC."""
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def task_interval(start_date: Optional[datetime], due_date: Optional[datetime]) -> Optional[Tuple[float, float]]:
+    """
+    The time span a task occupies on a timeline.
+
+    A task with only one of the two dates occupies a single instant; a task
+    with neither is not on the timeline.
+    """
+    start, end = to_epoch(start_date), to_epoch(due_date)
+    if start is None and end is None:
+        return None
+    if start is None:
+        start = end
+    if end is None:
+        end = start
+    return (start, end) if start <= end else (end, start)
+
+
+class IntervalTree:
+    """
+    Static interval tree stored implicitly in sorted arrays.
+
+    Intervals are sorted by start and laid out as an implicit balanced binary
+    tree over the array positions (the layout used by cgranges); every node
+    additionally stores the largest end in its subtree. An overlap query
+    visits O(log n + k) nodes for k results and needs no per-node objects.
+    """
+    def __init__(self, ids: np.ndarray, starts: np.ndarray, ends: np.ndarray):
+        order = np.argsort(starts, kind="stable")
+        self.ids = np.asarray(ids, dtype=np.int64)[order]
+        self.starts = np.asarray(starts, dtype=np.float64)[order]
+        self.ends = np.asarray(ends, dtype=np.float64)[order]
+        self.max_ends, self.max_level = self._index(self.ends)
+
+    def __len__(self) -> int:
+        return int(self.ids.size)
+
+    @staticmethod
+    def _index(ends: np.ndarray) -> Tuple[np.ndarray, int]:
+        """Compute the subtree maxima bottom-up, one vectorized step per level."""
+        n = ends.size
+        max_ends = ends.copy()
+        if n == 0:
+            return max_ends, -1
+
+        # The rightmost node of the current level and its subtree maximum,
+        # used for right children that fall beyond the end of the array
+        last_i = (n - 1) & ~1
+        last = max_ends[last_i]
+        k = 1
+        while (1 << k) <= n:
+            x = 1 << (k - 1)
+            nodes = np.arange((x << 1) - 1, n, x << 2)
+            right = nodes + x
+            right_max = np.where(right < n, max_ends[np.minimum(right, n - 1)], last)
+            max_ends[nodes] = np.maximum(ends[nodes], np.maximum(max_ends[nodes - x], right_max))
+            last_i = last_i - x if (last_i >> k) & 1 else last_i + x
+            if last_i < n and max_ends[last_i] > last:
+                last = max_ends[last_i]
+            k += 1
+        return max_ends, k - 1
+
+    def overlapping(self, start: float, end: float) -> List[int]:
+        """Ids of the intervals that intersect the closed window [start, end]."""
+        n = self.ids.size
+        if n == 0:
+            return []
+        starts, ends, max_ends = self.starts, self.ends, self.max_ends
+        hits: List[int] = []
+
+        # Stack entries are (node, level, left child already visited)
+        stack = [((1 << self.max_level) - 1, self.max_level, False)]
+        while stack:
+            x, k, left_done = stack.pop()
+            if k <= _LEAF_LEVEL:
+                i = x >> k << k
+                stop = min(i + (1 << (k + 1)) - 1, n)
+                while i < stop and starts[i] <= end:
+                    if ends[i] >= start:
+                        hits.append(i)
+                    i += 1
+            elif not left_done:
+                stack.append((x, k, True))
+                left = x - (1 << (k - 1))
+                if left >= n or max_ends[left] >= start:
+                    stack.append((left, k - 1, False))
+            elif x < n and starts[x] <= end:
+                if ends[x] >= start:
+                    hits.append(x)
+                stack.append((x + (1 << (k - 1)), k - 1, False))
+        return self.ids[hits].tolist()
+
+
+class ProjectIntervals:
+    """
+    Interval index of one project, kept in sync with task writes.
+
+    Writes go to a small overlay (removed ids plus added intervals) that is
+    merged into query results; the tree is rebuilt once the overlay grows
+    past ``REBUILD_THRESHOLD``.
+    """
+    def __init__(self, intervals: Dict[int, Tuple[float, float]], version: int, seq: int):
+        self.loaded_at = time.monotonic()
+        self.version = version  # project version the index reflects
+        self.seq = seq  # last change log entry folded in
+        self._build(intervals)
+
+    def _build(self, intervals: Dict[int, Tuple[float, float]]) -> None:
+        ids = np.fromiter(intervals.keys(), dtype=np.int64, count=len(intervals))
+        spans = np.array(list(intervals.values()), dtype=np.float64).reshape(-1, 2)
+        self.tree = IntervalTree(ids, spans[:, 0], spans[:, 1])
+        self.intervals = intervals
+        self.removed: set = set()
+        self.added: Dict[int, Tuple[float, float]] = {}
+
+    def apply(self, task_id: int, interval: Optional[Tuple[float, float]]) -> None:
+        """Record a task's new interval, or None if it left the timeline."""
+        if task_id in self.intervals:
+            self.removed.add(task_id)
+        self.added.pop(task_id, None)
+        if interval is not None:
+            self.added[task_id] = interval
+            self.intervals[task_id] = interval
+        else:
+            self.intervals.pop(task_id, None)
+
+        if len(self.removed) + len(self.added) > REBUILD_THRESHOLD:
+            self._build(self.intervals)
+
+    def overlapping(self, start: float, end: float) -> List[int]:
+        """Sorted ids of the tasks whose interval intersects [start, end]."""
+        hits = self.tree.overlapping(start, end)
+        if self.removed:
+            hits = [task_id for task_id in hits if task_id not in self.removed]
+        hits.extend(
+            task_id for task_id, (s, e) in self.added.items()
+            if s <= end and e >= start
+        )
+        hits.sort()
+        return hits
+
+
+class _Slot:
+    """A project's index and the lock its loads and queries take."""
+    __slots__ = ("lock", "index")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.index: Optional[ProjectIntervals] = None
+
+
+class TaskIntervalIndex:
+    """
+    Per-project interval indexes over task start/due dates.
+
+    Each index remembers the project version it reflects. A query at a newer
+    version first reads the project's task entries from the change log, which
+    is written in the same transaction as the version bump, and reloads the
+    intervals of those tasks; writes made by any worker process are seen as
+    soon as their version is.
+
+    Each project has its own lock, so loading a large project only holds up
+    queries of that project. At most ``max_projects`` indexes are kept.
+    """
+    def __init__(self, max_projects: int = MAX_PROJECTS):
+        self.max_projects = max_projects
+        self._projects: "OrderedDict[int, _Slot]" = OrderedDict()  # least recently used first
+        self._lock = threading.Lock()
+
+    def _slot(self, project_id: int) -> _Slot:
+        with self._lock:
+            slot = self._projects.pop(project_id, None) or _Slot()
+            self._projects[project_id] = slot
+            while len(self._projects) > self.max_projects:
+                self._projects.popitem(last=False)
+            return slot
+
+    @staticmethod
+    def _intervals(rows) -> Dict[int, Tuple[float, float]]:
+        intervals = {}
+        for task_id, start_date, due_date in rows:
+            interval = task_interval(start_date, due_date)
+            if interval is not None:
+                intervals[task_id] = interval
+        return intervals
+
+    def _load(self, db: Session, project_id: int, version: int) -> ProjectIntervals:
+        # Read before the tasks: changes logged after this are folded in later
+        seq = db.query(func.max(ChangeLogEntry.seq)).filter(ChangeLogEntry.project_id == project_id).scalar() or 0
+        rows = db.query(Task.id, Task.start_date, Task.due_date).filter(
+            Task.project_id == project_id
+        ).all()
+        return ProjectIntervals(self._intervals(rows), version, seq)
+
+    def _catch_up(self, db: Session, project_id: int, index: ProjectIntervals, version: int) -> Optional[ProjectIntervals]:
+        """Fold logged task writes into an index; None when reloading is cheaper."""
+        entries = db.query(ChangeLogEntry.seq, ChangeLogEntry.entity_id).filter(
+            ChangeLogEntry.project_id == project_id,
+            ChangeLogEntry.entity == "task",
+            ChangeLogEntry.seq > index.seq,
+        ).order_by(ChangeLogEntry.seq).limit(REBUILD_THRESHOLD + 1).all()
+        if len(entries) > REBUILD_THRESHOLD:
+            return None
+
+        task_ids = sorted({task_id for _, task_id in entries})
+        if task_ids:
+            # Tasks that were deleted or moved to another project are not found
+            rows = db.query(Task.id, Task.start_date, Task.due_date).filter(
+                Task.id.in_(task_ids),
+                Task.project_id == project_id,
+            ).all()
+            current = self._intervals(rows)
+            for task_id in task_ids:
+                index.apply(task_id, current.get(task_id))
+            index.seq = entries[-1][0]
+        index.version = version
+        return index
+
+    def overlapping(
+        self,
+        db: Session,
+        project_id: int,
+        version: int,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+    ) -> List[int]:
+        """
+        Ids of the tasks of a project that overlap a time window.
+
+        Args:
+            db: Database session, used to load and refresh the project's index
+            project_id: Project to search
+            version: Project version the caller read (see app.services.versions);
+                the result reflects at least that version
+            start: Window start; open-ended if None
+            end: Window end; open-ended if None
+
+        Returns:
+            Sorted task ids
+        """
+        slot = self._slot(project_id)
+        with slot.lock:
+            index = slot.index
+            if index is not None and time.monotonic() - index.loaded_at > RELOAD_AFTER_SECONDS:
+                index = None
+            if index is not None and index.version < version:
+                index = self._catch_up(db, project_id, index, version)
+            if index is None:
+                index = slot.index = self._load(db, project_id, version)
+            return index.overlapping(
+                to_epoch(start) if start is not None else -np.inf,
+                to_epoch(end) if end is not None else np.inf,
+            )
+
+    def invalidate(self, project_id: Optional[int] = None) -> None:
+        """Drop one project's index, or all of them."""
+        with self._lock:
+            if project_id is None:
+                self._projects.clear()
+            else:
+                self._projects.pop(project_id, None)
+
+
+task_intervals = TaskIntervalIndex()
@@ -0,0 +1,71 @@
+"""
+Handlers of the background job kinds (see ``app.core.jobs``).
+
+Importing this module registers them.
+"""
+import logging
+import os
+from typing import Any, Dict, List
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.jobs import JobContext, job_handler
+from app.db.models import Project
+from app.ml.risk_prediction import RiskPredictionModel, reload_risk_model, train_model_with_dummy_data
+from app.ml.risk_propagation import recompute_project_risk
+from app.services.project_stats import correct_project_stats
+
+logger = logging.getLogger(__name__)
+
+
+@job_handler("project-risk-recompute")
+def recompute_projects_risk(db: Session, job: JobContext) -> Dict[str, Any]:
+    """
+    Recompute the propagated risk of the given projects (all when omitted).
+
+    Each project is committed on its own, so a failure keeps the projects
+    finished before it. A retry recomputes every project again, which is
+    safe because the recomputation is idempotent.
+
+    Payload: ``project_ids`` (optional), ``method`` ("noisy_or" or "max").
+    """
+    method = job.payload.get("method", "noisy_or")
+    project_ids: List[int] = job.payload.get("project_ids") or [
+        project_id for (project_id,) in db.query(Project.id).order_by(Project.id)
+    ]
+    tasks = updated = 0
+    for done, project_id in enumerate(project_ids, start=1):
+        summary = recompute_project_risk(db, project_id, method=method)
+        db.commit()
+        tasks += summary["task_count"]
+        updated += summary["updated_count"]
+        job.progress(done / len(project_ids), f"{done} of {len(project_ids)} projects")
+    return {"projects": len(project_ids), "task_count": tasks, "updated_count": updated}
+
+
+@job_handler("project-stats-reconcile")
+def reconcile_stats(db: Session, job: JobContext) -> Dict[str, Any]:
+    """Correct stats rows that drifted from their tasks."""
+    return {"corrected": correct_project_stats(db)}
+
+
+@job_handler("risk-model-retrain")
+def retrain_risk_model(db: Session, job: JobContext) -> Dict[str, Any]:
+    """
+    Train the risk model and save it to ``RISK_MODEL_FILE``.
+
+    This process swaps the new model in at once; app.serve notices the new
+    file and restarts its other workers with it. Training uses the same
+    generated data as startup until historical task outcomes are collected.
+    """
+    job.progress(0.1, "training")
+    model = train_model_with_dummy_data(RiskPredictionModel())
+    job.progress(0.8, "saving")
+    # Written next to the target and renamed, so readers never see a partial file
+    partial = f"{settings.RISK_MODEL_FILE}.{os.getpid()}.tmp"
+    model.save_model(partial)
+    os.replace(partial, settings.RISK_MODEL_FILE)
+    reload_risk_model()
+    logger.info("Saved a retrained risk model to %s", settings.RISK_MODEL_FILE)
+    return {"model_file": settings.RISK_MODEL_FILE}
@@ -0,0 +1,217 @@
+import logging
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import bindparam, event, func, insert, inspect, literal, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.db.database import SessionLocal, dialect_insert
+from app.db.events import Change, record
+from app.db.models import Notification, UserNotificationCounter
+
+logger = logging.getLogger(__name__)
+
+# Rows per INSERT statement when fanning out notifications
+INSERT_BATCH_SIZE = 1000
+
+_counters = UserNotificationCounter.__table__
+
+# Adds a delta to one user's counter; executed once per user in a batch
+_adjust_counter = _counters.update().where(
+    _counters.c.user_id == bindparam("counter_user_id")
+).values(unread_count=_counters.c.unread_count + bindparam("delta"))
+
+
+def _adjust_unread(connection, deltas: Dict[int, int]) -> None:
+    """
+    Apply unread count deltas per user, in the caller's transaction.
+
+    Users without a counter row are skipped; their row is created from an
+    exact count the first time it is read.
+    """
+    params = [
+        {"counter_user_id": user_id, "delta": delta}
+        for user_id, delta in deltas.items()
+        if user_id is not None and delta
+    ]
+    if params:
+        connection.execute(_adjust_counter, params)
+
+
+def insert_notifications(db: Session, rows: List[Dict[str, Any]]) -> int:
+    """
+    Insert many notifications with batched multi-row INSERTs.
+
+    Each row needs user_id, title, message and notification_type, and may set
+    related_task_id. Unread counters are updated in the same transaction.
+    The caller is responsible for committing.
+
+    Args:
+        db: Database session
+        rows: Notification column values
+
+    Returns:
+        Number of notifications inserted
+    """
+    for row in rows:
+        row.setdefault("is_read", False)
+        row.setdefault("related_task_id", None)
+
+    for i in range(0, len(rows), INSERT_BATCH_SIZE):
+        db.execute(insert(Notification), rows[i:i + INSERT_BATCH_SIZE])
+    _adjust_unread(db, Counter(row["user_id"] for row in rows if not row["is_read"]))
+
+    # Let commit listeners (push channels) see the new rows
+    record(db, [Change(op="insert", table="notifications", id=None, values=row) for row in rows])
+    return len(rows)
+
+
+def _exact_unread(user_id):
+    """Unread notifications of a user (a column or a bound id), as a scalar subquery."""
+    return select(func.count()).select_from(Notification).where(
+        Notification.user_id == user_id,
+        Notification.is_read == False,
+    ).scalar_subquery()
+
+
+def unread_count(db: Session, user_id: int) -> int:
+    """
+    A user's unread notification count, read from their counter row.
+
+    The row is created from an exact count on first use, so counters need
+    no backfill for notifications that predate them. Count and insert are
+    one statement, so no notification written meanwhile is missed; any
+    drift left is corrected by ``reconcile_unread_counters``.
+    """
+    def read() -> Optional[int]:
+        return db.query(UserNotificationCounter.unread_count).filter(
+            UserNotificationCounter.user_id == user_id
+        ).scalar()
+
+    count = read()
+    if count is not None:
+        return count
+
+    exact = select(literal(user_id), _exact_unread(user_id))
+    statement = dialect_insert(db, _counters)
+    if statement is not None:
+        db.execute(statement.from_select(["user_id", "unread_count"], exact).on_conflict_do_nothing(
+            index_elements=[_counters.c.user_id],
+        ))
+    else:
+        try:
+            with db.begin_nested():
+                db.execute(insert(_counters).from_select(["user_id", "unread_count"], exact))
+        except IntegrityError:
+            pass  # another request created the row first
+    return read()
+
+
+def reconcile_unread_counters(session_factory: Callable[[], Session] = SessionLocal) -> int:
+    """
+    Correct unread counters that drifted from the notifications.
+
+    Drift can come from writes that bypass the ORM and the helpers here.
+    The drifted rows are recomputed in one UPDATE, so the fix reflects the
+    notifications at that moment.
+
+    Returns:
+        Number of counters corrected
+    """
+    db = session_factory()
+    try:
+        exact = _exact_unread(_counters.c.user_id)
+        corrected = db.execute(
+            _counters.update().where(_counters.c.unread_count != exact).values(unread_count=exact)
+        ).rowcount
+        db.commit()
+    finally:
+        db.close()
+
+    if corrected:
+        logger.warning("Reconciled drifted unread counters of %d users", corrected)
+    return corrected
+
+
+def set_read(db: Session, user_id: int, notification_ids: List[int], is_read: bool = True) -> int:
+    """
+    Mark some of a user's notifications read (or unread).
+
+    Only rows whose state actually changes are counted, so concurrent or
+    repeated requests cannot skew the counter. The caller commits.
+
+    Returns:
+        Number of notifications that changed state
+    """
+    if not notification_ids:
+        return 0
+    changed = db.execute(
+        update(Notification).where(
+            Notification.id.in_(notification_ids),
+            Notification.user_id == user_id,
+            Notification.is_read == (not is_read),
+        ).values(is_read=is_read).execution_options(synchronize_session=False)
+    ).rowcount
+    _adjust_unread(db, {user_id: -changed if is_read else changed})
+    return changed
+
+
+def mark_all_read(db: Session, user_id: int) -> int:
+    """Mark every unread notification of a user read; the caller commits."""
+    changed = db.execute(
+        update(Notification).where(
+            Notification.user_id == user_id,
+            Notification.is_read == False,
+        ).values(is_read=True).execution_options(synchronize_session=False)
+    ).rowcount
+    # Nothing is unread any more, which also corrects any drift
+    db.execute(
+        update(UserNotificationCounter).where(
+            UserNotificationCounter.user_id == user_id
+        ).values(unread_count=0)
+    )
+    return changed
+
+
+def list_notifications(
+    db: Session,
+    user_id: int,
+    limit: int = 50,
+    before_id: Optional[int] = None,
+    unread_only: bool = False,
+) -> List[Notification]:
+    """
+    One page of a user's notifications, newest first.
+
+    Pages are addressed by the id of the last notification of the previous
+    page rather than an offset, so every page is an index range scan.
+    """
+    query = db.query(Notification).filter(Notification.user_id == user_id)
+    if unread_only:
+        query = query.filter(Notification.is_read == False)
+    if before_id is not None:
+        query = query.filter(Notification.id < before_id)
+    return query.order_by(Notification.id.desc()).limit(limit).all()
+
+
+# Notifications written through the ORM keep the counters in step as well
+
+@event.listens_for(Notification, "after_insert")
+def _count_inserted(mapper, connection, target) -> None:
+    if not target.is_read:
+        _adjust_unread(connection, {target.user_id: 1})
+
+
+@event.listens_for(Notification, "after_update")
+def _count_updated(mapper, connection, target) -> None:
+    history = inspect(target).attrs.is_read.history
+    if not history.added or bool(history.deleted and history.deleted[0]) == bool(target.is_read):
+        return
+    _adjust_unread(connection, {target.user_id: -1 if target.is_read else 1})
+
+
+@event.listens_for(Notification, "after_delete")
+def _count_deleted(mapper, connection, target) -> None:
+    if not target.is_read:
+        _adjust_unread(connection, {target.user_id: -1})
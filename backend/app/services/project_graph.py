@@ -0,0 +1,148 @@
+import json
+import struct
+import numpy as np
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.db.models import Task, TaskDependency, TaskStatus
+from app.ml.risk_propagation import build_csr
+
+# Binary payload layout:
+#   magic (4 bytes) | version (uint32) | header length (uint32) | header JSON
+#   followed by little-endian arrays, each starting on an 8-byte boundary.
+# The header lists every array with its dtype, byte offset and length so a
+# browser can wrap them in TypedArrays without copying.
+BINARY_MAGIC = b"FPMG"
+BINARY_VERSION = 1
+BINARY_MEDIA_TYPE = "application/octet-stream"
+
+# Status codes are positions in this list
+STATUS_CODES = [s.value for s in TaskStatus]
+
+
+def _epoch_seconds(values: List[Optional[datetime]]) -> np.ndarray:
+    """Convert datetimes to float epoch seconds, NaN where missing; naive values are UTC."""
+    return np.array(
+        [
+            (value if value.tzinfo else value.replace(tzinfo=timezone.utc)).timestamp()
+            if value is not None else np.nan
+            for value in values
+        ],
+        dtype=np.float64,
+    )
+
+
+def build_project_graph(db: Session, project_id: int) -> Dict[str, Any]:
+    """
+    Load a project's dependency graph as parallel (columnar) arrays.
+
+    Nodes are tasks ordered by id. Edges are stored in CSR form keyed by the
+    prerequisite task: the dependents of node i are
+    ``edge_targets[edge_offsets[i]:edge_offsets[i + 1]]``, as node indices.
+
+    Args:
+        db: Database session
+        project_id: Project to load
+
+    Returns:
+        Dictionary of NumPy arrays and dictionary-encoding tables
+    """
+    rows = db.query(Task.id, Task.start_date, Task.due_date, Task.status).filter(
+        Task.project_id == project_id
+    ).order_by(Task.id).all()
+    ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+    status_lookup = {value: code for code, value in enumerate(STATUS_CODES)}
+    status = np.fromiter(
+        (status_lookup.get(row[3].value if row[3] is not None else None, 0) for row in rows),
+        dtype=np.uint8,
+        count=len(rows),
+    )
+
+    edges = db.query(
+        TaskDependency.prerequisite_task_id,
+        TaskDependency.dependent_task_id,
+        TaskDependency.dependency_type,
+    ).join(Task, TaskDependency.dependent_task_id == Task.id).filter(
+        Task.project_id == project_id
+    ).all()
+
+    dependency_types: List[str] = []
+    type_lookup: Dict[str, int] = {}
+    type_codes = np.empty(len(edges), dtype=np.uint8)
+    for i, edge in enumerate(edges):
+        kind = edge[2] or "finish-to-start"
+        if kind not in type_lookup:
+            type_lookup[kind] = len(dependency_types)
+            dependency_types.append(kind)
+        type_codes[i] = type_lookup[kind]
+
+    edge_ids = np.array([edge[:2] for edge in edges], dtype=np.int64).reshape(-1, 2)
+    src = np.searchsorted(ids, edge_ids[:, 0])
+    dst = np.searchsorted(ids, edge_ids[:, 1])
+    # Edges from tasks of other projects have no node here
+    valid = (src < ids.size) & (dst < ids.size)
+    valid[valid] &= (ids[src[valid]] == edge_ids[valid, 0]) & (ids[dst[valid]] == edge_ids[valid, 1])
+    src, dst, type_codes = src[valid], dst[valid], type_codes[valid]
+    order = np.argsort(src, kind="stable")
+    offsets, targets = build_csr(ids.size, src, dst)
+
+    return {
+        "project_id": project_id,
+        "status_codes": STATUS_CODES,
+        "dependency_types": dependency_types,
+        "node_id": ids,
+        "node_start": _epoch_seconds([row[1] for row in rows]),
+        "node_due": _epoch_seconds([row[2] for row in rows]),
+        "node_status": status,
+        "edge_offsets": offsets.astype(np.uint32),
+        "edge_targets": targets.astype(np.uint32),
+        "edge_type": type_codes[order],
+    }
+
+
+def _array_items(graph: Dict[str, Any]):
+    """The NumPy arrays of a graph payload, in insertion order."""
+    return [(name, value) for name, value in graph.items() if isinstance(value, np.ndarray)]
+
+
+def encode_json(graph: Dict[str, Any]) -> bytes:
+    """Encode a graph as compact JSON; missing dates become null."""
+    payload: Dict[str, Any] = {
+        key: value for key, value in graph.items() if not isinstance(value, np.ndarray)
+    }
+    for name, array in _array_items(graph):
+        if array.dtype.kind == "f":
+            payload[name] = [None if np.isnan(v) else int(v) for v in array.tolist()]
+        else:
+            payload[name] = array.tolist()
+    return json.dumps(payload, separators=(",", ":")).encode("utf-8")
+
+
+def encode_binary(graph: Dict[str, Any]) -> bytes:
+    """Encode a graph as raw little-endian typed arrays behind a JSON header."""
+    header: Dict[str, Any] = {
+        key: value for key, value in graph.items() if not isinstance(value, np.ndarray)
+    }
+    blocks = []
+    arrays = []
+    offset = 0
+    for name, array in _array_items(graph):
+        data = np.ascontiguousarray(array, dtype=array.dtype.newbyteorder("<")).tobytes()
+        data += b"\0" * (-len(data) % 8)
+        arrays.append({"name": name, "dtype": array.dtype.name, "offset": offset, "length": int(array.size)})
+        blocks.append(data)
+        offset += len(data)
+    header["arrays"] = arrays
+
+    header_bytes = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    # Pad so that the first array starts on an 8-byte boundary
+    header_bytes += b" " * (-(12 + len(header_bytes)) % 8)
+
+    return b"".join([
+        BINARY_MAGIC,
+        struct.pack("<II", BINARY_VERSION, len(header_bytes)),
+        header_bytes,
+        *blocks,
+    ])
@@ -0,0 +1,268 @@
+import logging
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from sqlalchemy import case, event, func, inspect, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.db.database import SessionLocal
+from app.db.models import Project, ProjectStats, Task, TaskStatus
+
+logger = logging.getLogger(__name__)
+
+# Risk score (0-10) of the "High" and "Critical" risk levels
+HIGH_RISK_SCORE = 5.0
+
+# Task columns the stats are derived from
+TRACKED_COLUMNS = ("project_id", "status", "estimated_hours", "actual_hours", "completion_percentage", "risk_score")
+
+STATUS_COLUMNS = {status: f"{status.value}_count" for status in TaskStatus}
+
+STAT_COLUMNS = (
+    "task_count", *STATUS_COLUMNS.values(),
+    "estimated_hours", "actual_hours", "completion_total", "high_risk_count",
+)
+
+_stats = ProjectStats.__table__
+
+
+def _contribution(values: Dict[str, Any], whole: bool = True) -> Dict[str, float]:
+    """
+    What a task adds to its project's stats.
+
+    With ``whole=False`` only the columns present in ``values`` count, which
+    gives the delta of a partial update when applied to old and new values.
+    """
+    contribution: Dict[str, float] = {"task_count": 1} if whole else {}
+    if values.get("status") is not None:
+        contribution[STATUS_COLUMNS[TaskStatus(values["status"])]] = 1
+    for key, column in (
+        ("estimated_hours", "estimated_hours"),
+        ("actual_hours", "actual_hours"),
+        ("completion_percentage", "completion_total"),
+    ):
+        if key in values:
+            contribution[column] = values[key] or 0.0
+    if "risk_score" in values:
+        contribution["high_risk_count"] = 1 if (values["risk_score"] or 0.0) >= HIGH_RISK_SCORE else 0
+    return contribution
+
+
+def _apply(connection, project_id: Optional[int], delta: Dict[str, float]) -> None:
+    """Add a delta to a project's stats row, in the caller's transaction."""
+    delta = {column: value for column, value in delta.items() if value}
+    if project_id is None or not delta:
+        return
+    connection.execute(
+        _stats.update().where(_stats.c.project_id == project_id).values({
+            column: _stats.c[column] + value for column, value in delta.items()
+        })
+    )
+
+
+def _subtract(after: Dict[str, float], before: Dict[str, float]) -> Dict[str, float]:
+    return {column: after.get(column, 0) - before.get(column, 0) for column in set(after) | set(before)}
+
+
+def _forget(connection, project_ids: Iterable[Optional[int]]) -> None:
+    """Drop stats rows whose delta is unknown; they are recomputed on next read."""
+    project_ids = [project_id for project_id in project_ids if project_id is not None]
+    if project_ids:
+        connection.execute(_stats.delete().where(_stats.c.project_id.in_(project_ids)))
+
+
+# Deltas from ORM task writes, applied in the same transaction
+
+def _load_previous_values(target, value, oldvalue, initiator):
+    return value
+
+
+for _key in TRACKED_COLUMNS:
+    # Loads a column's previous value when it is assigned, so updates can
+    # always subtract what the task contributed before
+    event.listen(getattr(Task, _key), "set", _load_previous_values, active_history=True, retval=True)
+
+
+@event.listens_for(Task, "after_insert")
+def _task_inserted(mapper, connection, target) -> None:
+    state = inspect(target)
+    _apply(connection, target.project_id, _contribution({key: state.dict.get(key) for key in TRACKED_COLUMNS}))
+
+
+@event.listens_for(Task, "after_delete")
+def _task_deleted(mapper, connection, target) -> None:
+    state = inspect(target)
+    if any(key not in state.dict for key in TRACKED_COLUMNS):
+        _forget(connection, [state.dict.get("project_id")])
+        return
+    contribution = _contribution({key: state.dict[key] for key in TRACKED_COLUMNS})
+    _apply(connection, state.dict["project_id"], {column: -value for column, value in contribution.items()})
+
+
+@event.listens_for(Task, "after_update")
+def _task_updated(mapper, connection, target) -> None:
+    state = inspect(target)
+    before: Dict[str, Any] = {}
+    after: Dict[str, Any] = {}
+    for key in TRACKED_COLUMNS:
+        history = state.attrs[key].history
+        if history.added or history.deleted:
+            before[key] = history.deleted[0] if history.deleted else None
+            after[key] = history.added[0] if history.added else None
+    if not after:
+        return
+
+    if "project_id" not in after:
+        _apply(connection, state.dict.get("project_id"), _subtract(
+            _contribution(after, whole=False), _contribution(before, whole=False)
+        ))
+        return
+
+    # Moved between projects: the whole task leaves one and joins the other
+    if any(key not in after and key not in state.dict for key in TRACKED_COLUMNS):
+        _forget(connection, [before["project_id"], after["project_id"]])
+        return
+    unchanged = {key: state.dict[key] for key in TRACKED_COLUMNS if key not in after}
+    old = _contribution({**unchanged, **before})
+    _apply(connection, before["project_id"], {column: -value for column, value in old.items()})
+    _apply(connection, after["project_id"], _contribution({**unchanged, **after}))
+
+
+@event.listens_for(Project, "after_delete")
+def _project_deleted(mapper, connection, target) -> None:
+    _forget(connection, [target.id])
+
+
+# Exact aggregates
+
+def _aggregate(db: Session, project_ids: Optional[List[int]] = None) -> Dict[int, Dict[str, float]]:
+    """Exact stats of some (or all) projects, from one grouped query over tasks."""
+    query = db.query(
+        Task.project_id,
+        Task.status,
+        func.count(Task.id),
+        func.coalesce(func.sum(Task.estimated_hours), 0),
+        func.coalesce(func.sum(Task.actual_hours), 0),
+        func.coalesce(func.sum(Task.completion_percentage), 0),
+        func.sum(case((Task.risk_score >= HIGH_RISK_SCORE, 1), else_=0)),
+    ).filter(Task.project_id.isnot(None))
+    if project_ids is not None:
+        query = query.filter(Task.project_id.in_(project_ids))
+
+    stats: Dict[int, Dict[str, float]] = {
+        project_id: dict.fromkeys(STAT_COLUMNS, 0) for project_id in project_ids or ()
+    }
+    for project_id, task_status, count, estimated, actual, completion, high_risk in query.group_by(Task.project_id, Task.status):
+        row = stats.setdefault(project_id, dict.fromkeys(STAT_COLUMNS, 0))
+        row["task_count"] += count
+        if task_status is not None:
+            row[STATUS_COLUMNS[task_status]] += count
+        row["estimated_hours"] += estimated
+        row["actual_hours"] += actual
+        row["completion_total"] += completion
+        row["high_risk_count"] += high_risk or 0
+    return stats
+
+
+def _exact_columns() -> Dict[str, Any]:
+    """Correlated subqueries computing each stats column of a row from its tasks."""
+    in_project = Task.project_id == ProjectStats.project_id
+
+    def total(expression, *criteria):
+        return select(func.coalesce(expression, 0)).where(in_project, *criteria).scalar_subquery()
+
+    columns = {
+        "task_count": total(func.count(Task.id)),
+        "estimated_hours": total(func.sum(Task.estimated_hours)),
+        "actual_hours": total(func.sum(Task.actual_hours)),
+        "completion_total": total(func.sum(Task.completion_percentage)),
+        "high_risk_count": total(func.count(Task.id), Task.risk_score >= HIGH_RISK_SCORE),
+    }
+    for task_status, column in STATUS_COLUMNS.items():
+        columns[column] = total(func.count(Task.id), Task.status == task_status)
+    return columns
+
+
+def _as_response(project_id: int, row: Dict[str, float]) -> Dict[str, Any]:
+    count = row["task_count"]
+    return {
+        "project_id": project_id,
+        "task_count": count,
+        "status_counts": {status.value: row[column] for status, column in STATUS_COLUMNS.items()},
+        "estimated_hours": row["estimated_hours"],
+        "actual_hours": row["actual_hours"],
+        "average_completion": row["completion_total"] / count if count else 0.0,
+        "high_risk_count": row["high_risk_count"],
+    }
+
+
+def project_stats(db: Session, project_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+    """
+    Dashboard stats of several projects, read from their stats rows.
+
+    Projects without a row yet get one from an exact aggregate. The caller
+    commits.
+
+    Returns:
+        Stats by project id
+    """
+    rows = {
+        row.project_id: {column: getattr(row, column) for column in STAT_COLUMNS}
+        for row in db.query(ProjectStats).filter(ProjectStats.project_id.in_(project_ids))
+    }
+    missing = [project_id for project_id in project_ids if project_id not in rows]
+    if missing:
+        for project_id, row in _aggregate(db, missing).items():
+            try:
+                with db.begin_nested():
+                    db.execute(_stats.insert().values(project_id=project_id, **row))
+            except IntegrityError:
+                # Another request created the row first; ours is just as exact
+                pass
+            rows[project_id] = row
+    return {project_id: _as_response(project_id, rows[project_id]) for project_id in project_ids}
+
+
+def correct_project_stats(db: Session) -> int:
+    """
+    Correct stats rows that drifted from their tasks; the caller commits.
+
+    Drift can come from writes that bypass the ORM or from a row created
+    while another transaction was writing. Drifted rows are recomputed in
+    one UPDATE with correlated subqueries, so the fix reflects the tasks at
+    that moment rather than at the time of the comparison.
+
+    Returns:
+        Number of stats rows corrected
+    """
+    exact = _aggregate(db)
+    drifted = []
+    for row in db.query(ProjectStats):
+        expected = exact.get(row.project_id) or dict.fromkeys(STAT_COLUMNS, 0)
+        if any(abs((getattr(row, column) or 0) - expected[column]) > 1e-6 for column in STAT_COLUMNS):
+            drifted.append(row.project_id)
+
+    for i in range(0, len(drifted), 500):
+        db.execute(
+            update(ProjectStats).where(
+                ProjectStats.project_id.in_(drifted[i:i + 500])
+            ).values(**_exact_columns()).execution_options(synchronize_session=False)
+        )
+    db.query(ProjectStats).filter(
+        ProjectStats.project_id.notin_(select(Project.id))
+    ).delete(synchronize_session=False)
+
+    if drifted:
+        logger.warning("Reconciled drifted stats of %d projects", len(drifted))
+    return len(drifted)
+
+
+def reconcile_project_stats(session_factory: Callable[[], Session] = SessionLocal) -> int:
+    """``correct_project_stats`` in a session of its own, committed."""
+    db = session_factory()
+    try:
+        corrected = correct_project_stats(db)
+        db.commit()
+    finally:
+        db.close()
+    return corrected
@@ -0,0 +1,99 @@
+from typing import Any, Dict, List
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.core.realtime import Message, hub
+from app.db.events import Change, on_commit, on_flush
+from app.db.models import Project, User
+from app.services.versions import resolve_projects
+
+# Dependency events of the open transaction, as (project id, change)
+_DEPENDENCY_EVENTS_KEY = "dependency_events"
+
+
+def project_channel(project_id: int) -> str:
+    return f"project:{project_id}"
+
+
+def user_channel(user_id: int) -> str:
+    return f"user:{user_id}"
+
+
+def can_subscribe(db: Session, user: User, channel: str) -> bool:
+    """Whether a user may listen on a channel."""
+    kind, _, raw_id = channel.partition(":")
+    if not raw_id.isdigit():
+        return False
+    if kind == "user":
+        return int(raw_id) == user.id
+    if kind == "project":
+        if user.role == "admin":
+            return db.query(Project.id).filter(Project.id == int(raw_id)).first() is not None
+        return db.query(Project.id).filter(
+            Project.id == int(raw_id),
+            Project.members.any(User.id == user.id),
+        ).first() is not None
+    return False
+
+
+def _event(channel: str, entity: str, change: Change, data: Dict[str, Any]) -> Message:
+    return {
+        "type": "change",
+        "channel": channel,
+        "entity": entity,
+        "op": change.op,
+        "id": change.id,
+        "data": data,
+        # Events with the same key coalesce while a client is behind
+        "key": f"{channel}|{entity}:{change.id}" if change.id is not None else None,
+    }
+
+
+@on_commit("tasks")
+def _push_task_changes(changes: List[Change]) -> None:
+    for change in changes:
+        values = change.values
+        data = values if change.op != "delete" else {"id": change.id, "project_id": values.get("project_id")}
+        if values.get("project_id") is not None:
+            channel = project_channel(values["project_id"])
+            hub.publish(channel, _event(channel, "task", change, data))
+
+        # Assignees hear about their tasks, including ones taken away from them
+        assignees = {values.get("assignee_id"), change.previous.get("assignee_id")}
+        for user_id in assignees - {None}:
+            channel = user_channel(user_id)
+            hub.publish(channel, _event(channel, "task", change, data))
+
+
+@on_flush("tasks", "task_dependencies")
+def _resolve_dependency_changes(session: Session, changes: List[Change]) -> None:
+    # Resolved while the transaction is open: once it commits, a task deleted
+    # together with its dependencies can no longer be looked up
+    if not hub.running or not any(change.table == "task_dependencies" for change in changes):
+        return
+    events = session.info.setdefault(_DEPENDENCY_EVENTS_KEY, [])
+    for change, project_ids in resolve_projects(session, changes):
+        if change.table == "task_dependencies":
+            events.extend((project_id, change) for project_id in sorted(project_ids - {None}))
+
+
+@event.listens_for(Session, "after_commit")
+def _push_dependency_changes(session: Session) -> None:
+    for project_id, change in session.info.pop(_DEPENDENCY_EVENTS_KEY, ()):
+        channel = project_channel(project_id)
+        hub.publish(channel, _event(channel, "task_dependency", change, change.values))
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_dependency_changes(session: Session) -> None:
+    session.info.pop(_DEPENDENCY_EVENTS_KEY, None)
+
+
+@on_commit("notifications")
+def _push_notifications(changes: List[Change]) -> None:
+    for change in changes:
+        if change.op != "insert" or change.values.get("user_id") is None:
+            continue
+        channel = user_channel(change.values["user_id"])
+        hub.publish(channel, _event(channel, "notification", change, change.values))
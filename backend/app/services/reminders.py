@@ -0,0 +1,401 @@
+import heapq
+import itertools
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import and_, func, or_
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.database import SessionLocal
+from app.db.models import ChangeLogEntry, Task, TaskDependency, TaskStatus
+from app.db.sequence import SequenceCursor
+from app.services.notifications import insert_notifications
+
+logger = logging.getLogger(__name__)
+
+# Tasks in these states never get reminders or alerts
+CLOSED_STATUSES = (TaskStatus.COMPLETED, TaskStatus.CANCELLED)
+
+# Statuses that make a task an at-risk predecessor
+AT_RISK_STATUSES = (TaskStatus.DELAYED, TaskStatus.BLOCKED)
+
+# Risk score (0-10) from which a predecessor counts as at risk
+AT_RISK_SCORE = 7.5
+
+# Reminder kinds; due-date reminders use the index of their offset instead
+PREDECESSOR_ALERT = -1
+
+
+def _epoch(value: datetime) -> float:
+    """Epoch seconds of a datetime; naive values are treated as UTC."""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def _datetime(epoch: float) -> datetime:
+    """Naive UTC datetime, matching how dates are stored."""
+    return datetime.fromtimestamp(epoch, tz=timezone.utc).replace(tzinfo=None)
+
+
+def _is_at_risk(task_status: Any, risk_score: Optional[float]) -> bool:
+    return task_status in AT_RISK_STATUSES or (risk_score or 0.0) >= AT_RISK_SCORE
+
+
+class TimerHeap:
+    """
+    Min-heap of keyed timers with O(log n) schedule and lazy cancellation.
+
+    Re-scheduling or cancelling a key leaves its old entry in the heap as a
+    tombstone that is skipped when popped; the heap is compacted once
+    tombstones outnumber live timers so memory stays proportional to the
+    number of live timers.
+    """
+    def __init__(self):
+        self._heap: List[Tuple[float, int, Hashable]] = []
+        self._live: Dict[Hashable, int] = {}  # key -> sequence number of its live entry
+        self._counter = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._live)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._live
+
+    def schedule(self, key: Hashable, fire_at: float) -> None:
+        """Schedule a key, replacing any timer it already has."""
+        seq = next(self._counter)
+        self._live[key] = seq
+        heapq.heappush(self._heap, (fire_at, seq, key))
+        if len(self._heap) > 2 * len(self._live) + 64:
+            self._compact()
+
+    def cancel(self, key: Hashable) -> None:
+        self._live.pop(key, None)
+
+    def next_fire_at(self) -> Optional[float]:
+        while self._heap and self._live.get(self._heap[0][2]) != self._heap[0][1]:
+            heapq.heappop(self._heap)
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: float, limit: Optional[int] = None) -> List[Tuple[Hashable, float]]:
+        """Remove and return (key, fire_at) for every timer due at ``now``."""
+        due = []
+        while self._heap and self._heap[0][0] <= now and (limit is None or len(due) < limit):
+            fire_at, seq, key = heapq.heappop(self._heap)
+            if self._live.get(key) == seq:
+                del self._live[key]
+                due.append((key, fire_at))
+        return due
+
+    def _compact(self) -> None:
+        self._heap = [entry for entry in self._heap if self._live.get(entry[2]) == entry[1]]
+        heapq.heapify(self._heap)
+
+
+class ReminderScheduler:
+    """
+    Schedules due-date reminders and predecessor-at-risk alerts.
+
+    Only reminders that fire within the next ``horizon`` seconds are held in
+    memory; the rest stay in the database and are loaded window by window
+    through the due_date index, so millions of pending reminders cost no more
+    memory than the reminders of one window (and never more than
+    ``max_pending``). Every tick first follows the change log, so task writes
+    made by any worker process reschedule the affected timers, and tasks
+    that become at risk alert their dependents. Due reminders are
+    re-validated against the database and inserted in bulk.
+
+    Only the process running the scheduler holds timers; nothing is
+    scheduled until its first tick.
+
+    The clock and session factory are injectable for testing.
+    """
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        clock: Callable[[], float] = time.time,
+        offsets_hours: Sequence[float] = (24.0, 1.0),
+        horizon: float = 3600.0,
+        max_pending: int = 100_000,
+        batch_size: int = 5000,
+    ):
+        self.session_factory = session_factory
+        self.clock = clock
+        self.offsets = [hours * 3600.0 for hours in offsets_hours]
+        self.horizon = horizon
+        self.max_pending = max_pending
+        self.batch_size = batch_size
+
+        self.timers = TimerHeap()
+        # Per offset, the (fire time, due date, task id) keyset position up to
+        # which reminders have been loaded; task id is None once a window is
+        # loaded completely
+        self._loaded_until: List[Optional[Tuple[float, datetime, Optional[int]]]] = [None] * len(self.offsets)
+        self._window_start: Optional[float] = None
+        # Change log position; None until the first tick
+        self._changes: Optional[SequenceCursor] = None
+        # Tasks known to be at risk, so that only new ones alert
+        self._at_risk: Set[int] = set()
+        # Due times of the open tasks loaded so far whose due date has not
+        # passed; the change log only tells which tasks changed, so this is
+        # what a due date was before a write moved it
+        self._due: Dict[int, float] = {}
+        self._lock = threading.Lock()
+
+    # Loading
+
+    def refill(self, db: Session) -> int:
+        """Load the reminders that fire before the end of the current window."""
+        now = self.clock()
+        if self._window_start is None:
+            self._window_start = now
+        target = now + self.horizon
+        loaded = 0
+        for index, offset in enumerate(self.offsets):
+            position = self._loaded_until[index]
+            if position is None:
+                position = (self._window_start, _datetime(self._window_start + offset), None)
+            start, start_due, start_id = position
+            if start >= target and start_id is None:
+                continue
+
+            room = self.max_pending - len(self.timers)
+            if room <= 0:
+                # Loaded later; overdue reminders then fire immediately
+                continue
+            after_start = Task.due_date > start_due
+            if start_id is not None:
+                after_start = or_(after_start, and_(Task.due_date == start_due, Task.id > start_id))
+            rows = db.query(Task.id, Task.due_date).filter(
+                after_start,
+                Task.due_date <= _datetime(target + offset),
+                Task.status.notin_(CLOSED_STATUSES),
+            ).order_by(Task.due_date, Task.id).limit(room).all()
+
+            if len(rows) == room:
+                # Truncated; continue after the last row on the next refill
+                position = (_epoch(rows[-1][1]) - offset, rows[-1][1], rows[-1][0])
+            else:
+                position = (target, _datetime(target + offset), None)
+
+            with self._lock:
+                for task_id, due_date in rows:
+                    self.timers.schedule((task_id, index), _epoch(due_date) - offset)
+                    self._due[task_id] = _epoch(due_date)
+                loaded += len(rows)
+                self._loaded_until[index] = position
+        return loaded
+
+    # Following task writes
+
+    def follow_changes(self, db: Session) -> int:
+        """
+        Reschedule the tasks written since the last call, by any process.
+
+        The first call only records the current end of the change log, the
+        tasks already at risk and the due times of the tasks due within the
+        longest reminder offset, which no window loads.
+
+        Returns:
+            Number of tasks rescheduled
+        """
+        if self._changes is None:
+            self._changes = SequenceCursor(db.query(func.max(ChangeLogEntry.seq)).scalar() or 0)
+            rows = db.query(Task.id).filter(or_(
+                Task.status.in_(AT_RISK_STATUSES),
+                Task.risk_score >= AT_RISK_SCORE,
+            ))
+            self._at_risk = {task_id for (task_id,) in rows}
+            now = self.clock()
+            rows = db.query(Task.id, Task.due_date).filter(
+                Task.due_date > _datetime(now),
+                Task.due_date <= _datetime(now + max(self.offsets, default=0.0)),
+                Task.status.notin_(CLOSED_STATUSES),
+            )
+            self._due = {task_id: _epoch(due_date) for task_id, due_date in rows}
+            return 0
+
+        rescheduled = 0
+        while True:
+            entries = db.query(ChangeLogEntry.seq, ChangeLogEntry.entity, ChangeLogEntry.entity_id).filter(
+                self._changes.criterion(ChangeLogEntry.seq)
+            ).order_by(ChangeLogEntry.seq).limit(self.batch_size).all()
+            new = set(self._changes.advance(seq for seq, _, _ in entries))
+            task_ids = sorted({task_id for seq, entity, task_id in entries if seq in new and entity == "task"})
+            self.reschedule(db, task_ids)
+            rescheduled += len(task_ids)
+            if len(entries) < self.batch_size:
+                return rescheduled
+
+    def reschedule(self, db: Session, task_ids: Iterable[int]) -> None:
+        """Update the timers of some tasks from their current state."""
+        task_ids = list(task_ids)
+        tasks = {}
+        for i in range(0, len(task_ids), 500):
+            for row in db.query(Task.id, Task.due_date, Task.status, Task.risk_score).filter(
+                Task.id.in_(task_ids[i:i + 500])
+            ):
+                tasks[row.id] = row
+
+        now = self.clock()
+        with self._lock:
+            for task_id in task_ids:
+                task = tasks.get(task_id)
+                if task is None:
+                    for index in range(len(self.offsets)):
+                        self.timers.cancel((task_id, index))
+                    self.timers.cancel((task_id, PREDECESSOR_ALERT))
+                    self._at_risk.discard(task_id)
+                    self._due.pop(task_id, None)
+                    continue
+
+                if _is_at_risk(task.status, task.risk_score):
+                    if task_id not in self._at_risk:
+                        self._at_risk.add(task_id)
+                        self.timers.schedule((task_id, PREDECESSOR_ALERT), now)
+                else:
+                    self._at_risk.discard(task_id)
+                self._reschedule_due(task_id, task.due_date, task.status, now)
+
+    def _reschedule_due(self, task_id: int, due_date: Optional[datetime], task_status: Any, now: float) -> None:
+        pending = set()
+        for index in range(len(self.offsets)):
+            if (task_id, index) in self.timers:
+                pending.add(index)
+                self.timers.cancel((task_id, index))
+
+        # Unknown when the task is new, was closed, or was due beyond the loaded windows
+        previous_due_at = self._due.pop(task_id, None)
+        if due_date is None or task_status in CLOSED_STATUSES:
+            return
+        due_at = _epoch(due_date)
+        self._due[task_id] = due_at
+
+        overdue = None
+        for index, offset in enumerate(self.offsets):
+            fire_at = due_at - offset
+            position = self._loaded_until[index]
+            if position is None or fire_at > position[0]:
+                # Not in the loaded window yet; the next refill picks it up
+                continue
+            if fire_at > now:
+                self.timers.schedule((task_id, index), fire_at)
+                continue
+            # The due date moved so close that this reminder's time has passed.
+            # Send it now unless it already went out for the old due date.
+            not_sent = (
+                index in pending
+                or previous_due_at is None
+                or previous_due_at - offset > now
+            )
+            if due_at > now and not_sent and (overdue is None or offset < self.offsets[overdue]):
+                overdue = index
+        if overdue is not None:
+            self.timers.schedule((task_id, overdue), now)
+
+    # Firing
+
+    def tick(self) -> int:
+        """
+        Fire every due timer and refill the window.
+
+        Returns:
+            Number of notifications inserted
+        """
+        db = self.session_factory()
+        try:
+            self.follow_changes(db)
+            now = self.clock()
+            with self._lock:
+                for task_id in [task_id for task_id, due_at in self._due.items() if due_at <= now]:
+                    del self._due[task_id]
+            inserted = 0
+            while True:
+                # Firing frees room in the window, so refill between batches
+                self.refill(db)
+                now = self.clock()
+                with self._lock:
+                    due = self.timers.pop_due(now, limit=self.batch_size)
+                if not due:
+                    break
+                rows = self._build_reminders(db, [key for key, _ in due if key[1] != PREDECESSOR_ALERT])
+                rows += self._build_predecessor_alerts(db, [key[0] for key, _ in due if key[1] == PREDECESSOR_ALERT])
+                inserted += insert_notifications(db, rows)
+                db.commit()
+            if inserted:
+                logger.info("Reminder scheduler inserted %d notifications", inserted)
+            return inserted
+        finally:
+            db.close()
+
+    def _build_reminders(self, db: Session, keys: List[Tuple[int, int]]) -> List[Dict[str, Any]]:
+        if not keys:
+            return []
+        now = self.clock()
+        tasks = {}
+        task_ids = list({task_id for task_id, _ in keys})
+        for i in range(0, len(task_ids), 500):
+            for row in db.query(
+                Task.id, Task.title, Task.due_date, Task.status, Task.assignee_id, Task.creator_id
+            ).filter(Task.id.in_(task_ids[i:i + 500])):
+                tasks[row.id] = row
+
+        rows = []
+        for task_id, index in keys:
+            task = tasks.get(task_id)
+            # The task may have been closed, deleted or moved since it was scheduled
+            if task is None or task.status in CLOSED_STATUSES or task.due_date is None:
+                continue
+            remaining = _epoch(task.due_date) - now
+            if remaining <= 0 or remaining > self.offsets[index] + self.horizon:
+                continue
+            hours = max(1, round(remaining / 3600.0))
+            rows.append({
+                "user_id": task.assignee_id or task.creator_id,
+                "title": "Task due soon",
+                "message": f"'{task.title}' is due in {hours} hour{'s' if hours != 1 else ''}.",
+                "notification_type": "task_due",
+                "related_task_id": task.id,
+            })
+        return rows
+
+    def _build_predecessor_alerts(self, db: Session, task_ids: List[int]) -> List[Dict[str, Any]]:
+        if not task_ids:
+            return []
+        rows = []
+        for i in range(0, len(task_ids), 500):
+            predecessors = db.query(Task).filter(Task.id.in_(task_ids[i:i + 500])).all()
+            at_risk = {
+                task.id: task for task in predecessors
+                if _is_at_risk(task.status, task.risk_score)
+            }
+            if not at_risk:
+                continue
+            dependents = db.query(
+                TaskDependency.prerequisite_task_id, Task.id, Task.title, Task.assignee_id, Task.creator_id
+            ).join(Task, TaskDependency.dependent_task_id == Task.id).filter(
+                TaskDependency.prerequisite_task_id.in_(list(at_risk)),
+                Task.status.notin_(CLOSED_STATUSES),
+            ).all()
+            for prerequisite_id, task_id, title, assignee_id, creator_id in dependents:
+                predecessor = at_risk[prerequisite_id]
+                reason = predecessor.status.value if predecessor.status in AT_RISK_STATUSES else "high risk"
+                rows.append({
+                    "user_id": assignee_id or creator_id,
+                    "title": "Predecessor at risk",
+                    "message": f"'{predecessor.title}', which '{title}' depends on, is {reason.replace('_', ' ')}.",
+                    "notification_type": "risk_alert",
+                    "related_task_id": task_id,
+                })
+        return rows
+
+
+reminder_scheduler = ReminderScheduler(
+    offsets_hours=settings.REMINDER_OFFSETS_HOURS,
+    max_pending=settings.SCHEDULER_MAX_PENDING,
+)
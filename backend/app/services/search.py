@@ -0,0 +1,264 @@
+import html
+import logging
+import re
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import OperationalError, ProgrammingError
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+MAX_TERMS = 8
+
+# Matches ranked per query and table. Ranking costs one scoring call per
+# match, so for very common words only the newest matches are ranked; below
+# this many matches the ranking is exact.
+MAX_RANKED = 10_000
+
+# Snippet markers, private-use characters so they survive HTML escaping
+_OPEN, _CLOSE = "\ue000", "\ue001"
+
+_TERM = re.compile(r"\w+", re.UNICODE)
+
+# SQLite: FTS5 tables kept in sync by triggers. Each row also indexes a
+# "p<project id>" token, so a search is narrowed to the caller's projects
+# inside the index instead of by joining every match. The prefix indexes
+# serve "ab*" / "abc*" lookups without scanning the term list.
+_SQLITE_TABLES = {
+    "task_search": {
+        "create": (
+            "CREATE VIRTUAL TABLE task_search USING fts5("
+            "title, description, project, tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+        ),
+        "fill": (
+            "INSERT INTO task_search(rowid, title, description, project) "
+            "SELECT id, title, description, 'p' || project_id FROM tasks"
+        ),
+        "triggers": [
+            "CREATE TRIGGER IF NOT EXISTS task_search_insert AFTER INSERT ON tasks BEGIN "
+            "INSERT INTO task_search(rowid, title, description, project) "
+            "VALUES (new.id, new.title, new.description, 'p' || new.project_id); END",
+            "CREATE TRIGGER IF NOT EXISTS task_search_delete AFTER DELETE ON tasks BEGIN "
+            "DELETE FROM task_search WHERE rowid = old.id; END",
+            "CREATE TRIGGER IF NOT EXISTS task_search_update AFTER UPDATE OF title, description, project_id ON tasks BEGIN "
+            "UPDATE task_search SET title = new.title, description = new.description, project = 'p' || new.project_id "
+            "WHERE rowid = new.id; END",
+            # Comments follow their task to another project
+            "CREATE TRIGGER IF NOT EXISTS task_search_move AFTER UPDATE OF project_id ON tasks BEGIN "
+            "UPDATE comment_search SET project = 'p' || new.project_id "
+            "WHERE rowid IN (SELECT id FROM task_comments WHERE task_id = new.id); END",
+        ],
+    },
+    "comment_search": {
+        "create": (
+            "CREATE VIRTUAL TABLE comment_search USING fts5("
+            "content, project, tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+        ),
+        "fill": (
+            "INSERT INTO comment_search(rowid, content, project) "
+            "SELECT c.id, c.content, 'p' || t.project_id FROM task_comments c JOIN tasks t ON t.id = c.task_id"
+        ),
+        "triggers": [
+            "CREATE TRIGGER IF NOT EXISTS comment_search_insert AFTER INSERT ON task_comments BEGIN "
+            "INSERT INTO comment_search(rowid, content, project) "
+            "SELECT new.id, new.content, 'p' || project_id FROM tasks WHERE id = new.task_id; END",
+            "CREATE TRIGGER IF NOT EXISTS comment_search_delete AFTER DELETE ON task_comments BEGIN "
+            "DELETE FROM comment_search WHERE rowid = old.id; END",
+            "CREATE TRIGGER IF NOT EXISTS comment_search_update AFTER UPDATE OF content ON task_comments BEGIN "
+            "UPDATE comment_search SET content = new.content WHERE rowid = new.id; END",
+        ],
+    },
+}
+
+# PostgreSQL: generated tsvector columns (titles weigh more) with GIN indexes
+_POSTGRES_STATEMENTS = [
+    "ALTER TABLE tasks ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(description, '')), 'B')) STORED",
+    "CREATE INDEX IF NOT EXISTS ix_tasks_search_vector ON tasks USING gin (search_vector)",
+    "ALTER TABLE task_comments ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS ("
+    "to_tsvector('simple', coalesce(content, ''))) STORED",
+    "CREATE INDEX IF NOT EXISTS ix_task_comments_search_vector ON task_comments USING gin (search_vector)",
+]
+
+
+class SearchUnavailable(Exception):
+    """The database has no full-text index."""
+
+
+def install_search_index(conn: Connection) -> None:
+    """
+    Create the full-text indexes and their sync triggers if missing.
+
+    New SQLite indexes are filled from the existing rows.
+
+    Args:
+        conn: Connection inside a transaction
+    """
+    dialect = conn.dialect.name
+    if dialect == "postgresql":
+        for statement in _POSTGRES_STATEMENTS:
+            conn.execute(text(statement))
+        return
+    if dialect != "sqlite":
+        logger.warning("Full-text search is not supported on %s", dialect)
+        return
+
+    existing = set(inspect(conn).get_table_names())
+    for table, ddl in _SQLITE_TABLES.items():
+        if table in existing:
+            continue
+        try:
+            conn.execute(text(ddl["create"]))
+        except OperationalError as exc:  # SQLite built without FTS5
+            logger.warning("Full-text search is not available: %s", exc.orig)
+            return
+        conn.execute(text(ddl["fill"]))
+    for ddl in _SQLITE_TABLES.values():
+        for statement in ddl["triggers"]:
+            conn.execute(text(statement))
+
+
+def parse_query(query: str) -> List[str]:
+    """Words of a search query, at most MAX_TERMS."""
+    return _TERM.findall(query.lower())[:MAX_TERMS]
+
+
+def _highlight(fragment: Optional[str]) -> str:
+    """Escape a fragment for HTML and mark the matches with <mark>."""
+    return html.escape(fragment or "").replace(_OPEN, "<mark>").replace(_CLOSE, "</mark>")
+
+
+def _fts_query(terms: List[str], columns: str, project_ids: Optional[List[int]]) -> str:
+    """FTS5 query: every term as a prefix in the text columns, within the projects."""
+    query = f"{{{columns}}} : (" + " AND ".join(f'"{term}"*' for term in terms) + ")"
+    if project_ids is not None:
+        query += " AND project : (" + " OR ".join(f"p{project_id}" for project_id in project_ids) + ")"
+    return query
+
+
+def _sqlite_ranked(db: Session, table: str, weights: str, query: str, limit: int) -> List[Any]:
+    """(rowid, score) of the best matches among the newest MAX_RANKED."""
+    return db.execute(text(
+        "SELECT rowid, score FROM ("
+        f"SELECT rowid, -bm25({table}, {weights}) AS score FROM {table} "
+        f"WHERE {table} MATCH :query ORDER BY rowid DESC LIMIT :max_ranked"
+        ") ORDER BY score DESC LIMIT :limit"
+    ), {"query": query, "max_ranked": MAX_RANKED, "limit": limit}).all()
+
+
+def _sqlite_search(db: Session, terms: List[str], project_ids: Optional[List[int]], limit: int) -> List[Dict[str, Any]]:
+    markers = {"open": _OPEN, "close": _CLOSE}
+    hits = []
+
+    query = _fts_query(terms, "title description", project_ids)
+    scores = dict(_sqlite_ranked(db, "task_search", "10.0, 1.0, 0.0", query, limit))
+    if scores:
+        # Snippets only for the hits, in the same MATCH so that the terms are
+        # marked. The hits are among the newest matches, so the rowid range
+        # bounds the scan; "+" keeps FTS5 from looking up each rowid, which
+        # walks the whole match list every time.
+        rows = db.execute(text(
+            "SELECT s.rowid AS task_id, t.project_id, t.title, "
+            "highlight(task_search, 0, :open, :close) AS title_highlight, "
+            "snippet(task_search, 1, :open, :close, '…', 16) AS snippet "
+            "FROM task_search s JOIN tasks t ON t.id = s.rowid "
+            f"WHERE task_search MATCH :query AND s.rowid >= :lowest AND +s.rowid IN ({', '.join(str(rowid) for rowid in scores)})"
+        ), {"query": query, "lowest": min(scores), **markers}).mappings()
+        hits.extend({**row, "comment_id": None, "score": scores[row["task_id"]]} for row in rows)
+
+    query = _fts_query(terms, "content", project_ids)
+    scores = dict(_sqlite_ranked(db, "comment_search", "1.0, 0.0", query, limit))
+    if scores:
+        rows = db.execute(text(
+            "SELECT s.rowid AS comment_id, c.task_id, t.project_id, t.title, "
+            "snippet(comment_search, 0, :open, :close, '…', 16) AS snippet "
+            "FROM comment_search s JOIN task_comments c ON c.id = s.rowid JOIN tasks t ON t.id = c.task_id "
+            f"WHERE comment_search MATCH :query AND s.rowid >= :lowest AND +s.rowid IN ({', '.join(str(rowid) for rowid in scores)})"
+        ), {"query": query, "lowest": min(scores), **markers}).mappings()
+        hits.extend({**row, "title_highlight": None, "score": scores[row["comment_id"]]} for row in rows)
+    return hits
+
+
+def _postgres_search(db: Session, terms: List[str], project_ids: Optional[List[int]], limit: int) -> List[Dict[str, Any]]:
+    params = {
+        "query": " & ".join(f"{term}:*" for term in terms),
+        "project_ids": project_ids or [],
+        "max_ranked": MAX_RANKED,
+        "limit": limit,
+        "options": f"StartSel={_OPEN}, StopSel={_CLOSE}, MaxWords=24, MinWords=8",
+        "title_options": f"StartSel={_OPEN}, StopSel={_CLOSE}, HighlightAll=true",
+    }
+    scope = "" if project_ids is None else " AND t.project_id = ANY(:project_ids)"
+    tasks = db.execute(text(
+        "WITH query AS (SELECT to_tsquery('simple', :query) AS q), "
+        "candidates AS ("
+        "SELECT t.id, t.project_id, t.title, t.description, t.search_vector FROM tasks t, query "
+        f"WHERE t.search_vector @@ query.q{scope} ORDER BY t.id DESC LIMIT :max_ranked), "
+        "ranked AS ("
+        "SELECT c.*, ts_rank_cd(c.search_vector, query.q) AS score FROM candidates c, query "
+        "ORDER BY score DESC LIMIT :limit) "
+        "SELECT r.id AS task_id, NULL::integer AS comment_id, r.project_id, r.title, r.score, "
+        "ts_headline('simple', coalesce(r.title, ''), query.q, :title_options) AS title_highlight, "
+        "ts_headline('simple', coalesce(r.description, ''), query.q, :options) AS snippet "
+        "FROM ranked r, query"
+    ), params).mappings().all()
+    comments = db.execute(text(
+        "WITH query AS (SELECT to_tsquery('simple', :query) AS q), "
+        "candidates AS ("
+        "SELECT c.id, c.task_id, t.project_id, t.title, c.content, c.search_vector "
+        "FROM task_comments c JOIN tasks t ON t.id = c.task_id, query "
+        f"WHERE c.search_vector @@ query.q{scope} ORDER BY c.id DESC LIMIT :max_ranked), "
+        "ranked AS ("
+        "SELECT c.*, ts_rank_cd(c.search_vector, query.q) AS score FROM candidates c, query "
+        "ORDER BY score DESC LIMIT :limit) "
+        "SELECT r.task_id, r.id AS comment_id, r.project_id, r.title, r.score, NULL AS title_highlight, "
+        "ts_headline('simple', coalesce(r.content, ''), query.q, :options) AS snippet "
+        "FROM ranked r, query"
+    ), params).mappings().all()
+    return [dict(row) for row in tasks] + [dict(row) for row in comments]
+
+
+def search(
+    db: Session,
+    terms: List[str],
+    project_ids: Optional[List[int]] = None,
+    limit: int = 20,
+) -> List[Dict[str, Any]]:
+    """
+    Rank tasks and comments matching all terms (as word prefixes).
+
+    Args:
+        db: Database session
+        terms: Words from parse_query()
+        project_ids: Only search these projects (None for all)
+        limit: Maximum number of hits
+
+    Returns:
+        Hits, best first, with highlighted titles and snippets
+
+    Raises:
+        SearchUnavailable: if the database has no full-text index
+    """
+    if project_ids is not None and not project_ids:
+        return []
+    dialect = db.get_bind().dialect.name
+    if dialect not in ("sqlite", "postgresql"):
+        raise SearchUnavailable(dialect)
+    try:
+        if dialect == "sqlite":
+            hits = _sqlite_search(db, terms, project_ids, limit)
+        else:
+            hits = _postgres_search(db, terms, project_ids, limit)
+    except (OperationalError, ProgrammingError) as exc:  # index not installed
+        raise SearchUnavailable(str(exc.orig)) from exc
+
+    hits.sort(key=lambda hit: hit["score"], reverse=True)
+    for hit in hits:
+        hit["type"] = "comment" if hit["comment_id"] is not None else "task"
+        hit["score"] = float(hit["score"])
+        hit["snippet"] = _highlight(hit["snippet"])
+        hit["title_highlight"] = _highlight(hit["title_highlight"] or hit["title"])
+    return hits[:limit]
@@ -0,0 +1,90 @@
+import numpy as np
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.db.models import BudgetEntry, RiskSnapshot
+from app.ml.downsampling import downsample
+from app.services.interval_index import to_epoch
+
+RISK_METRICS = ("mean_risk", "max_risk", "mean_propagated_risk", "max_propagated_risk")
+
+
+def _arrays(rows) -> Tuple[np.ndarray, np.ndarray]:
+    x = np.fromiter((to_epoch(row[0]) for row in rows), dtype=np.float64, count=len(rows))
+    y = np.fromiter((row[1] or 0.0 for row in rows), dtype=np.float64, count=len(rows))
+    return x, y
+
+
+def budget_series(
+    db: Session,
+    project_id: int,
+    entry_type: str = "actual",
+    cumulative: bool = True,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Spend of one entry type over time, one point per budget entry.
+
+    Cumulative series include everything spent before ``start``, so the
+    curve is the same whatever window is requested.
+    """
+    query = db.query(BudgetEntry.date, BudgetEntry.amount).filter(
+        BudgetEntry.project_id == project_id,
+        BudgetEntry.entry_type == entry_type,
+        BudgetEntry.date.isnot(None),
+    )
+    if start is not None:
+        query = query.filter(BudgetEntry.date >= start)
+    if end is not None:
+        query = query.filter(BudgetEntry.date <= end)
+    x, y = _arrays(query.order_by(BudgetEntry.date, BudgetEntry.id).all())
+
+    if cumulative:
+        before = 0.0
+        if start is not None:
+            before = db.query(func.coalesce(func.sum(BudgetEntry.amount), 0.0)).filter(
+                BudgetEntry.project_id == project_id,
+                BudgetEntry.entry_type == entry_type,
+                BudgetEntry.date < start,
+            ).scalar()
+        y = before + np.cumsum(y)
+    return x, y
+
+
+def risk_series(
+    db: Session,
+    project_id: int,
+    metric: str = "mean_propagated_risk",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """One metric of a project's risk snapshots over time."""
+    query = db.query(RiskSnapshot.taken_at, getattr(RiskSnapshot, metric)).filter(
+        RiskSnapshot.project_id == project_id
+    )
+    if start is not None:
+        query = query.filter(RiskSnapshot.taken_at >= start)
+    if end is not None:
+        query = query.filter(RiskSnapshot.taken_at <= end)
+    return _arrays(query.order_by(RiskSnapshot.taken_at, RiskSnapshot.id).all())
+
+
+def downsampled(x: np.ndarray, y: np.ndarray, points: int, method: str = "lttb") -> Dict[str, Any]:
+    """
+    Columnar chart payload with at most ``points`` points.
+
+    Returns:
+        Timestamps (epoch seconds) and values of the kept points, plus the
+        size of the full series
+    """
+    keep = downsample(x, y, points, method)
+    return {
+        "method": method,
+        "total_points": int(x.size),
+        "timestamps": x[keep].tolist(),
+        "values": y[keep].tolist(),
+    }
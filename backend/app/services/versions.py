@@ -0,0 +1,232 @@
+"""
+Per-project change counters and change log.
+
+Every write to a project's data (the project row, its members, tasks,
+dependencies, comments and budget entries) bumps the project's version in the same
+transaction, so the version read by a request always matches the data that
+request reads. Read endpoints derive ETags from it and key cached responses
+on it; because the counter lives in the database it is shared by all worker
+processes. Cached responses of a project are also dropped from this
+process's cache as soon as a write to it commits.
+
+Writes to tasks, dependencies and comments are also appended to the change
+log, which delta sync reads by sequence number.
+"""
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import bindparam, event, inspect, select
+from sqlalchemy.orm import Session
+
+from app.core.cache import ProjectCache
+from app.core.config import settings
+from app.db.events import Change, on_flush
+from app.db.models import ChangeLogEntry, Project, ProjectVersion, Task, User, user_project
+
+# Version key of tasks that belong to no project
+NO_PROJECT = 0
+
+_BUMPED_KEY = "bumped_projects"
+
+# Serialized read responses per project, as (version, body)
+response_cache = ProjectCache(
+    max_entries=settings.RESPONSE_CACHE_SIZE,
+    ttl=settings.RESPONSE_CACHE_TTL_SECONDS,
+)
+
+_versions = ProjectVersion.__table__
+
+
+def _upsert(dialect_name: str):
+    """Statement adding one to a project's version, creating the row if needed."""
+    if dialect_name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    elif dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        return None
+    statement = insert(_versions).values(
+        project_id=bindparam("version_project_id"),
+        version=1,
+        changed_at=bindparam("version_changed_at"),
+    )
+    return statement.on_conflict_do_update(
+        index_elements=[_versions.c.project_id],
+        set_={
+            "version": _versions.c.version + 1,
+            "changed_at": statement.excluded.changed_at,
+        },
+    )
+
+
+def bump(session: Session, project_ids: Iterable[Optional[int]]) -> None:
+    """Bump the versions of some projects, in the session's transaction."""
+    project_ids = sorted({NO_PROJECT if project_id is None else project_id for project_id in project_ids})
+    if not project_ids:
+        return
+    session.info.setdefault(_BUMPED_KEY, set()).update(project_ids)
+    connection = session.connection()
+    now = datetime.now(timezone.utc)
+    statement = _upsert(connection.dialect.name)
+    if statement is not None:
+        connection.execute(statement, [
+            {"version_project_id": project_id, "version_changed_at": now}
+            for project_id in project_ids
+        ])
+        return
+
+    # Portable fallback: update, then insert the rows that did not exist
+    for project_id in project_ids:
+        updated = connection.execute(
+            _versions.update().where(_versions.c.project_id == project_id).values(
+                version=_versions.c.version + 1, changed_at=now,
+            )
+        )
+        if not updated.rowcount:
+            connection.execute(_versions.insert().values(project_id=project_id, version=1, changed_at=now))
+
+
+# Change log entity name of each logged table
+LOGGED_ENTITIES = {"tasks": "task", "task_dependencies": "dependency", "task_comments": "comment"}
+
+_change_log = ChangeLogEntry.__table__
+
+
+def _task_projects(session: Session, task_ids: Set[int]) -> Dict[int, Optional[int]]:
+    projects: Dict[int, Optional[int]] = {}
+    task_ids = list(task_ids)
+    for i in range(0, len(task_ids), 500):
+        rows = session.connection().execute(
+            select(Task.id, Task.project_id).where(Task.id.in_(task_ids[i:i + 500]))
+        )
+        projects.update((task_id, project_id) for task_id, project_id in rows)
+    return projects
+
+
+def _related_tasks(change: Change) -> Set[int]:
+    keys = ("dependent_task_id", "prerequisite_task_id") if change.table == "task_dependencies" else ("task_id",)
+    return {
+        task_id for key in keys
+        for task_id in (change.values.get(key), change.previous.get(key))
+        if task_id is not None
+    }
+
+
+def resolve_projects(session: Session, changes: List[Change]) -> List[Tuple[Change, Set[Optional[int]]]]:
+    """
+    Pair each change of a flush with the projects whose data it touches.
+
+    Must run at flush time: tasks deleted in the same flush are only known
+    from their own changes afterwards.
+    """
+    # Tasks deleted in the same flush as their dependencies and comments are
+    # already gone from the table, so their own changes are looked at first
+    task_projects: Dict[int, Optional[int]] = {}
+    for change in changes:
+        if change.table == "tasks" and "project_id" in change.values:
+            task_projects[change.id] = change.values["project_id"]
+    unknown: Set[int] = set()
+    for change in changes:
+        if change.table == "tasks" and "project_id" not in change.values:
+            unknown.add(change.id)
+        elif change.table in ("task_dependencies", "task_comments"):
+            unknown |= _related_tasks(change)
+    task_projects.update(_task_projects(session, unknown - set(task_projects)))
+
+    user_projects: Dict[int, Set[int]] = {}
+    user_ids = {change.id for change in changes if change.table == "users" and change.op != "insert"}
+    if user_ids:
+        # Member details are part of the project response
+        rows = session.connection().execute(
+            select(user_project.c.user_id, user_project.c.project_id).where(user_project.c.user_id.in_(user_ids))
+        )
+        for user_id, project_id in rows:
+            user_projects.setdefault(user_id, set()).add(project_id)
+
+    resolved = []
+    for change in changes:
+        if change.table == "projects":
+            project_ids = {change.id}
+        elif change.table == "tasks":
+            project_ids = {task_projects.get(change.id)}
+            if "project_id" in change.previous:
+                project_ids.add(change.previous["project_id"])
+        elif change.table == "users":
+            project_ids = user_projects.get(change.id, set())
+        elif change.table == "budget_entries":
+            project_ids = {change.values.get("project_id"), change.previous.get("project_id")} - {None}
+        else:
+            project_ids = {task_projects[task_id] for task_id in _related_tasks(change) if task_id in task_projects}
+        resolved.append((change, project_ids))
+    return resolved
+
+
+def _append_change_log(session: Session, resolved: List[Tuple[Change, Set[Optional[int]]]]) -> None:
+    entries = []
+    for change, project_ids in resolved:
+        entity = LOGGED_ENTITIES.get(change.table)
+        if entity is None or change.id is None:
+            continue
+        for project_id in project_ids - {None}:
+            op = change.op
+            if change.table == "tasks" and "project_id" in change.previous:
+                # A task moved between projects leaves one and joins the other
+                op = "delete" if project_id == change.previous["project_id"] else "insert"
+            entries.append({"project_id": project_id, "entity": entity, "entity_id": change.id, "op": op})
+    if entries:
+        session.connection().execute(_change_log.insert(), entries)
+
+
+@on_flush("projects", "tasks", "task_dependencies", "task_comments", "users", "budget_entries")
+def _bump_changed_projects(session: Session, changes: List[Change]) -> None:
+    resolved = resolve_projects(session, changes)
+    bump(session, set().union(*(project_ids for _, project_ids in resolved)))
+    # Appended after the bump, which holds the project's version row locked
+    # until commit, so log entries of one project commit in sequence order
+    _append_change_log(session, resolved)
+
+
+@event.listens_for(Session, "after_flush")
+def _bump_membership_changes(session: Session, flush_context) -> None:
+    # Membership lives in an association table, which the change feed does
+    # not see; look at the relationship history instead
+    project_ids: Set[Optional[int]] = set()
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, Project) and inspect(obj).attrs.members.history.has_changes():
+            project_ids.add(obj.id)
+        elif isinstance(obj, User):
+            history = inspect(obj).attrs.projects.history
+            project_ids.update(project.id for project in (*history.added, *history.deleted))
+    bump(session, project_ids)
+
+
+@event.listens_for(Session, "after_commit")
+def _drop_cached_responses(session: Session) -> None:
+    for project_id in session.info.pop(_BUMPED_KEY, ()):
+        response_cache.invalidate(project_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_bumps(session: Session) -> None:
+    session.info.pop(_BUMPED_KEY, None)
+
+
+def project_versions(db: Session, project_ids: Iterable[int]) -> Dict[int, Tuple[int, Optional[datetime]]]:
+    """
+    Current version and last change time of some projects.
+
+    Returns:
+        (version, changed_at) by project id; projects never written since
+        counting started are at version 0
+    """
+    project_ids = list(project_ids)
+    versions: Dict[int, Tuple[int, Optional[datetime]]] = dict.fromkeys(project_ids, (0, None))
+    for i in range(0, len(project_ids), 500):
+        rows = db.query(ProjectVersion.project_id, ProjectVersion.version, ProjectVersion.changed_at).filter(
+            ProjectVersion.project_id.in_(project_ids[i:i + 500])
+        )
+        for project_id, version, changed_at in rows:
+            if changed_at is not None and changed_at.tzinfo is None:
+                changed_at = changed_at.replace(tzinfo=timezone.utc)
+            versions[project_id] = (version, changed_at)
+    return versions
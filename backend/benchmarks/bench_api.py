@@ -0,0 +1,257 @@
+"""
+Load test of the API on a synthetic dataset.
+
+Generates a seeded dataset (``benchmarks.datagen``), then runs each scenario
+(``benchmarks.scenarios``) for a fixed time with ``--concurrency`` virtual
+users, each driving the app in-process through its own httpx client. The
+first ``--warmup`` seconds of every scenario are not measured.
+
+Results (throughput and p50/p95/p99 latency per scenario and per request)
+are printed and written as JSON to ``--output``. ``--compare`` checks them
+against an earlier result file and exits with status 1 when throughput
+dropped or p95 latency grew by more than ``--tolerance``.
+
+The endpoints do their database work synchronously on the event loop, so
+in-process requests are served one at a time; latencies include the time
+spent queueing behind the other virtual users, as they would in one worker.
+Connections are checked out on the event loop too, so a concurrency above
+the engine's pool capacity (5 + 10 overflow) stalls until the pool timeout.
+Scenarios that write (risk_scoring, bulk_updates) change the data that later
+runs see, so reuse a ``--database`` only for quick iterations and let the
+dataset be regenerated for comparisons.
+
+Usage (from backend/):
+    python -m benchmarks.bench_api [--tasks 100000] [--concurrency 8] [--duration 20]
+        [--scenarios dashboard,task_paging] [--output results.json] [--compare baseline.json]
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from dataclasses import asdict
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+
+import httpx
+
+from benchmarks.scenarios import SCENARIOS, Fixture, Recorder, RequestFailed, VirtualUser
+
+
+def latency_summary(samples: List[float]) -> Dict[str, float]:
+    """Count, mean and nearest-rank percentiles of latencies, in milliseconds."""
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+
+    def percentile(p: float) -> float:
+        return round(ordered[max(math.ceil(p / 100 * len(ordered)) - 1, 0)] * 1000, 3)
+
+    return {
+        "count": len(ordered),
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 3),
+        "p50_ms": percentile(50),
+        "p95_ms": percentile(95),
+        "p99_ms": percentile(99),
+        "max_ms": round(ordered[-1] * 1000, 3),
+    }
+
+
+def load_fixture(engine, concurrency: int, seed: int) -> Fixture:
+    """Pick the virtual users (members of at least one project) and index task ids by project."""
+    from sqlalchemy import select
+
+    from app.core.auth import create_access_token
+    from app.db.models import Task, User, user_project
+
+    with engine.connect() as conn:
+        memberships = defaultdict(list)
+        for user_id, project_id in conn.execute(
+            select(user_project.c.user_id, user_project.c.project_id).order_by(user_project.c.user_id, user_project.c.project_id)
+        ):
+            memberships[user_id].append(project_id)
+        usernames = dict(conn.execute(select(User.id, User.username).where(User.role != "admin")).all())
+        tasks_by_project = defaultdict(list)
+        for task_id, project_id in conn.execute(select(Task.id, Task.project_id).order_by(Task.id)):
+            tasks_by_project[project_id].append(task_id)
+
+    candidates = sorted(user_id for user_id in memberships if user_id in usernames)
+    chosen = random.Random(seed).sample(candidates, min(concurrency, len(candidates)))
+    users = [
+        VirtualUser(
+            user_id=user_id,
+            token=create_access_token({"sub": usernames[user_id]}),
+            project_ids=memberships[user_id],
+        )
+        for user_id in chosen
+    ]
+    return Fixture(users=users, tasks_by_project=dict(tasks_by_project))
+
+
+async def run_scenario(app, name: str, fixture: Fixture, duration: float, warmup: float, seed: int) -> Dict[str, Any]:
+    scenario = SCENARIOS[name]
+    warm, measured = Recorder(), Recorder()
+    loop = asyncio.get_running_loop()
+    measure_from = loop.time() + warmup
+    deadline = measure_from + duration
+
+    async def virtual_user(index: int, user: VirtualUser) -> None:
+        rng = random.Random(f"{seed}:{name}:{index}")
+        transport = httpx.ASGITransport(app=app)
+        headers = {"Authorization": f"Bearer {user.token}"}
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers=headers) as client:
+            while loop.time() < deadline:
+                recorder = warm if loop.time() < measure_from else measured
+                started = time.perf_counter()
+                try:
+                    await scenario(client, recorder, user, fixture, rng)
+                except RequestFailed:
+                    continue
+                recorder.operations.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(virtual_user(index, user) for index, user in enumerate(fixture.users)))
+    elapsed = time.perf_counter() - started - warmup
+    requests = sum(len(samples) for samples in measured.requests.values())
+    return {
+        "operations": len(measured.operations),
+        "requests": requests,
+        "errors": sum(measured.errors.values()),
+        "throughput_ops": round(len(measured.operations) / elapsed, 2),
+        "throughput_rps": round(requests / elapsed, 2),
+        "latency": latency_summary(measured.operations),
+        "request_latency": {request: latency_summary(samples) for request, samples in sorted(measured.requests.items())},
+        "error_counts": dict(measured.errors),
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Scenarios whose throughput or p95 latency regressed by more than ``tolerance``."""
+    regressions = []
+    print(f"\n{'scenario':<14} {'ops/s':>10} {'base':>10} {'change':>8} {'p95 ms':>10} {'base':>10} {'change':>8}")
+    for name, result in current["scenarios"].items():
+        base = baseline.get("scenarios", {}).get(name)
+        if base is None or not result["operations"] or not base["operations"]:
+            continue
+        throughput = result["throughput_ops"] / base["throughput_ops"] - 1
+        p95 = result["latency"]["p95_ms"] / base["latency"]["p95_ms"] - 1
+        print(
+            f"{name:<14} {result['throughput_ops']:>10.1f} {base['throughput_ops']:>10.1f} {throughput:>+8.1%} "
+            f"{result['latency']['p95_ms']:>10.1f} {base['latency']['p95_ms']:>10.1f} {p95:>+8.1%}"
+        )
+        if throughput < -tolerance:
+            regressions.append(f"{name}: throughput {throughput:+.1%}")
+        if p95 > tolerance:
+            regressions.append(f"{name}: p95 latency {p95:+.1%}")
+    return regressions
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+async def run(app, fixture: Fixture, scenarios: List[str], args) -> Dict[str, Any]:
+    results = {}
+    async with app.router.lifespan_context(app):
+        for name in scenarios:
+            result = results[name] = await run_scenario(app, name, fixture, args.duration, args.warmup, args.seed)
+            latency = result["latency"]
+            print(
+                f"{name:<14} {result['throughput_ops']:8.1f} ops/s {result['throughput_rps']:8.1f} req/s  "
+                f"p50 {latency.get('p50_ms', 0):8.1f}  p95 {latency.get('p95_ms', 0):8.1f}  "
+                f"p99 {latency.get('p99_ms', 0):8.1f} ms  errors {result['errors']}"
+            )
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database", help="sqlite file; generated when missing, reused otherwise (default: temporary)")
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--projects", type=int, default=1000)
+    parser.add_argument("--tasks", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="comma-separated, run in this order")
+    parser.add_argument("--concurrency", type=int, default=8, help="virtual users per scenario")
+    parser.add_argument("--duration", type=float, default=20.0, help="measured seconds per scenario")
+    parser.add_argument("--warmup", type=float, default=3.0, help="unmeasured seconds per scenario")
+    parser.add_argument("--output", default="benchmark-results.json")
+    parser.add_argument("--compare", help="earlier result file to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed relative regression")
+    args = parser.parse_args()
+
+    scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    tmpdir = None
+    if args.database is None:
+        tmpdir = tempfile.TemporaryDirectory(prefix="bench-")
+        args.database = os.path.join(tmpdir.name, "bench.db")
+    generate_data = not os.path.exists(args.database)
+
+    # The app reads its settings at import time
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.abspath(args.database)}"
+    os.environ["SCHEDULER_ENABLED"] = "false"
+    os.environ["JOBS_ENABLED"] = "false"
+    # Each virtual user stands in for many real ones
+    os.environ["ADMISSION_USER_RATE"] = "0"
+    from app.db.database import engine, init_db
+    from app.main import app
+    from benchmarks.datagen import DatasetSize, generate
+
+    init_db()
+
+    size = DatasetSize(users=args.users, projects=args.projects, tasks=args.tasks, seed=args.seed)
+    if generate_data:
+        started = time.perf_counter()
+        counts = generate(engine, size)
+        print(f"Generated in {time.perf_counter() - started:.1f} s: " + ", ".join(f"{n} {name}" for name, n in counts.items()))
+    else:
+        print(f"Reusing {args.database}")
+    fixture = load_fixture(engine, args.concurrency, args.seed)
+    print(f"{len(fixture.users)} virtual users, {args.warmup:g} s warmup + {args.duration:g} s per scenario\n")
+
+    try:
+        scenario_results = asyncio.run(run(app, fixture, scenarios, args))
+    finally:
+        engine.dispose()
+        if tmpdir is not None:
+            tmpdir.cleanup()
+
+    results = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "dataset": asdict(size) if generate_data else {"database": args.database},
+        "settings": {"concurrency": len(fixture.users), "duration": args.duration, "warmup": args.warmup},
+        "scenarios": scenario_results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nWrote {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
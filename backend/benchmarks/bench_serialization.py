@@ -0,0 +1,125 @@
+"""
+Serialization benchmark for large task listings.
+
+Compares FastAPI's default path (``response_model`` validation of ORM
+objects, ``jsonable_encoder``, JSON re-encoding) with the prebuilt
+TypeAdapter path used by the list endpoints, on one project with 10k tasks.
+The tasks are loaded once, so only validation, encoding and compression are
+measured.
+
+Usage (from backend/):
+    python -m benchmarks.bench_serialization [--tasks 10000] [--repeat 5]
+"""
+import argparse
+import gzip
+import statistics
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, List
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import selectinload, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.api.schemas import TaskResponse
+from app.api.serialization import json_response, render
+from app.core.compression import CompressionMiddleware
+from app.db.database import Base
+from app.db.models import Project, Task, TaskComment, TaskDependency, User
+
+
+def seed(session, n_tasks: int) -> List[Task]:
+    user = User(email="bench@example.com", username="bench", hashed_password="x", role="admin")
+    project = Project(name="Bench", start_date=datetime(2026, 1, 1), end_date=datetime(2027, 1, 1), budget=1e6)
+    session.add_all([user, project])
+    session.flush()
+    start = datetime(2026, 1, 1)
+    session.bulk_insert_mappings(Task, [
+        {
+            "title": f"Task {i}",
+            "description": "Benchmark task " * 4,
+            "start_date": start + timedelta(days=i % 300),
+            "due_date": start + timedelta(days=i % 300 + 5),
+            "estimated_hours": 8.0,
+            "actual_hours": 2.0,
+            "completion_percentage": 25.0,
+            "risk_score": 1.5,
+            "project_id": project.id,
+            "creator_id": user.id,
+            "created_at": start,
+        }
+        for i in range(n_tasks)
+    ])
+    ids = [task_id for (task_id,) in session.query(Task.id).order_by(Task.id)]
+    session.bulk_insert_mappings(TaskDependency, [
+        {"dependent_task_id": ids[i], "prerequisite_task_id": ids[i - 1],
+         "dependency_type": "finish-to-start", "created_at": start}
+        for i in range(1, len(ids), 2)
+    ])
+    session.bulk_insert_mappings(TaskComment, [
+        {"content": "Looks good", "task_id": ids[i], "user_id": user.id, "created_at": start}
+        for i in range(0, len(ids), 5)
+    ])
+    session.commit()
+    return session.query(Task).options(
+        selectinload(Task.dependencies), selectinload(Task.comments)
+    ).order_by(Task.id).all()
+
+
+def timed(func: Callable[[], Any], repeat: int) -> List[float]:
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - started)
+    return times
+
+
+def report(name: str, times: List[float], n_tasks: int, size: int = None) -> None:
+    best, median = min(times), statistics.median(times)
+    line = f"{name:<32} median {median * 1000:8.1f} ms  best {best * 1000:8.1f} ms  {n_tasks / median:10.0f} tasks/s"
+    if size is not None:
+        line += f"  {size / 1024:8.1f} KiB"
+    print(line)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    tasks = seed(session, args.tasks)
+    print(f"{len(tasks)} tasks, {args.repeat} runs each\n")
+
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware)
+
+    @app.get("/before", response_model=List[TaskResponse])
+    def before() -> Any:
+        return tasks
+
+    @app.get("/after")
+    def after() -> Any:
+        return json_response(List[TaskResponse], tasks)
+
+    client = TestClient(app)
+    identity = {"Accept-Encoding": "identity"}
+    body = client.get("/after", headers=identity).content
+    assert client.get("/before", headers=identity).json() == client.get("/after", headers=identity).json()
+
+    report("encode: TypeAdapter", timed(lambda: render(List[TaskResponse], tasks), args.repeat), len(tasks), len(body))
+    report("encode: + gzip", timed(lambda: gzip.compress(render(List[TaskResponse], tasks), 6), args.repeat), len(tasks), len(gzip.compress(body, 6)))
+    for name, headers in (("identity", identity), ("gzip", {"Accept-Encoding": "gzip"})):
+        for path in ("/before", "/after"):
+            size = int(client.get(path, headers=headers).headers["content-length"])
+            report(f"http {path} ({name})", timed(lambda: client.get(path, headers=headers), args.repeat), len(tasks), size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Import-time budget check for worker boot.
+
+Imports ``app.main`` in fresh interpreters and exits with status 1 when the
+median import time is over ``--budget`` seconds, when a module that must be
+imported lazily (scikit-learn, joblib, pandas) was loaded, or when the
+import touched the database. The slowest modules of the last run, from
+``python -X importtime``, are listed to show where the time went.
+
+Usage (from backend/):
+    python -m benchmarks.bench_startup [--budget 2.5] [--runs 5]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from typing import Dict, List, Tuple
+
+LAZY_MODULES = ("sklearn", "joblib", "pandas")
+DEFAULT_BUDGET = 2.5  # seconds
+
+CHILD = f"""
+import json, sys, time
+started = time.perf_counter()
+import app.main
+elapsed = time.perf_counter() - started
+print(json.dumps({{"seconds": elapsed, "lazy": [m for m in {LAZY_MODULES!r} if m in sys.modules]}}))
+"""
+
+
+def import_once(database: str, importtime: bool = False) -> Tuple[Dict, str]:
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{database}")
+    command = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", CHILD]
+    result = subprocess.run(command, capture_output=True, text=True, env=env, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1]), result.stderr
+
+
+def slowest_modules(importtime_output: str, count: int = 10) -> List[Tuple[int, str]]:
+    """(self time in microseconds, module) of the slowest modules."""
+    modules = []
+    for line in importtime_output.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        modules.append((int(self_us), name.strip()))
+    return sorted(modules, reverse=True)[:count]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET, help="seconds allowed for importing app.main")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    failures = []
+    with tempfile.TemporaryDirectory(prefix="bench-") as tmpdir:
+        database = os.path.join(tmpdir, "startup.db")
+        runs = [import_once(database)[0] for _ in range(args.runs)]
+        last, importtime = import_once(database, importtime=True)
+        if os.path.exists(database):
+            failures.append("importing the app created or opened the database")
+
+    times = [run["seconds"] for run in runs]
+    median = statistics.median(times)
+    print(f"import app.main: median {median:.3f} s  best {min(times):.3f} s  budget {args.budget:.3f} s")
+    print("\nslowest modules (self time):")
+    for self_us, name in slowest_modules(importtime):
+        print(f"  {self_us / 1000:8.1f} ms  {name}")
+
+    if median > args.budget:
+        failures.append(f"median import time {median:.3f} s is over the {args.budget:.3f} s budget")
+    loaded = sorted({module for run in runs + [last] for module in run["lazy"]})
+    if loaded:
+        failures.append(f"imported at startup: {', '.join(loaded)}")
+    for failure in failures:
+        print(f"FAIL {failure}")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
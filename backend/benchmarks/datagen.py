@@ -0,0 +1,283 @@
+"""
+Seeded synthetic dataset for the API benchmarks.
+
+Generates users, projects with members, tasks with DAG-shaped dependencies,
+comments, notifications and budget entries. The same arguments always give
+the same rows, so results of different runs are comparable.
+
+Rows are written with bulk Core inserts and explicit ids, so ORM events
+(project versions, change log, stats, notification counters) do not fire;
+the app builds its derived tables lazily on first read, as it does for data
+that predates them.
+
+Usage (from backend/):
+    python -m benchmarks.datagen --database bench.db [--tasks 100000] [--seed 42]
+"""
+import argparse
+import random
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.engine import Engine
+
+from app.core.auth import get_password_hash
+from app.db.database import Base
+from app.db.models import (
+    BudgetEntry, Notification, Project, Task, TaskComment, TaskDependency, TaskPriority, TaskStatus,
+    User, user_project,
+)
+
+PASSWORD = "benchmark"
+REFERENCE_DATE = datetime(2026, 6, 1)  # "today" of the dataset; decides which tasks are done or late
+CHUNK_SIZE = 5000
+
+# Vocabulary of task titles and descriptions, so full-text search sees a
+# realistic spread of common and rare words
+TITLE_VERBS = (
+    "Design", "Implement", "Review", "Test", "Deploy", "Migrate", "Document", "Refactor", "Audit", "Estimate",
+    "Configure", "Benchmark", "Upgrade", "Integrate", "Prototype", "Validate", "Monitor", "Plan", "Fix", "Automate",
+)
+TITLE_OBJECTS = (
+    "billing service", "login page", "search index", "payment gateway", "mobile app", "data warehouse",
+    "release pipeline", "user onboarding", "invoice export", "reporting dashboard", "API gateway", "backup jobs",
+    "notification emails", "access control", "cache layer", "vendor contract", "load balancer", "customer portal",
+    "audit log", "staging cluster", "budget forecast", "risk model", "schema migration", "error tracking",
+    "feature flags", "checkout flow", "support tooling", "SSO integration", "analytics events", "rate limiter",
+)
+DESCRIPTION_WORDS = (
+    "customer", "deadline", "blocked", "vendor", "security", "performance", "regression", "rollout", "legacy",
+    "compliance", "latency", "database", "frontend", "backend", "contract", "review", "quarterly", "migration",
+    "integration", "documentation", "approval", "budget", "stakeholder", "milestone", "dependency", "outage",
+    "capacity", "testing", "design", "handover", "training", "licensing", "hardware", "network", "encryption",
+    "accessibility", "localization", "analytics", "monitoring", "alerting", "backlog", "sprint", "estimate",
+)
+
+COMMENTS = (
+    "Looks good to me.", "Blocked on review.", "Updated the estimate.", "Can we move this to next week?",
+    "Done, please verify.", "Waiting for the vendor.", "Added acceptance criteria.",
+)
+BUDGET_CATEGORIES = ("labour", "licenses", "hardware", "travel", "contractors")
+NOTIFICATION_TYPES = ("task_due", "task_assigned", "risk_alert", "task_escalated")
+
+
+@dataclass
+class DatasetSize:
+    users: int = 2000
+    projects: int = 1000
+    tasks: int = 100_000
+    max_predecessors: int = 3  # per task, chosen among recent tasks of the same project
+    comments_per_task: float = 0.5
+    notifications_per_user: int = 20
+    budget_entries_per_project: int = 12
+    seed: int = 42
+
+
+def _chunks(rows: List[dict], size: int = CHUNK_SIZE) -> Iterable[List[dict]]:
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+def _insert(conn, table, rows: List[dict]) -> None:
+    for chunk in _chunks(rows):
+        conn.execute(table.insert(), chunk)
+
+
+def _task_state(rng: random.Random, due: datetime):
+    """Status and completion of a task, consistent with its due date."""
+    if due < REFERENCE_DATE:
+        status = rng.choices(
+            (TaskStatus.COMPLETED, TaskStatus.DELAYED, TaskStatus.IN_PROGRESS, TaskStatus.CANCELLED),
+            weights=(80, 10, 7, 3),
+        )[0]
+    else:
+        status = rng.choices(
+            (TaskStatus.NOT_STARTED, TaskStatus.IN_PROGRESS, TaskStatus.BLOCKED),
+            weights=(60, 35, 5),
+        )[0]
+    if status == TaskStatus.COMPLETED:
+        return status, 100.0
+    if status in (TaskStatus.NOT_STARTED, TaskStatus.CANCELLED):
+        return status, 0.0
+    return status, float(rng.randrange(5, 96, 5))
+
+
+def generate(engine: Engine, size: DatasetSize) -> Dict[str, int]:
+    """
+    Write a synthetic dataset into an empty database.
+
+    Args:
+        engine: Engine of a database with the app's tables created
+        size: Row counts and seed
+
+    Returns:
+        Number of rows written per table
+    """
+    rng = random.Random(size.seed)
+    created = REFERENCE_DATE - timedelta(days=400)
+
+    with engine.begin() as conn:
+        if conn.execute(select(func.count()).select_from(User.__table__)).scalar():
+            raise ValueError("The benchmark database is not empty")
+
+        password = get_password_hash(PASSWORD)
+        users = [
+            {
+                "id": user_id,
+                "email": f"user{user_id}@example.com",
+                "username": f"user{user_id}",
+                "full_name": f"User {user_id}",
+                "hashed_password": password,
+                "role": "admin" if user_id == 1 else "user",
+                "is_active": True,
+                "created_at": created,
+            }
+            for user_id in range(1, size.users + 1)
+        ]
+        _insert(conn, User.__table__, users)
+
+        projects, members = [], {}
+        for project_id in range(1, size.projects + 1):
+            start = REFERENCE_DATE - timedelta(days=rng.randrange(0, 365))
+            projects.append({
+                "id": project_id,
+                "name": f"Project {project_id}",
+                "description": f"Synthetic project {project_id}",
+                "start_date": start,
+                "end_date": start + timedelta(days=rng.randrange(90, 540)),
+                "budget": float(rng.randrange(50, 2000) * 1000),
+                "status": "active",
+                "created_at": start,
+            })
+            members[project_id] = rng.sample(range(1, size.users + 1), min(size.users, rng.randint(3, 8)))
+        _insert(conn, Project.__table__, projects)
+        _insert(conn, user_project, [
+            {"user_id": user_id, "project_id": project_id}
+            for project_id, user_ids in members.items()
+            for user_id in user_ids
+        ])
+
+        # Spread tasks unevenly over projects, like real portfolios
+        weights = [rng.paretovariate(2.0) for _ in projects]
+        owners = rng.choices([project["id"] for project in projects], weights=weights, k=size.tasks)
+        owners.sort()
+
+        tasks, dependencies = [], []
+        project_tasks: Dict[int, List[int]] = {}
+        for task_id, project_id in enumerate(owners, start=1):
+            project = projects[project_id - 1]
+            previous = project_tasks.setdefault(project_id, [])
+            span = (project["end_date"] - project["start_date"]).days
+            start = project["start_date"] + timedelta(days=rng.randrange(0, max(span - 20, 1)))
+            due = start + timedelta(days=rng.randint(1, 20))
+            status, completion = _task_state(rng, due)
+            estimated = round(rng.lognormvariate(2.5, 0.7), 1)
+            tasks.append({
+                "id": task_id,
+                "title": f"{rng.choice(TITLE_VERBS)} {rng.choice(TITLE_OBJECTS)} #{task_id}",
+                "description": " ".join(rng.sample(DESCRIPTION_WORDS, rng.randint(6, 14))).capitalize() + ".",
+                "status": status,
+                "priority": rng.choices(list(TaskPriority), weights=(20, 50, 25, 5))[0],
+                "start_date": start,
+                "due_date": due,
+                "estimated_hours": estimated,
+                "actual_hours": round(estimated * completion / 100 * rng.uniform(0.7, 1.5), 1),
+                "completion_percentage": completion,
+                "risk_score": round(rng.betavariate(2, 5) * 10, 2),
+                "propagated_risk_score": 0.0,
+                "project_id": project_id,
+                "assignee_id": rng.choice(members[project_id]) if rng.random() < 0.85 else None,
+                "creator_id": members[project_id][0],
+                "created_at": project["start_date"],
+            })
+            # Prerequisites always come earlier in the project, so the graph stays acyclic
+            window = previous[-20:]
+            count = min(len(window), size.max_predecessors, int(rng.expovariate(0.6)))
+            for prerequisite_id in rng.sample(window, count):
+                dependencies.append({
+                    "id": len(dependencies) + 1,
+                    "dependent_task_id": task_id,
+                    "prerequisite_task_id": prerequisite_id,
+                    "dependency_type": "finish-to-start",
+                    "created_at": project["start_date"],
+                })
+            previous.append(task_id)
+        _insert(conn, Task.__table__, tasks)
+        _insert(conn, TaskDependency.__table__, dependencies)
+
+        comments = []
+        for task in tasks:
+            count = int(size.comments_per_task) + (rng.random() < size.comments_per_task % 1)
+            for _ in range(count):
+                comments.append({
+                    "id": len(comments) + 1,
+                    "content": rng.choice(COMMENTS),
+                    "task_id": task["id"],
+                    "user_id": rng.choice(members[task["project_id"]]),
+                    "created_at": task["start_date"] + timedelta(hours=rng.randrange(0, 240)),
+                })
+        _insert(conn, TaskComment.__table__, comments)
+
+        notifications = []
+        for user_id in range(1, size.users + 1):
+            for _ in range(size.notifications_per_user):
+                task = rng.choice(tasks)
+                notifications.append({
+                    "id": len(notifications) + 1,
+                    "user_id": user_id,
+                    "title": f"Update on {task['title']}",
+                    "message": f"{task['title']} needs your attention.",
+                    "is_read": rng.random() < 0.7,
+                    "notification_type": rng.choice(NOTIFICATION_TYPES),
+                    "related_task_id": task["id"],
+                    "created_at": REFERENCE_DATE - timedelta(minutes=rng.randrange(0, 60 * 24 * 60)),
+                })
+        _insert(conn, Notification.__table__, notifications)
+
+        entries = []
+        for project in projects:
+            for month in range(size.budget_entries_per_project):
+                entry_type = "planned" if month % 2 == 0 else "actual"
+                entries.append({
+                    "id": len(entries) + 1,
+                    "project_id": project["id"],
+                    "description": f"{entry_type.capitalize()} spend, month {month // 2 + 1}",
+                    "amount": round(project["budget"] / size.budget_entries_per_project * rng.uniform(0.6, 1.4), 2),
+                    "entry_type": entry_type,
+                    "category": rng.choice(BUDGET_CATEGORIES),
+                    "date": project["start_date"] + timedelta(days=30 * (month // 2)),
+                    "created_at": project["start_date"],
+                })
+        _insert(conn, BudgetEntry.__table__, entries)
+
+    return {
+        "users": len(users),
+        "projects": len(projects),
+        "memberships": sum(len(user_ids) for user_ids in members.values()),
+        "tasks": len(tasks),
+        "dependencies": len(dependencies),
+        "comments": len(comments),
+        "notifications": len(notifications),
+        "budget_entries": len(entries),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database", required=True, help="sqlite file to create")
+    defaults = DatasetSize()
+    for name, value in asdict(defaults).items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=type(value), default=value)
+    args = parser.parse_args()
+
+    engine = create_engine(f"sqlite:///{args.database}")
+    Base.metadata.create_all(engine)
+    started = time.perf_counter()
+    counts = generate(engine, DatasetSize(**{name: getattr(args, name) for name in asdict(defaults)}))
+    print(f"Generated in {time.perf_counter() - started:.1f} s: " + ", ".join(f"{n} {name}" for name, n in counts.items()))
+
+
+if __name__ == "__main__":
+    main()
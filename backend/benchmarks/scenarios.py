@@ -0,0 +1,129 @@
+"""
+Load-test scenarios.
+
+A scenario is one user-level operation (open the dashboard, page through a
+task list, ...) made of several API requests. Each virtual user runs its
+scenario in a loop with its own client; ``Recorder`` times every request
+and every whole operation.
+"""
+import random
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List
+
+import httpx
+
+API = "/api/v1"
+
+
+@dataclass
+class VirtualUser:
+    user_id: int
+    token: str
+    project_ids: List[int]
+
+
+@dataclass
+class Fixture:
+    """Ids the scenarios pick from, read from the benchmark database."""
+    users: List[VirtualUser]
+    tasks_by_project: Dict[int, List[int]]
+
+
+class RequestFailed(Exception):
+    pass
+
+
+@dataclass
+class Recorder:
+    """Latencies (seconds) of requests by name and of whole operations."""
+    requests: Dict[str, List[float]] = field(default_factory=lambda: defaultdict(list))
+    operations: List[float] = field(default_factory=list)
+    errors: Dict[str, int] = field(default_factory=lambda: defaultdict(int))
+
+    async def call(self, client: httpx.AsyncClient, name: str, method: str, url: str, **kwargs) -> httpx.Response:
+        started = time.perf_counter()
+        response = await client.request(method, API + url, **kwargs)
+        self.requests[name].append(time.perf_counter() - started)
+        if response.status_code >= 400:
+            self.errors[f"{name} {response.status_code}"] += 1
+            raise RequestFailed(f"{method} {url}: {response.status_code} {response.text[:200]}")
+        return response
+
+
+Scenario = Callable[[httpx.AsyncClient, Recorder, VirtualUser, Fixture, random.Random], Awaitable[None]]
+
+
+async def dashboard(client, recorder: Recorder, user: VirtualUser, fixture: Fixture, rng: random.Random) -> None:
+    """Landing page: project list, their stats, notifications and one budget summary."""
+    projects = (await recorder.call(client, "projects", "GET", "/projects/", params={"limit": 20})).json()
+    ids = ",".join(str(project["id"]) for project in projects)
+    if ids:
+        await recorder.call(client, "projects stats", "GET", "/projects/stats", params={"ids": ids})
+    await recorder.call(client, "notifications", "GET", "/notifications/", params={"limit": 20})
+    await recorder.call(client, "budget summary", "GET", f"/projects/{rng.choice(user.project_ids)}/budget/summary")
+
+
+async def task_paging(client, recorder: Recorder, user: VirtualUser, fixture: Fixture, rng: random.Random) -> None:
+    """Page through all tasks of one project, 50 at a time."""
+    project_id = rng.choice(user.project_ids)
+    skip = 0
+    while True:
+        page = (await recorder.call(
+            client, "tasks page", "GET", "/tasks/",
+            params={"project_id": project_id, "skip": skip, "limit": 50},
+        )).json()
+        if len(page) < 50:
+            break
+        skip += 50
+
+
+async def bulk_updates(client, recorder: Recorder, user: VirtualUser, fixture: Fixture, rng: random.Random) -> None:
+    """Progress update of up to ten tasks of one project, one PUT each."""
+    task_ids = fixture.tasks_by_project.get(rng.choice(user.project_ids)) or []
+    for task_id in rng.sample(task_ids, min(10, len(task_ids))):
+        completion = float(rng.randrange(0, 101, 5))
+        await recorder.call(client, "task update", "PUT", f"/tasks/{task_id}", json={
+            "completion_percentage": completion,
+            "status": "completed" if completion == 100 else "in_progress",
+            "actual_hours": round(rng.uniform(1, 40), 1),
+        })
+
+
+async def risk_scoring(client, recorder: Recorder, user: VirtualUser, fixture: Fixture, rng: random.Random) -> None:
+    """Score a what-if task, then recompute the predecessor-aware risk of a project."""
+    await recorder.call(client, "risk predict", "POST", "/risk-prediction/predict", json={
+        "task_complexity": rng.uniform(0, 10),
+        "resource_availability": rng.uniform(0, 10),
+        "dependency_count": rng.randrange(0, 6),
+        "historical_delays": rng.randrange(0, 4),
+        "estimated_hours": rng.uniform(1, 80),
+        "priority_level": rng.randint(1, 4),
+    })
+    await recorder.call(client, "risk propagate", "POST", f"/risk-prediction/project/{rng.choice(user.project_ids)}/propagate")
+
+
+# Words of the generated titles and descriptions (benchmarks.datagen, which
+# cannot be imported here before the app is configured)
+SEARCH_VERBS = ("design", "review", "deploy", "migrate", "audit", "upgrade", "monitor", "automate")
+SEARCH_WORDS = ("billing", "gateway", "dashboard", "vendor", "outage", "latency", "compliance", "rollout")
+
+
+async def search(client, recorder: Recorder, user: VirtualUser, fixture: Fixture, rng: random.Random) -> None:
+    """Type-ahead on a common word, then the full two-word query, across and within projects."""
+    words = [rng.choice(SEARCH_VERBS), rng.choice(SEARCH_WORDS)]
+    await recorder.call(client, "search prefix", "GET", "/search/", params={"q": words[0][:3]})
+    await recorder.call(client, "search", "GET", "/search/", params={"q": " ".join(words)})
+    await recorder.call(client, "search project", "GET", "/search/", params={
+        "q": " ".join(words), "project_id": rng.choice(user.project_ids),
+    })
+
+
+SCENARIOS: Dict[str, Scenario] = {
+    "dashboard": dashboard,
+    "task_paging": task_paging,
+    "bulk_updates": bulk_updates,
+    "risk_scoring": risk_scoring,
+    "search": search,
+}
@@ -0,0 +1,62 @@
+import os
+import tempfile
+
+# Configure the app before it is imported: a throwaway database, no
+# background work started behind the tests' back, and any request that
+# repeats a query more than N_PLUS_ONE_THRESHOLD times fails with NPlusOneError
+_DATA_DIR = tempfile.mkdtemp(prefix="foresightpm-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_DATA_DIR, 'app.db')}"
+os.environ["SCHEDULER_ENABLED"] = "false"
+os.environ["JOBS_ENABLED"] = "false"
+os.environ["RISK_MODEL_WARMUP"] = "false"
+os.environ["PROFILE_DIR"] = os.path.join(_DATA_DIR, "profiles")
+os.environ["QUERY_DEBUG"] = "true"
+os.environ["QUERY_DEBUG_RAISE"] = "true"
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db.database import Base, SessionLocal, init_db
+from app.db.query_debug import track_queries
+from app.main import app  # registers the models and their write hooks
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    """Session factory over an empty database of its own."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture(scope="session")
+def client():
+    """Client of the app over the shared test database."""
+    init_db()
+    return TestClient(app)
+
+
+@pytest.fixture(scope="session")
+def admin_headers(client):
+    body = {"email": "admin@example.com", "username": "admin", "password": "secret", "role": "admin"}
+    assert client.post("/api/v1/auth/register", json=body).status_code == 200
+    token = client.post("/api/v1/auth/login", data={"username": "admin", "password": "secret"}).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture
+def db():
+    """Session on the app's database."""
+    session = SessionLocal()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def no_n_plus_one(request):
+    """Fail the test if code it calls directly repeats a query too often."""
+    with track_queries(request.node.name, raise_errors=True) as log:
+        yield log
@@ -0,0 +1,54 @@
+import asyncio
+import threading
+from datetime import datetime
+
+import httpx
+
+from app.api.endpoints import projects as project_endpoints
+from app.core.config import settings
+from app.db.models import Project, User
+from app.main import app
+
+START, END = datetime(2030, 1, 1), datetime(2030, 12, 31)
+TIMEOUT = 5.0
+
+
+def test_interactive_requests_are_served_while_heavy_slots_are_full(admin_headers, db, monkeypatch):
+    admin = db.query(User).filter(User.username == "admin").one()
+    project = Project(name="Admission", start_date=START, end_date=END, members=[admin])
+    db.add(project)
+    db.commit()
+
+    entered = threading.Semaphore(0)
+    release = threading.Event()
+    timed_out = []
+    build_project_graph = project_endpoints.build_project_graph
+
+    def slow_graph(db, project_id):
+        entered.release()
+        # Only released once the interactive request got through
+        if not release.wait(TIMEOUT):
+            timed_out.append(project_id)
+        return build_project_graph(db, project_id)
+
+    monkeypatch.setattr(project_endpoints, "build_project_graph", slow_graph)
+
+    async def scenario():
+        # One event loop for every request, as in a worker
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            heavy = [
+                asyncio.create_task(client.get(f"/api/v1/projects/{project.id}/graph", headers=admin_headers))
+                for _ in range(settings.ADMISSION_HEAVY_CONCURRENCY)
+            ]
+            for _ in heavy:
+                assert await asyncio.to_thread(entered.acquire, timeout=TIMEOUT)
+            try:
+                response = await asyncio.wait_for(client.get("/api/v1/projects/", headers=admin_headers), TIMEOUT)
+                assert response.status_code == 200
+            finally:
+                release.set()
+            assert [response.status_code for response in await asyncio.gather(*heavy)] == [200] * len(heavy)
+
+    asyncio.run(scenario())
+    assert not timed_out
@@ -0,0 +1,22 @@
+from datetime import datetime
+
+from app.db.models import BudgetEntry, Project
+from app.services import budget
+from app.services.budget import budget_summary
+
+
+def test_summary_is_not_served_after_a_write_in_another_process(session_factory, monkeypatch):
+    db = session_factory()
+    project = Project(name="Budget", budget=1000.0)
+    db.add(project)
+    db.flush()
+    db.add(BudgetEntry(project_id=project.id, amount=100.0, entry_type="actual", date=datetime(2030, 1, 1)))
+    db.commit()
+    assert budget_summary(db, project.id, project.budget)["totals"]["actual"] == 100.0
+
+    # Another worker process commits: this process's cache is not told
+    monkeypatch.setattr(budget.budget_cache, "invalidate", lambda project_id=None: None)
+    db.add(BudgetEntry(project_id=project.id, amount=50.0, entry_type="actual", date=datetime(2030, 1, 2)))
+    db.commit()
+    assert budget_summary(db, project.id, project.budget)["totals"]["actual"] == 150.0
+    db.close()
@@ -0,0 +1,65 @@
+from app.db.models import Project, Task, TaskComment, TaskDependency
+from app.services.delta_sync import changes_since, current_cursor
+
+
+def tombstones(changes):
+    return {(tombstone["entity"], tombstone["id"]) for tombstone in changes["deleted"]}
+
+
+def test_changes_since_sends_current_rows_and_tombstones(session_factory):
+    db = session_factory()
+    project, other = Project(name="Synced"), Project(name="Elsewhere")
+    db.add_all([project, other])
+    db.flush()
+    first = Task(title="First", project_id=project.id)
+    second = Task(title="Second", project_id=project.id)
+    moved = Task(title="Moved", project_id=project.id)
+    db.add_all([first, second, moved])
+    db.flush()
+    dependency = TaskDependency(dependent_task_id=second.id, prerequisite_task_id=first.id, dependency_type="finish-to-start")
+    comment = TaskComment(content="Hello", task_id=first.id)
+    db.add_all([dependency, comment])
+    db.commit()
+
+    assert changes_since(db, project.id, None)["reset"]
+    cursor = current_cursor(db)
+
+    first.title = "First, renamed"
+    db.delete(comment)
+    db.delete(dependency)
+    moved.project_id = other.id
+    db.commit()
+
+    changes = changes_since(db, project.id, cursor)
+    assert not changes["reset"]
+    assert [task.title for task in changes["tasks"]] == ["First, renamed"]
+    assert tombstones(changes) == {("comment", comment.id), ("dependency", dependency.id), ("task", moved.id)}
+    assert changes["cursor"] == current_cursor(db)
+
+    # Joining a project shows up there as a live row
+    assert [task.id for task in changes_since(db, other.id, cursor)["tasks"]] == [moved.id]
+
+    # Polling again from the returned cursor finds nothing new
+    again = changes_since(db, project.id, changes["cursor"])
+    assert (again["tasks"], again["deleted"]) == ([], [])
+    db.close()
+
+
+def test_entities_created_and_deleted_between_polls_come_as_tombstones(session_factory):
+    db = session_factory()
+    project = Project(name="Short-lived")
+    db.add(project)
+    db.commit()
+    cursor = current_cursor(db)
+
+    task = Task(title="Gone", project_id=project.id)
+    db.add(task)
+    db.commit()
+    task_id = task.id
+    db.delete(task)
+    db.commit()
+
+    changes = changes_since(db, project.id, cursor)
+    assert changes["tasks"] == []
+    assert tombstones(changes) == {("task", task_id)}
+    db.close()
@@ -0,0 +1,73 @@
+import threading
+from datetime import datetime, timedelta
+
+from app.db.models import Project, Task
+from app.services.interval_index import TaskIntervalIndex
+
+START = datetime(2030, 1, 1)
+
+
+def make_projects(session_factory, count):
+    db = session_factory()
+    projects = [Project(name=f"Project {i}") for i in range(count)]
+    db.add_all(projects)
+    db.flush()
+    db.add_all(
+        Task(title="Task", project_id=project.id, start_date=START, due_date=START + timedelta(days=1))
+        for project in projects
+    )
+    db.commit()
+    ids = [project.id for project in projects]
+    db.close()
+    return ids
+
+
+def test_least_recently_queried_projects_are_dropped(session_factory):
+    first, second, third = make_projects(session_factory, 3)
+    index = TaskIntervalIndex(max_projects=2)
+    db = session_factory()
+    for project_id in (first, second, first, third):
+        assert len(index.overlapping(db, project_id, 0)) == 1
+    db.close()
+    assert list(index._projects) == [first, third]
+
+
+def test_loading_one_project_does_not_hold_up_another(session_factory, monkeypatch):
+    slow, fast = make_projects(session_factory, 2)
+    index = TaskIntervalIndex()
+    entered, release = threading.Event(), threading.Event()
+    load = index._load
+
+    def slow_load(db, project_id, version):
+        if project_id == slow:
+            entered.set()
+            assert release.wait(5)
+        return load(db, project_id, version)
+
+    monkeypatch.setattr(index, "_load", slow_load)
+
+    def query_slow():
+        db = session_factory()
+        index.overlapping(db, slow, 0)
+        db.close()
+
+    found = []
+
+    def query_fast():
+        db = session_factory()
+        found.extend(index.overlapping(db, fast, 0))
+        db.close()
+
+    slow_thread = threading.Thread(target=query_slow)
+    slow_thread.start()
+    try:
+        assert entered.wait(5)
+        fast_thread = threading.Thread(target=query_fast)
+        fast_thread.start()
+        fast_thread.join(2)
+        # Answered while the other project is still loading
+        assert not release.is_set() and len(found) == 1
+    finally:
+        release.set()
+        slow_thread.join()
+        fast_thread.join()
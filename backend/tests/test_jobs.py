@@ -0,0 +1,100 @@
+import pytest
+
+from app.core import jobs
+from app.core.jobs import FAILED, QUEUED, SUCCEEDED, JobWorker, enqueue
+from app.db.models import Job
+
+KIND = "test-flaky"
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    """Register a handler that fails the attempts listed in its payload."""
+    seen = []
+
+    def flaky(db, job):
+        seen.append(job.attempt)
+        if job.attempt in job.payload.get("fail", ()):
+            raise RuntimeError(f"attempt {job.attempt}")
+        return {"attempt": job.attempt}
+
+    monkeypatch.setitem(jobs._handlers, KIND, flaky)
+    return seen
+
+
+def worker(session_factory, name):
+    job_worker = JobWorker(session_factory=session_factory)
+    job_worker.name = name
+    return job_worker
+
+
+def job_row(session_factory, job_id):
+    db = session_factory()
+    try:
+        return db.get(Job, job_id)
+    finally:
+        db.close()
+
+
+def make_due(session_factory, job_id):
+    db = session_factory()
+    db.execute(jobs._update_jobs(Job.id == job_id).values(run_after=jobs._now()))
+    db.commit()
+    db.close()
+
+
+def test_an_active_dedup_key_returns_the_queued_job(session_factory, calls):
+    db = session_factory()
+    first = enqueue(db, KIND, dedup_key="same")
+    assert enqueue(db, KIND, dedup_key="same").id == first.id
+    assert enqueue(db, KIND).id != first.id  # no key, no dedup
+
+    job_worker = worker(session_factory, "w1")
+    job_worker._execute(job_worker._claim())
+    assert job_row(session_factory, first.id).status == SUCCEEDED
+    assert enqueue(db, KIND, dedup_key="same").id != first.id  # the finished job no longer counts
+    db.close()
+
+
+def test_a_job_is_claimed_once_and_retried_with_backoff(session_factory, calls):
+    db = session_factory()
+    job_id = enqueue(db, KIND, payload={"fail": [1]}).id
+    db.close()
+
+    first, second = worker(session_factory, "w1"), worker(session_factory, "w2")
+    context = first._claim()
+    assert context.id == job_id
+    assert second._claim() is None
+
+    first._execute(context)
+    row = job_row(session_factory, job_id)
+    assert (row.status, row.attempts, row.error) == (QUEUED, 1, "RuntimeError: attempt 1")
+    assert second._claim() is None  # backing off
+
+    make_due(session_factory, job_id)
+    context = second._claim()
+    second._execute(context)
+    row = job_row(session_factory, job_id)
+    assert (row.status, row.attempts, row.result) == (SUCCEEDED, 2, '{"attempt": 2}')
+    assert calls == [1, 2]
+
+
+def test_a_job_fails_once_its_attempts_are_used(session_factory, calls):
+    db = session_factory()
+    job_id = enqueue(db, KIND, payload={"fail": [1, 2]}, max_attempts=2).id
+    db.close()
+
+    job_worker = worker(session_factory, "w1")
+    job_worker._execute(job_worker._claim())
+    make_due(session_factory, job_id)
+    job_worker._execute(job_worker._claim())
+    row = job_row(session_factory, job_id)
+    assert (row.status, row.attempts) == (FAILED, 2)
+    assert job_worker._claim() is None
+
+
+def test_retry_delay_doubles_up_to_the_cap(monkeypatch):
+    monkeypatch.setattr(jobs.settings, "JOB_RETRY_BASE_SECONDS", 10)
+    monkeypatch.setattr(jobs.settings, "JOB_RETRY_MAX_SECONDS", 60)
+    monkeypatch.setattr(jobs.random, "uniform", lambda low, high: 1.0)
+    assert [jobs.retry_delay(attempt) for attempt in (1, 2, 3, 4)] == [10, 20, 40, 60]
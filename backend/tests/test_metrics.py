@@ -0,0 +1,55 @@
+import os
+
+from app.core.metrics import Counter, Gauge, Histogram, Registry
+
+OTHER_PID = 999999
+
+
+def make_registry():
+    registry = Registry()
+    requests = registry.register(Counter("requests_total", "Requests.", ("route",)))
+    in_flight = registry.register(Gauge("in_flight", "In flight.", ()))
+    latency = registry.register(Histogram("latency_seconds", "Latency.", ("route",), buckets=(0.1, 1.0)))
+    return registry, requests, in_flight, latency
+
+
+def write_as_other_worker(directory, registry):
+    """Write a registry's samples as if another process owned them."""
+    registry.write(str(directory))
+    os.replace(directory / f"metrics-{os.getpid()}.json", directory / f"metrics-{OTHER_PID}.json")
+
+
+def test_render_sums_the_samples_of_every_worker(tmp_path):
+    other, requests, in_flight, latency = make_registry()
+    requests.inc("/a", amount=3)
+    in_flight.inc()
+    latency.observe(0.05, "/a")
+    write_as_other_worker(tmp_path, other)
+
+    registry, requests, in_flight, latency = make_registry()
+    requests.inc("/a")
+    requests.inc("/b")
+    in_flight.inc(amount=2)
+    latency.observe(0.5, "/a")
+
+    body = registry.render(str(tmp_path))
+    assert 'requests_total{route="/a"} 4' in body
+    assert 'requests_total{route="/b"} 1' in body
+    assert "in_flight 3" in body
+    assert 'latency_seconds_bucket{route="/a",le="0.1"} 1' in body
+    assert 'latency_seconds_bucket{route="/a",le="+Inf"} 2' in body
+    assert 'latency_seconds_count{route="/a"} 2' in body
+
+
+def test_exited_workers_keep_their_counts_but_not_their_gauges(tmp_path):
+    other, requests, in_flight, _ = make_registry()
+    requests.inc("/a", amount=3)
+    in_flight.inc()
+    write_as_other_worker(tmp_path, other)
+
+    registry, _, _, _ = make_registry()
+    registry.mark_process_dead(str(tmp_path), OTHER_PID)
+
+    body = registry.render(str(tmp_path))
+    assert 'requests_total{route="/a"} 3' in body
+    assert not [line for line in body.splitlines() if line.startswith("in_flight ")]
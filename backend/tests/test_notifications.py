@@ -0,0 +1,49 @@
+from sqlalchemy import update
+
+from app.db.models import Notification, User, UserNotificationCounter
+from app.services.notifications import insert_notifications, reconcile_unread_counters, set_read, unread_count
+
+
+def notify(db, user_id, count):
+    insert_notifications(db, [
+        {"user_id": user_id, "title": "Hello", "message": "Hi", "notification_type": "test"}
+        for _ in range(count)
+    ])
+
+
+def test_unread_counter_is_created_from_the_notifications_and_kept_in_step(session_factory):
+    db = session_factory()
+    user = User(email="reader@example.com", username="reader", hashed_password="x")
+    db.add(user)
+    db.flush()
+    notify(db, user.id, 3)  # before the counter row exists
+    db.commit()
+
+    assert unread_count(db, user.id) == 3
+    assert unread_count(db, user.id) == 3  # a second read finds the row
+    notify(db, user.id, 2)
+    first = db.query(Notification.id).filter(Notification.user_id == user.id).first()[0]
+    set_read(db, user.id, [first])
+    db.commit()
+    assert unread_count(db, user.id) == 4
+    db.close()
+
+
+def test_reconcile_corrects_drifted_counters(session_factory):
+    db = session_factory()
+    user = User(email="drift@example.com", username="drift", hashed_password="x")
+    db.add(user)
+    db.flush()
+    notify(db, user.id, 2)
+    db.commit()
+    assert unread_count(db, user.id) == 2
+
+    # A write that bypasses the counters
+    db.execute(update(Notification).where(Notification.user_id == user.id).values(is_read=True))
+    db.commit()
+
+    assert reconcile_unread_counters(session_factory) == 1
+    assert reconcile_unread_counters(session_factory) == 0
+    db.expire_all()
+    assert db.get(UserNotificationCounter, user.id).unread_count == 0
+    db.close()
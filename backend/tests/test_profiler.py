@@ -0,0 +1,29 @@
+import os
+
+from app.core import profiler
+from app.core.config import settings
+
+
+def test_request_profile_is_served_from_the_shared_directory(client, admin_headers):
+    response = client.get("/api/v1/projects/", headers={**admin_headers, "X-Profile": "1"})
+    profile_id = response.headers["X-Profile-Id"]
+    # Saved for the other workers, not kept in this one
+    assert os.path.exists(os.path.join(settings.PROFILE_DIR, f"{profile_id}.json"))
+
+    response = client.get(f"/api/v1/admin/profiles/{profile_id}?format=speedscope", headers=admin_headers)
+    assert response.status_code == 200
+    assert response.json()["profiles"][0]["type"] == "sampled"
+
+
+def test_unknown_and_malformed_profile_ids_are_not_found(client, admin_headers):
+    for profile_id in ("0123456789ab", "..%2Fconfig"):
+        assert client.get(f"/api/v1/admin/profiles/{profile_id}", headers=admin_headers).status_code == 404
+
+
+def test_only_the_newest_profiles_are_kept(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiler, "MAX_RECENT_PROFILES", 3)
+    for i in range(5):
+        path = tmp_path / f"{i:012x}.json"
+        profiler.save_profile(str(tmp_path), f"{i:012x}", profiler.Profile(0.001))
+        os.utime(path, (i, i))
+    assert sorted(os.listdir(tmp_path)) == [f"{i:012x}.json" for i in (2, 3, 4)]
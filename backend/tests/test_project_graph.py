@@ -0,0 +1,29 @@
+from datetime import datetime
+
+from app.db.models import Project, Task, TaskDependency, User
+from app.services.project_graph import build_project_graph
+
+START, END = datetime(2030, 1, 1), datetime(2030, 12, 31)
+
+
+def test_edges_from_other_projects_are_left_out(db, admin_headers):
+    admin = db.query(User).filter(User.username == "admin").one()
+    here, there = (Project(name=name, start_date=START, end_date=END, members=[admin]) for name in ("Here", "There"))
+    db.add_all([here, there])
+    db.flush()
+    first, second = (Task(title=title, project_id=here.id, creator_id=admin.id) for title in ("First", "Second"))
+    # Outside the project, with an id above every task of it
+    foreign = Task(title="Foreign", project_id=there.id, creator_id=admin.id)
+    db.add_all([first, second, foreign])
+    db.flush()
+    db.add_all([
+        TaskDependency(prerequisite_task_id=first.id, dependent_task_id=second.id, dependency_type="finish-to-start"),
+        TaskDependency(prerequisite_task_id=foreign.id, dependent_task_id=first.id, dependency_type="finish-to-start"),
+    ])
+    db.commit()
+
+    graph = build_project_graph(db, here.id)
+    assert list(graph["node_id"]) == [first.id, second.id]
+    assert list(graph["edge_offsets"]) == [0, 1, 1]
+    assert list(graph["edge_targets"]) == [1]
+    assert len(graph["edge_type"]) == 1
@@ -0,0 +1,84 @@
+from sqlalchemy import update
+
+from app.db.models import Project, ProjectStats, Task, TaskStatus
+from app.services.jobs import reconcile_stats
+from app.services.project_stats import STAT_COLUMNS, _aggregate, project_stats, reconcile_project_stats
+
+
+def stored(db, project_id):
+    db.expire_all()
+    row = db.get(ProjectStats, project_id)
+    return {column: getattr(row, column) for column in STAT_COLUMNS}
+
+
+def exact(db, project_id):
+    return _aggregate(db, [project_id])[project_id]
+
+
+def test_task_writes_keep_the_stats_rows_exact(session_factory):
+    db = session_factory()
+    first, second = Project(name="First"), Project(name="Second")
+    db.add_all([first, second])
+    db.commit()
+    project_stats(db, [first.id, second.id])  # create the rows
+    db.commit()
+
+    task = Task(title="Task", project_id=first.id, status=TaskStatus.NOT_STARTED, estimated_hours=8, risk_score=6.0)
+    other = Task(title="Other", project_id=first.id, status=TaskStatus.NOT_STARTED, estimated_hours=4)
+    db.add_all([task, other])
+    db.commit()
+    assert stored(db, first.id) == exact(db, first.id)
+    assert stored(db, first.id)["high_risk_count"] == 1
+
+    task.status = TaskStatus.IN_PROGRESS
+    task.completion_percentage = 50
+    task.risk_score = 2.0
+    db.commit()
+    assert stored(db, first.id) == exact(db, first.id)
+
+    task.project_id = second.id
+    db.commit()
+    assert stored(db, first.id) == exact(db, first.id)
+    assert stored(db, second.id) == exact(db, second.id)
+
+    db.delete(other)
+    db.commit()
+    assert stored(db, first.id) == exact(db, first.id)
+    assert stored(db, first.id)["task_count"] == 0
+    db.close()
+
+
+def drift(db):
+    """A project whose stats row missed a write that bypassed the ORM listeners."""
+    project = Project(name="Drift")
+    db.add(project)
+    db.flush()
+    db.add(Task(title="Task", project_id=project.id, estimated_hours=8))
+    db.commit()
+    project_stats(db, [project.id])
+    db.commit()
+
+    db.execute(update(Task).where(Task.project_id == project.id).values(estimated_hours=20))
+    db.commit()
+    assert stored(db, project.id)["estimated_hours"] == 8
+    return project.id
+
+
+def test_reconcile_corrects_drifted_rows(session_factory):
+    db = session_factory()
+    project_id = drift(db)
+
+    assert reconcile_project_stats(session_factory) == 1
+    assert stored(db, project_id) == exact(db, project_id)
+    assert reconcile_project_stats(session_factory) == 0
+    db.close()
+
+
+def test_the_reconcile_job_uses_the_session_it_is_given(session_factory):
+    db = session_factory()
+    project_id = drift(db)
+
+    assert reconcile_stats(db, None) == {"corrected": 1}
+    db.commit()  # as the job worker does
+    assert stored(db, project_id) == exact(db, project_id)
+    db.close()
@@ -0,0 +1,55 @@
+from datetime import datetime
+
+import pytest
+
+from app.api.endpoints import tasks as task_endpoints
+from app.db.models import Project, Task, TaskDependency, User
+from app.db.query_debug import NPlusOneError
+from app.services.project_stats import project_stats
+
+START, END = datetime(2030, 1, 1), datetime(2030, 12, 31)
+ROWS = 30  # well over N_PLUS_ONE_THRESHOLD
+
+
+@pytest.fixture
+def project_id(client, admin_headers, db):
+    """A fresh project (so no cached response hides the queries) with a chain of tasks."""
+    admin = db.query(User).filter(User.username == "admin").one()
+    project = Project(name="Query counts", start_date=START, end_date=END, members=[admin])
+    db.add(project)
+    db.flush()
+    tasks = [
+        Task(title=f"Task {i}", project_id=project.id, creator_id=admin.id, estimated_hours=8)
+        for i in range(ROWS)
+    ]
+    db.add_all(tasks)
+    db.flush()
+    db.add_all(
+        TaskDependency(dependent_task_id=after.id, prerequisite_task_id=before.id, dependency_type="finish-to-start")
+        for before, after in zip(tasks, tasks[1:])
+    )
+    db.commit()
+    return project.id
+
+
+@pytest.mark.parametrize("path", [
+    "/api/v1/tasks/?project_id={project_id}&expand=dependencies",
+    "/api/v1/projects/?expand=members,tasks",
+    "/api/v1/task-dependencies/?limit=100",  # has no project filter; lists every dependency
+])
+def test_list_endpoints_load_related_rows_in_bulk(client, admin_headers, project_id, path):
+    response = client.get(path.format(project_id=project_id), headers=admin_headers)
+    assert response.status_code == 200
+
+
+def test_n_plus_one_on_a_list_endpoint_fails_the_request(client, admin_headers, project_id, monkeypatch):
+    # Without its eager loads the task list reads each task's dependencies on its own
+    monkeypatch.setattr(task_endpoints, "loader_options", lambda model, selection: [])
+    with pytest.raises(NPlusOneError, match="task_dependencies"):
+        client.get(f"/api/v1/tasks/?project_id={project_id}&expand=dependencies", headers=admin_headers)
+
+
+def test_project_stats_reads_many_projects_at_once(db, project_id, no_n_plus_one):
+    project_ids = [project_id] + [project.id for project in db.query(Project.id).limit(ROWS)]
+    stats = project_stats(db, project_ids)
+    assert stats[project_id]["task_count"] == ROWS
@@ -0,0 +1,174 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.db.models import Notification, Project, Task, TaskDependency, TaskStatus, User
+from app.services.reminders import PREDECESSOR_ALERT, ReminderScheduler, _epoch
+
+START = datetime(2030, 1, 1, 9, 0)
+HOUR = 3600.0
+
+
+class FakeClock:
+    def __init__(self, now: datetime):
+        self.now = _epoch(now)
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, hours: float) -> None:
+        self.now += hours * HOUR
+
+
+@pytest.fixture
+def clock():
+    return FakeClock(START)
+
+
+@pytest.fixture
+def scheduler(session_factory, clock):
+    return ReminderScheduler(session_factory=session_factory, clock=clock, offsets_hours=(24.0, 1.0), horizon=HOUR)
+
+
+@pytest.fixture
+def project(session_factory):
+    db = session_factory()
+    user = User(email="owner@example.com", username="owner", hashed_password="x")
+    project = Project(name="Reminders", members=[user])
+    db.add(project)
+    db.commit()
+    ids = (project.id, user.id)
+    db.close()
+    return ids
+
+
+def add_task(session_factory, project, due_in_hours, **values):
+    """Create a task from its own session, as another worker would."""
+    project_id, user_id = project
+    db = session_factory()
+    task = Task(title="Task", project_id=project_id, creator_id=user_id,
+                due_date=START + timedelta(hours=due_in_hours), **values)
+    db.add(task)
+    db.commit()
+    task_id = task.id
+    db.close()
+    return task_id
+
+
+def update_task(session_factory, task_id, **values):
+    db = session_factory()
+    task = db.get(Task, task_id)
+    for name, value in values.items():
+        setattr(task, name, value)
+    db.commit()
+    db.close()
+
+
+def notifications(session_factory, task_id, notification_type="task_due"):
+    db = session_factory()
+    try:
+        return db.query(Notification).filter(
+            Notification.related_task_id == task_id,
+            Notification.notification_type == notification_type,
+        ).count()
+    finally:
+        db.close()
+
+
+def test_refill_loads_one_horizon_at_a_time(session_factory, scheduler, clock, project):
+    soon = add_task(session_factory, project, 1.5)  # 1 hour reminder in 30 minutes
+    later = add_task(session_factory, project, 3)  # 1 hour reminder in 2 hours
+    tomorrow = add_task(session_factory, project, 24.5)  # 24 hour reminder in 30 minutes
+
+    assert scheduler.tick() == 0
+    assert (soon, 1) in scheduler.timers
+    assert (tomorrow, 0) in scheduler.timers
+    assert (later, 1) not in scheduler.timers
+
+    clock.advance(1)
+    assert scheduler.tick() == 2
+    assert notifications(session_factory, soon) == 1
+    assert notifications(session_factory, tomorrow) == 1
+    # The window moved on to include the next reminder
+    assert (later, 1) in scheduler.timers
+
+    clock.advance(1)
+    assert scheduler.tick() == 1
+    assert notifications(session_factory, later) == 1
+
+
+def test_due_date_moves_reschedule_from_the_change_log(session_factory, scheduler, clock, project):
+    moved_in = add_task(session_factory, project, 5)
+    moved_out = add_task(session_factory, project, 1.5)
+    scheduler.tick()
+    # Written after the scheduler loaded its window, and not in its process
+    update_task(session_factory, moved_in, due_date=START + timedelta(hours=1.5))
+    update_task(session_factory, moved_out, due_date=START + timedelta(hours=10))
+    created = add_task(session_factory, project, 1.75)
+
+    scheduler.tick()
+    assert (moved_in, 1) in scheduler.timers
+    assert (moved_out, 1) not in scheduler.timers
+    assert (created, 1) in scheduler.timers
+
+    clock.advance(1)
+    scheduler.tick()
+    assert notifications(session_factory, moved_in) == 1
+    assert notifications(session_factory, moved_out) == 0
+
+
+def test_closed_and_deleted_tasks_lose_their_timers(session_factory, scheduler, project):
+    closed = add_task(session_factory, project, 1.5)
+    deleted = add_task(session_factory, project, 1.5)
+    scheduler.tick()
+    assert (closed, 1) in scheduler.timers
+
+    update_task(session_factory, closed, status=TaskStatus.COMPLETED)
+    db = session_factory()
+    db.delete(db.get(Task, deleted))
+    db.commit()
+    db.close()
+
+    scheduler.tick()
+    assert (closed, 1) not in scheduler.timers
+    assert (deleted, 1) not in scheduler.timers
+
+
+def test_overdue_reminder_is_sent_once(session_factory, scheduler, clock, project):
+    sent = add_task(session_factory, project, 1.5)
+    pulled_in = add_task(session_factory, project, 5)
+    scheduler.tick()
+    clock.advance(0.6)
+    assert scheduler.tick() == 1
+
+    # Its 1 hour reminder already went out for the old due date
+    update_task(session_factory, sent, due_date=START + timedelta(hours=1.4))
+    # Moved so close that both of its reminder times have passed: only the
+    # nearest reminder is sent, and right away
+    update_task(session_factory, pulled_in, due_date=START + timedelta(hours=1.2))
+    assert scheduler.tick() == 1
+    assert notifications(session_factory, sent) == 1
+    assert notifications(session_factory, pulled_in) == 1
+
+    clock.advance(0.2)
+    assert scheduler.tick() == 0
+
+
+def test_predecessor_alerts_once_when_it_becomes_at_risk(session_factory, scheduler, project):
+    predecessor = add_task(session_factory, project, 48)
+    dependent = add_task(session_factory, project, 72)
+    db = session_factory()
+    db.add(TaskDependency(dependent_task_id=dependent, prerequisite_task_id=predecessor))
+    db.commit()
+    db.close()
+    scheduler.tick()
+
+    update_task(session_factory, predecessor, status=TaskStatus.BLOCKED)
+    scheduler.tick()
+    assert notifications(session_factory, dependent, "risk_alert") == 1
+
+    # Still at risk: no second alert
+    update_task(session_factory, predecessor, risk_score=9.0)
+    scheduler.tick()
+    assert notifications(session_factory, dependent, "risk_alert") == 1
+    assert (predecessor, PREDECESSOR_ALERT) not in scheduler.timers
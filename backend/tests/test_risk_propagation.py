@@ -0,0 +1,86 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.core.config import settings
+from app.db.models import Project, RiskSnapshot, Task
+from app.ml.risk_propagation import prune_risk_snapshots, recompute_project_risk
+
+API = "/api/v1"
+
+
+@pytest.fixture
+def project_id(client, admin_headers):
+    body = {"name": "Risk chain", "start_date": "2030-01-01T00:00:00", "end_date": "2030-12-31T00:00:00"}
+    response = client.post(f"{API}/projects/", json=body, headers=admin_headers)
+    assert response.status_code == 200, response.text
+    return response.json()["id"]
+
+
+def create_task(client, headers, project_id, **values):
+    body = {"title": "Task", "project_id": project_id, "creator_id": 0, "estimated_hours": 40, **values}  # creator is the caller
+    response = client.post(f"{API}/tasks/", json=body, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def scores(db, task_id):
+    db.expire_all()
+    task = db.get(Task, task_id)
+    return task.risk_score, task.propagated_risk_score
+
+
+def test_risk_propagates_on_create_update_and_delete(client, admin_headers, db, project_id):
+    upstream = create_task(client, admin_headers, project_id, priority="critical", estimated_hours=400)
+    downstream = create_task(client, admin_headers, project_id, priority="low")
+    # Scored when created, in the one write
+    assert upstream["risk_score"] is not None
+    assert upstream["propagated_risk_score"] == upstream["risk_score"]
+
+    response = client.post(
+        f"{API}/task-dependencies/",
+        json={"dependent_task_id": downstream["id"], "prerequisite_task_id": upstream["id"]},
+        headers=admin_headers,
+    )
+    assert response.status_code == 200, response.text
+    own, propagated = scores(db, downstream["id"])
+    assert propagated > own
+
+    # A new score of the predecessor reaches its successor
+    response = client.put(f"{API}/tasks/{upstream['id']}", json={"estimated_hours": 1, "priority": "low"}, headers=admin_headers)
+    assert response.status_code == 200, response.text
+    _, lowered = scores(db, downstream["id"])
+    assert own < lowered < propagated
+
+    # Without its predecessor the successor falls back to its own score
+    assert client.delete(f"{API}/tasks/{upstream['id']}", headers=admin_headers).status_code == 200
+    assert scores(db, downstream["id"]) == (own, own)
+
+
+def test_risk_snapshots_are_coalesced_per_interval_and_pruned(session_factory, monkeypatch):
+    db = session_factory()
+    project = Project(name="Snapshots")
+    db.add(project)
+    db.flush()
+    db.add(Task(title="Task", project_id=project.id, risk_score=4.0, propagated_risk_score=4.0))
+    db.commit()
+
+    def snapshots():
+        return db.query(RiskSnapshot).filter(RiskSnapshot.project_id == project.id).count()
+
+    recompute_project_risk(db, project.id)
+    recompute_project_risk(db, project.id)
+    db.commit()
+    assert snapshots() == 1
+
+    monkeypatch.setattr(settings, "RISK_SNAPSHOT_INTERVAL_SECONDS", 0)
+    recompute_project_risk(db, project.id)
+    db.commit()
+    assert snapshots() == 2
+
+    old = datetime.now(timezone.utc) - timedelta(days=settings.RISK_SNAPSHOT_RETENTION_DAYS + 1)
+    db.query(RiskSnapshot).filter(RiskSnapshot.project_id == project.id).update({"taken_at": old})
+    db.commit()
+    assert prune_risk_snapshots(session_factory) == 2
+    assert snapshots() == 0
+    db.close()
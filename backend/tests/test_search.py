@@ -0,0 +1,50 @@
+import pytest
+
+from app.db.models import Project, Task, TaskComment
+from app.services.search import install_search_index, parse_query, search
+
+
+@pytest.fixture
+def db(session_factory):
+    """Session on a database with the full-text indexes installed."""
+    session = session_factory()
+    with session.get_bind().begin() as conn:
+        install_search_index(conn)
+    yield session
+    session.close()
+
+
+def hits(db, query, project_ids=None):
+    return {(hit["type"], hit["comment_id"] or hit["task_id"]) for hit in search(db, parse_query(query), project_ids)}
+
+
+def test_triggers_keep_the_index_in_step_with_tasks_and_comments(db):
+    project, other = Project(name="Searched"), Project(name="Elsewhere")
+    db.add_all([project, other])
+    db.flush()
+    task = Task(title="Migrate billing", description="Move invoices to the new ledger", project_id=project.id)
+    db.add(task)
+    db.flush()
+    comment = TaskComment(content="Ledger export is ready", task_id=task.id)
+    db.add(comment)
+    db.commit()
+
+    assert hits(db, "billing") == {("task", task.id)}
+    assert hits(db, "ledg") == {("task", task.id), ("comment", comment.id)}  # word prefixes match
+
+    task.title = "Migrate payroll"
+    comment.content = "Export is ready"
+    db.commit()
+    assert hits(db, "billing") == set()
+    assert hits(db, "payroll") == {("task", task.id)}
+    assert hits(db, "ledger") == {("task", task.id)}
+
+    # Comments follow their task to another project
+    task.project_id = other.id
+    db.commit()
+    assert hits(db, "export", [project.id]) == set()
+    assert hits(db, "export", [other.id]) == {("comment", comment.id)}
+
+    db.delete(comment)
+    db.commit()
+    assert hits(db, "export") == set()
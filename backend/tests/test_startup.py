@@ -0,0 +1,10 @@
+from benchmarks.bench_startup import import_once
+
+
+def test_importing_the_app_is_lazy_and_leaves_the_database_alone(tmp_path):
+    # Import time itself is checked by benchmarks.bench_startup, on a quiet machine
+    database = tmp_path / "startup.db"
+    run = import_once(str(database))[0]
+
+    assert run["lazy"] == []
+    assert not database.exists()